@@ -0,0 +1,58 @@
+"""Attack counts per square: python-chess loop vs vectorized NumPy batch.
+
+    python benchmarks/bench_bitboard_stats.py [positions]
+
+Positions are taken from random legal games. The loop sums board.attacks()
+over every piece; the batch version packs the positions once and counts
+them all with src.bitboard_stats.attack_counts.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+from src.bitboard_stats import attack_counts, boards_to_bitboards
+
+
+def loop_counts(board):
+    white, black = [0] * 64, [0] * 64
+    for square, piece in board.piece_map().items():
+        counts = white if piece.color == chess.WHITE else black
+        for target in chess.scan_forward(board.attacks_mask(square)):
+            counts[target] += 1
+    return white, black
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(0)
+    boards = []
+    while len(boards) < count:
+        board = chess.Board()
+        while not board.is_game_over() and board.ply() < 120 and len(boards) < count:
+            board.push(rng.choice(list(board.legal_moves)))
+            boards.append(board.copy(stack=False))
+
+    start = time.perf_counter()
+    for board in boards:
+        loop_counts(board)
+    loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bitboards = boards_to_bitboards(boards)
+    pack = time.perf_counter() - start
+    start = time.perf_counter()
+    attack_counts(bitboards)
+    batch = time.perf_counter() - start
+
+    print(f"{count} positions")
+    print(f"python-chess loop   {loop * 1000:8.1f} ms  {count / loop:10.0f} pos/s")
+    print(f"numpy pack          {pack * 1000:8.1f} ms")
+    print(f"numpy counts        {batch * 1000:8.1f} ms  {count / batch:10.0f} pos/s  ({loop / batch:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
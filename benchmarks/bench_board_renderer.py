@@ -0,0 +1,97 @@
+"""Images per second of the batch board renderer.
+
+    python benchmarks/bench_board_renderer.py [games] [plies] [--workers 1,2,4] [--size 75] [--formats png,jpg]
+
+Renders random games move by move (an image per position) and single
+position thumbnails into a temporary directory, for each worker count and
+image format. "before" is what producing the same PNG frames took with the
+GUI alone: the ChessGUI window surface drawn and cropped per position.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import chess
+import pygame
+from src.board_renderer import render_batch
+
+
+def random_games(count, plies, seed=0):
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        board = chess.Board()
+        moves = []
+        while len(moves) < plies and not board.is_game_over():
+            move = rng.choice(list(board.legal_moves))
+            board.push(move)
+            moves.append(move)
+        games.append(moves)
+    return games
+
+
+def gui_frames(games, out):
+    """The old way: everything drawn on the GUI's window surface, then the board cut out."""
+    from src.game_logic import ChessGame
+    from src.gui import BOARD_ORIGIN, BOARD_SIZE, ChessGUI
+    gui = ChessGUI(ChessGame())
+    start = time.perf_counter()
+    images = 0
+    for n, moves in enumerate(games):
+        gui.game.reset()
+        directory = os.path.join(out, f"game{n:05d}")
+        os.makedirs(directory, exist_ok=True)
+        for ply in range(len(moves) + 1):
+            if ply:
+                gui.game.push_move(moves[ply - 1])
+            gui.draw_game()
+            board = gui.screen.subsurface(pygame.Rect(BOARD_ORIGIN, (BOARD_SIZE, BOARD_SIZE)))
+            pygame.image.save(board, os.path.join(directory, f"{ply:03d}.png"))
+            images += 1
+    return images / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("games", type=int, nargs="?", default=20)
+    parser.add_argument("plies", type=int, nargs="?", default=60)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--size", type=int, default=75, help="Square size (75 is the GUI's)")
+    parser.add_argument("--formats", default="png,jpg")
+    args = parser.parse_args()
+
+    games = random_games(args.games, args.plies)
+    thumbnails = []
+    for moves in games:
+        board = chess.Board()
+        for move in moves:
+            board.push(move)
+        thumbnails.append(board.fen())
+    game_jobs = [(f"game{n:05d}", None, moves) for n, moves in enumerate(games)]
+    thumbnail_jobs = [(f"pos{n:06d}", fen, None) for n, fen in enumerate(thumbnails * 25)]
+    print(f"{len(games)} games of up to {args.plies} plies, {len(thumbnail_jobs)} thumbnails, "
+          f"square size {args.size}, {os.cpu_count()} CPUs")
+
+    if args.size == 75:
+        with tempfile.TemporaryDirectory() as out:
+            print(f"before: GUI window, png          game frames {gui_frames(games, out):6.0f} images/s")
+    for image_format in args.formats.split(","):
+        for workers in (int(w) for w in args.workers.split(",")):
+            with tempfile.TemporaryDirectory() as out:
+                frames = render_batch(game_jobs, out, workers, args.size, image_format=image_format)
+                thumbs = render_batch(thumbnail_jobs, os.path.join(out, "thumbs"), workers, args.size,
+                                      image_format=image_format)
+            print(f"renderer, {workers} worker(s), {image_format:4}  game frames {frames['images_per_second']:6.0f} images/s   "
+                  f"thumbnails {thumbs['images_per_second']:6.0f} images/s")
+
+
+if __name__ == "__main__":
+    main()
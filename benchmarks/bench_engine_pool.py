@@ -0,0 +1,65 @@
+"""Throughput of EnginePool.evaluate_many as the pool grows.
+
+    python benchmarks/bench_engine_pool.py [--engine stockfish] [--positions 10000] [--nodes 20000]
+
+Defaults to the fake UCI engine in tests/, which measures pool overhead
+rather than search speed; pass a real engine to measure scaling.
+"""
+import argparse
+import os
+import random
+import shlex
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import chess
+import chess.engine
+from src.engine_pool import EnginePool
+
+
+def random_positions(count, seed=0):
+    rng = random.Random(seed)
+    fens = []
+    while len(fens) < count:
+        board = chess.Board()
+        for _ in range(rng.randint(4, 60)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        if not board.is_game_over():
+            fens.append(board.fen())
+    return fens
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engine", default=f"{sys.executable} {os.path.join(ROOT, 'tests', 'fake_engine.py')}")
+    parser.add_argument("--positions", type=int, default=10000)
+    parser.add_argument("--nodes", type=int, default=20000)
+    parser.add_argument("--max-size", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    fens = random_positions(args.positions)
+    limit = chess.engine.Limit(nodes=args.nodes)
+    sizes = sorted({1, 2, 4, 8, 16, 32, args.max_size} & set(range(1, args.max_size + 1)))
+
+    base_rate = None
+    print(f"{args.positions} positions, nodes={args.nodes}")
+    for size in sizes:
+        pool = EnginePool(shlex.split(args.engine), size=size)
+        if not pool.start():
+            return
+        start = time.perf_counter()
+        pool.evaluate_many(fens, limit)
+        rate = len(fens) / (time.perf_counter() - start)
+        pool.quit()
+        base_rate = base_rate or rate
+        print(f"  {size:>3} engines: {rate:9.1f} positions/sec  speedup {rate / base_rate:5.2f}x  efficiency {rate / base_rate / size:5.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Lookup latency of PositionIndex.move_stats on a large index.
+
+    python benchmarks/bench_position_index.py [--positions 10000000] [--games 200]
+
+A few hundred random games are indexed for real, then the index is padded
+with random keys up to --positions entries. Queries are made on positions
+from the real games, including the very popular starting position.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+from src.position_index import PositionIndex, Segment
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--positions", type=int, default=10_000_000)
+    parser.add_argument("--games", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    directory = tempfile.mkdtemp()
+    try:
+        index = PositionIndex(directory)
+        boards = []
+        for _ in range(args.games):
+            board = chess.Board()
+            while not board.is_game_over() and board.ply() < 80:
+                board.push(rng.choice(list(board.legal_moves)))
+            index.add_game(board.move_stack, board.result(claim_draw=False))
+            boards.append(board)
+        index.flush()
+
+        start = time.perf_counter()
+        filler = args.positions - len(index.segments[0])
+        keys = sorted(rng.getrandbits(64) for _ in range(filler))
+        Segment.write(os.path.join(directory, "seg_99999.idx"), ((key, 1, 0, 0, 0) for key in keys), filler)
+        del keys
+        index.close()
+        print(f"Built {args.positions} entry index in {time.perf_counter() - start:.1f}s")
+
+        index = PositionIndex(directory)
+        queries = [chess.Board()]
+        for board in boards:
+            replay = chess.Board()
+            for move in board.move_stack[:rng.randint(1, len(board.move_stack))]:
+                replay.push(move)
+            queries.append(replay)
+
+        timings = []
+        for board in queries:
+            start = time.perf_counter()
+            index.move_stats(board)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        start_time = time.perf_counter()
+        index.move_stats(chess.Board())
+        start_ms = (time.perf_counter() - start_time) * 1000
+        print(f"move_stats over {len(queries)} positions: p50 {timings[len(timings) // 2]:.3f} ms, "
+              f"max {timings[-1]:.3f} ms, starting position {start_ms:.3f} ms")
+        index.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Binary game records vs PGN: file size, full load and random access.
+
+    python benchmarks/bench_records.py [games]
+
+Random legal games are written both as PGN and as a record file. "load"
+means getting every game's move list back; random access reads one game
+from the middle of the collection.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import chess.pgn
+from src.game_records import GameRecordFile, GameRecordWriter
+from src.pgn_stream import unpack_move
+
+
+def random_games(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        board = chess.Board()
+        while not board.is_game_over() and board.ply() < rng.randint(40, 160):
+            board.push(rng.choice(list(board.legal_moves)))
+        yield board
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    tmp = tempfile.mkdtemp()
+    pgn_path = os.path.join(tmp, "games.pgn")
+    bin_path = os.path.join(tmp, "games.bin")
+
+    with open(pgn_path, "w") as pgn_file, GameRecordWriter(bin_path) as writer:
+        for i, board in enumerate(random_games(count)):
+            game = chess.pgn.Game.from_board(board)
+            game.headers["Event"] = f"Game {i}"
+            print(game, file=pgn_file, end="\n\n")
+            writer.add(board.move_stack, board.result(claim_draw=False), tags={"Event": f"Game {i}"})
+
+    pgn_size, bin_size = os.path.getsize(pgn_path), os.path.getsize(bin_path)
+    print(f"{count} games")
+    print(f"  size:  PGN {pgn_size / 1024:8.1f} KB   binary {bin_size / 1024:8.1f} KB  ({pgn_size / bin_size:.1f}x smaller)")
+
+    start = time.perf_counter()
+    with open(pgn_path) as f:
+        while (game := chess.pgn.read_game(f)) is not None:
+            list(game.mainline_moves())
+    pgn_load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with GameRecordFile(bin_path) as records:
+        for n in range(len(records)):
+            [unpack_move(value) for value in records.moves(n)]
+    bin_load = time.perf_counter() - start
+    print(f"  load:  PGN {pgn_load:8.3f} s    binary {bin_load:8.3f} s   ({pgn_load / bin_load:.0f}x faster)")
+
+    # Random access: PGN has to parse (or at least skip) everything before game N
+    target = count // 2
+    start = time.perf_counter()
+    with open(pgn_path) as f:
+        for _ in range(target):
+            chess.pgn.skip_game(f)
+        list(chess.pgn.read_game(f).mainline_moves())
+    pgn_seek = time.perf_counter() - start
+    start = time.perf_counter()
+    with GameRecordFile(bin_path) as records:
+        [unpack_move(value) for value in records.moves(target)]
+    bin_seek = time.perf_counter() - start
+    print(f"  game #{target}: PGN {pgn_seek * 1000:8.2f} ms   binary {bin_seek * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
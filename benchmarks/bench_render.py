@@ -0,0 +1,113 @@
+"""Frame-time benchmark for ChessGUI.draw_game, before and after render caching.
+
+"before" reproduces the old per-frame drawing (a font.render call per glyph
+and outline, a new Surface per highlighted square), "after" is the current
+cached code. Runs headless with the SDL dummy video driver:
+
+    python benchmarks/bench_render.py [frames]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import pygame
+from src.game_logic import ChessGame
+from src.gui import ChessGUI, OFFSET_X, OFFSET_Y, SQUARE_SIZE
+
+# A middlegame position with a last move and a selected piece to highlight
+MOVES = ["e2e4", "e7e5", "g1f3", "b8c6", "f1c4", "g8f6", "d2d3", "f8c5"]
+
+
+def draw_board_uncached(gui):
+    gui.screen.fill((30, 30, 30))
+    for row in range(8):
+        for col in range(8):
+            rank = 7 - row
+            square_idx = chess.square(col, rank)
+            bg_color = (240, 217, 181) if (row + col) % 2 == 0 else (181, 136, 99)
+            x = OFFSET_X + col * SQUARE_SIZE
+            y = OFFSET_Y + row * SQUARE_SIZE
+            pygame.draw.rect(gui.screen, bg_color, pygame.Rect(x, y, SQUARE_SIZE, SQUARE_SIZE))
+            if gui.selected_square == (col, rank):
+                s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE))
+                s.set_alpha(180)
+                s.fill((186, 202, 68))
+                gui.screen.blit(s, (x, y))
+            elif gui.game.board.move_stack:
+                last_move = gui.game.board.peek()
+                if square_idx in (last_move.from_square, last_move.to_square):
+                    s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE))
+                    s.set_alpha(180)
+                    s.fill((205, 210, 106))
+                    gui.screen.blit(s, (x, y))
+
+
+def draw_pieces_uncached(gui):
+    board = gui.game.board
+    for square in chess.SQUARES:
+        piece = board.piece_at(square)
+        if piece:
+            col = chess.square_file(square)
+            row = 7 - chess.square_rank(square)
+            symbol = piece.unicode_symbol()
+            if piece.color == chess.WHITE:
+                text_color, outline_color = (255, 255, 255), (0, 0, 0)
+            else:
+                text_color, outline_color = (0, 0, 0), (255, 255, 255)
+            center_x = OFFSET_X + col * SQUARE_SIZE + SQUARE_SIZE // 2
+            center_y = OFFSET_Y + row * SQUARE_SIZE + SQUARE_SIZE // 2
+            for dx, dy in [(-1, -1), (-1, 1), (1, -1), (1, 1), (0, 2)]:
+                outline_surface = gui.font.render(symbol, True, outline_color)
+                gui.screen.blit(outline_surface, outline_surface.get_rect(center=(center_x + dx, center_y + dy)))
+            text_surface = gui.font.render(symbol, True, text_color)
+            gui.screen.blit(text_surface, text_surface.get_rect(center=(center_x, center_y)))
+
+
+def time_frames(draw, frames):
+    draw() # Warm-up (fills the caches in the "after" case)
+    start = time.perf_counter()
+    for _ in range(frames):
+        draw()
+    return (time.perf_counter() - start) / frames * 1000.0
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    game = ChessGame()
+    for uci in MOVES:
+        game.make_move(uci)
+    gui = ChessGUI(game)
+    gui.selected_square = (4, 0) # White king
+
+    def before():
+        draw_board_uncached(gui)
+        draw_pieces_uncached(gui)
+
+    def after():
+        gui.draw_board()
+        gui.draw_pieces()
+
+    # Glyph edges differ slightly because the outline is now composited on
+    # a transparent surface before being blended onto the board
+    before()
+    reference = pygame.image.tobytes(gui.screen, "RGB")
+    after()
+    output = pygame.image.tobytes(gui.screen, "RGB")
+    max_diff = max(abs(a - b) for a, b in zip(reference, output))
+
+    before_ms = time_frames(before, frames)
+    after_ms = time_frames(after, frames)
+    print(f"board+pieces, {frames} frames")
+    print(f"  before: {before_ms:.3f} ms/frame")
+    print(f"  after:  {after_ms:.3f} ms/frame ({before_ms / after_ms:.1f}x faster)")
+    print(f"  max channel difference vs before: {max_diff}/255")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
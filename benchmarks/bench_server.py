@@ -0,0 +1,139 @@
+"""Load test for src.game_server: many sessions playing random moves at once.
+
+    python benchmarks/bench_server.py [sessions] [connections] [moves per session] [engines]
+
+Starts the server in a subprocess with the fake test engine (or connects to
+--host/--port if given), opens the sessions spread over the connections and
+has every session play random legal moves. Latency is measured per move,
+from sending it until the engine's reply arrives. Sessions per core is the
+number of concurrent sessions divided by the CPU cores the server process
+used (engines excluded).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import chess
+
+FAKE_ENGINE = os.path.join(ROOT, "tests", "fake_engine.py")
+
+
+class Connection:
+    """One TCP connection carrying requests of many sessions, matched by id."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count(1)
+        self.waiting = {}
+        self.reader_task = asyncio.ensure_future(self.read_responses())
+
+    async def read_responses(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            self.waiting.pop(response["id"]).set_result(response)
+
+    async def request(self, **request):
+        request["id"] = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request["id"]] = future
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        return await future
+
+    async def close(self):
+        self.writer.close()
+        self.reader_task.cancel()
+
+
+async def play_session(connection, moves, rng, latencies, errors):
+    response = await connection.request(op="new", color="white")
+    session, board = response["session"], chess.Board()
+    for _ in range(moves):
+        if board.is_game_over():
+            break
+        move = rng.choice(list(board.legal_moves))
+        start = time.perf_counter()
+        response = await connection.request(op="move", session=session, move=move.uci())
+        if not response["ok"]:
+            errors.append(response["error"])
+            break
+        latencies.append(time.perf_counter() - start)
+        board.push(move)
+        if response["reply"]:
+            board.push_uci(response["reply"])
+    await connection.request(op="close", session=session)
+
+
+async def run(args, host, port):
+    connections = []
+    for _ in range(args.connections):
+        reader, writer = await asyncio.open_connection(host, port)
+        connections.append(Connection(reader, writer))
+    before = await connections[0].request(op="stats")
+
+    latencies, errors = [], []
+    rng = random.Random(0)
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        play_session(connections[i % len(connections)], args.moves, random.Random(rng.random()), latencies, errors)
+        for i in range(args.sessions)
+    ])
+    wall = time.perf_counter() - start
+
+    after = await connections[0].request(op="stats")
+    for connection in connections:
+        await connection.close()
+
+    server_cores = (after["cpu"] - before["cpu"]) / (after["uptime"] - before["uptime"])
+    latencies.sort()
+    print(f"{args.sessions} sessions over {args.connections} connections, {after['engines']} engines")
+    print(f"{len(latencies)} moves in {wall:.2f}s: {len(latencies) / wall:.0f} moves/s, {len(errors)} errors")
+    print(f"move latency p50 {statistics.median(latencies) * 1000:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+    print(f"server CPU {server_cores:.2f} cores: {args.sessions / max(server_cores, 1e-9):.0f} sessions per core")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sessions", type=int, nargs="?", default=500)
+    parser.add_argument("connections", type=int, nargs="?", default=10)
+    parser.add_argument("moves", type=int, nargs="?", default=20)
+    parser.add_argument("engines", type=int, nargs="?", default=4)
+    parser.add_argument("--host", default=None, help="Use a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.host:
+        asyncio.run(run(args, args.host, args.port))
+        return
+
+    engine = f"{shlex.quote(sys.executable)} {shlex.quote(FAKE_ENGINE)}"
+    server = subprocess.Popen([sys.executable, "-m", "src.game_server", "--engine", engine,
+                               "--engines", str(args.engines), "--port", "0", "--movetime", "0.01"],
+                              cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    try:
+        line = server.stdout.readline() # "Listening on host:port with N engines"
+        host, port = line.split()[2].rsplit(":", 1)
+        asyncio.run(run(args, host, int(port)))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
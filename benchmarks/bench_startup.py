@@ -0,0 +1,115 @@
+"""Time to first frame, before and after the fast-startup changes.
+
+Each run is a fresh interpreter, timed from process launch until the first
+frame is on screen and until the engine is ready to play. The engine is the
+fake test engine with a start delay standing in for Stockfish loading its
+network. "before" imports everything up front, builds the move sound in a
+pure-Python loop and starts the engine before opening the window, as
+main.py used to; "after" is the current main.py flow. Runs headless with
+the SDL dummy drivers:
+
+    python benchmarks/bench_startup.py [runs] [engine start delay]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_ENGINE = os.path.join(ROOT, "tests", "fake_engine.py")
+
+
+def generate_move_sound_loop(gui):
+    import array
+    import math
+    import pygame
+    buffer = []
+    for i in range(2000):
+        t = float(i) / 44100
+        val = int(32000 * math.sin(2.0 * math.pi * 200.0 * t) * math.exp(-15.0 * t))
+        buffer.append(val)
+        buffer.append(val)
+    try:
+        return pygame.mixer.Sound(buffer=array.array("h", buffer))
+    except Exception:
+        return None
+
+
+def child(mode, start_delay):
+    sys.path.insert(0, ROOT)
+    command = [sys.executable, FAKE_ENGINE, "--start-delay", str(start_delay)]
+
+    def report(event):
+        print(event, flush=True)
+
+    if mode == "before":
+        from src.engine_wrapper import StockfishEngine
+        from src.game_analysis import GameAnalyzer
+        from src.opening_book import OpeningBook # noqa: F401
+        from src.position_index import PositionIndex # noqa: F401
+        from src.attack_maps import AttackMapCache
+        from src.game_logic import ChessGame
+        from src.gui import ChessGUI
+        engine = StockfishEngine(command)
+        engine.start()
+        report("engine")
+        ChessGUI.generate_move_sound = generate_move_sound_loop
+        gui = ChessGUI(ChessGame(base_time=300, increment=3), engine, analyzer=GameAnalyzer(command, cache=engine.cache))
+        gui.renderer.attack_cache = AttackMapCache()
+        gui.mark_dirty()
+        gui.update_dirty()
+        report("frame")
+    else:
+        from src.game_logic import ChessGame
+        from src.gui import ChessGUI
+        gui = ChessGUI(ChessGame(base_time=300, increment=3))
+
+        def launch():
+            from src.engine_wrapper import StockfishEngine
+            from src.game_analysis import GameAnalyzer
+            engine = StockfishEngine(command)
+            if not engine.start():
+                return None
+            gui.analyzer = GameAnalyzer(command, cache=engine.cache)
+            return engine
+
+        gui.connect_engine(launch)
+        gui.mark_dirty()
+        gui.update_dirty()
+        report("frame")
+        gui.engine_thread.join()
+        report("engine")
+    gui.engine.quit()
+
+
+def run(mode, start_delay):
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--child", mode, str(start_delay)],
+                            stdout=subprocess.PIPE, text=True)
+    times = {}
+    for line in proc.stdout:
+        if line.strip() in ("frame", "engine"):
+            times[line.strip()] = time.perf_counter() - start
+    proc.wait()
+    return times
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], float(sys.argv[3]))
+        return
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    start_delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    print(f"{runs} runs each, engine start delay {start_delay:.2f}s, medians:")
+    for mode in ("before", "after"):
+        results = [run(mode, start_delay) for _ in range(runs)]
+        frame = statistics.median(r["frame"] for r in results)
+        engine = statistics.median(r["engine"] for r in results)
+        print(f"{mode:8} first frame {frame * 1000:7.0f} ms   engine ready {engine * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Per-frame game-status cost, before and after ChessGame's status cache.
+
+Every frame the GUI asks whether the game is over (main_loop) and whether
+the side to move is mated, stalemated or in check (draw_ui). "before" asks
+python-chess directly, as the GUI used to; "after" goes through ChessGame.
+
+    python benchmarks/bench_status.py [frames]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+from src.game_logic import ChessGame
+
+POSITIONS = {
+    "start": [],
+    "middlegame": ["e2e4", "e7e5", "g1f3", "b8c6", "f1c4", "g8f6", "d2d3", "f8c5", "e1g1", "d7d6"],
+    "check": ["e2e4", "f7f6", "d1h5"],
+}
+
+
+def frame_before(game):
+    board = game.board
+    board.is_game_over()
+    if board.is_checkmate():
+        return
+    if board.is_stalemate():
+        return
+    board.is_check()
+
+
+def frame_after(game):
+    game.is_game_over()
+    if game.is_checkmate():
+        return
+    if game.is_stalemate():
+        return
+    game.is_check()
+
+
+def time_frames(frame, game, frames):
+    start = time.perf_counter()
+    for _ in range(frames):
+        frame(game)
+    return (time.perf_counter() - start) / frames * 1e6
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"status queries per frame, {frames} frames")
+    for name, moves in POSITIONS.items():
+        game = ChessGame()
+        for uci in moves:
+            game.make_move(uci)
+        before_us = time_frames(frame_before, game, frames)
+        after_us = time_frames(frame_after, game, frames)
+        print(f"  {name:<11} before: {before_us:7.2f} us/frame  after: {after_us:5.2f} us/frame")
+
+        # make_move used to scan board.legal_moves; now it is a set lookup
+        move = chess.Move.from_uci("a2a3") if game.board.turn == chess.WHITE else chess.Move.from_uci("a7a6")
+        start = time.perf_counter()
+        for _ in range(frames):
+            move in game.board.legal_moves
+        scan_us = (time.perf_counter() - start) / frames * 1e6
+        start = time.perf_counter()
+        for _ in range(frames):
+            game.is_legal(move)
+        set_us = (time.perf_counter() - start) / frames * 1e6
+        print(f"  {'':<11} legality check: {scan_us:5.2f} us -> {set_us:5.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Benchmark suite: move generation, rendering and engine round-trips.
+
+    python benchmarks/bench_suite.py [--only perft,render,engine] [--repeat 3]
+                                     [--output benchmarks/results.json]
+                                     [--compare BASELINE.json] [--threshold 0.15]
+
+perft counts the leaves of standard test positions by playing every move
+through ChessGame (legal move generation, the game tree and undo), and
+fails if a count is wrong. Undo keeps lines in the tree for redo, so every
+interior position visited becomes a GameNode that lives until the run
+ends: the figures include building the tree (9,323 nodes for startpos at
+depth 4), not just move generation.
+
+render times ChessGUI.draw_game with the SDL dummy video driver, with the
+overlays off and on. engine times the round-trip of get_best_move and of a
+GUI background search against the fake UCI engine in tests/, which answers
+at once, so only our own overhead is measured.
+
+Every result has an "ms" figure, lower is better: the best of --repeat
+runs, or the median call for the engine. Results are written to --output
+as JSON. With --compare, results more
+than --threshold slower than the baseline file are flagged and the exit
+status is 1. A baseline is simply an earlier --output file.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import chess
+from src.game_logic import ChessGame
+
+FAKE_ENGINE = os.path.join(ROOT, "tests", "fake_engine.py")
+
+# (name, FEN, depth, expected leaf count), from the Chess Programming Wiki perft results
+PERFT_POSITIONS = [
+    ("startpos", chess.STARTING_FEN, 4, 197281),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", 3, 97862),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", 4, 43238),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", 3, 9467),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", 3, 62379),
+]
+
+# A middlegame position with a last move to highlight, as in bench_render.py
+RENDER_MOVES = ["e2e4", "e7e5", "g1f3", "b8c6", "f1c4", "g8f6", "d2d3", "f8c5"]
+
+
+def perft(game, depth):
+    """Leaf count below the current position. Leaves the tree one node per interior position bigger."""
+    moves = game.status().legal_moves
+    if depth == 1:
+        return len(moves)
+    total = 0
+    for move in moves:
+        game.push_move(move)
+        total += perft(game, depth - 1)
+        game.undo_move()
+    return total
+
+
+def bench_perft(repeat):
+    results = {}
+    for name, fen, depth, expected in PERFT_POSITIONS:
+        times = []
+        for _ in range(repeat):
+            game = ChessGame(fen=fen)
+            start = time.perf_counter()
+            nodes = perft(game, depth)
+            times.append(time.perf_counter() - start)
+            if nodes != expected:
+                raise SystemExit(f"perft {name} depth {depth}: {nodes} leaves, expected {expected}")
+        best = min(times)
+        results[f"perft.{name}.d{depth}"] = {"ms": best * 1000, "nodes": nodes, "nodes_per_s": nodes / best}
+    return results
+
+
+def bench_render(repeat, frames=300):
+    import pygame
+    from src.gui import ChessGUI
+
+    game = ChessGame()
+    for uci in RENDER_MOVES:
+        game.make_move(uci)
+    gui = ChessGUI(game)
+    gui.selected_square = (4, 0) # White king
+
+    results = {}
+    for name, overlays in (("plain", False), ("overlays", True)):
+        gui.show_lines = gui.show_heat = overlays
+        gui.draw_game() # Warm-up: fills the glyph, board and attack map caches
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(frames):
+                gui.draw_game()
+            times.append((time.perf_counter() - start) / frames)
+        results[f"render.draw_game.{name}"] = {"ms": min(times) * 1000, "frames": frames}
+    pygame.quit()
+    return results
+
+
+def engine_positions(count, seed=0):
+    """Distinct positions from random games, so no search is answered from the cache."""
+    rng = random.Random(seed)
+    boards, seen = [], set()
+    while len(boards) < count:
+        board = chess.Board()
+        for _ in range(rng.randint(2, 40)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        if not board.is_game_over() and board.fen() not in seen:
+            seen.add(board.fen())
+            boards.append(board)
+    return boards
+
+
+def latency(samples):
+    samples = sorted(samples)
+    return {"ms": statistics.median(samples) * 1000, "p99_ms": samples[int(len(samples) * 0.99)] * 1000,
+            "calls": len(samples)}
+
+
+def bench_engine(repeat, calls=200):
+    from src.engine_wrapper import StockfishEngine
+
+    engine = StockfishEngine([sys.executable, FAKE_ENGINE], ponder=False, standby=False)
+    if not engine.start():
+        raise SystemExit("fake engine failed to start")
+    try:
+        boards = engine_positions(calls * repeat * 2)
+        direct, background = [], []
+        for board in boards[:calls * repeat]:
+            start = time.perf_counter()
+            engine.get_best_move(board)
+            direct.append(time.perf_counter() - start)
+        for board in boards[calls * repeat:]:
+            start = time.perf_counter()
+            search = engine.start_search(board)
+            search.join()
+            background.append(time.perf_counter() - start)
+    finally:
+        engine.quit()
+    return {"engine.get_best_move": latency(direct), "engine.background_search": latency(background)}
+
+
+BENCHMARKS = {"perft": bench_perft, "render": bench_render, "engine": bench_engine}
+
+
+def compare(results, baseline, threshold):
+    """Prints each result against the baseline and returns the names that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':34} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:34} {'-':>10} {result['ms']:10.2f}      new")
+            continue
+        before = baseline[name]["ms"]
+        change = result["ms"] / before - 1 if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:34} {before:10.2f} {result['ms']:10.2f} {change:+8.1%}{flag}")
+    for name in baseline:
+        if name not in results:
+            print(f"{name:34} {baseline[name]['ms']:10.2f} {'-':>10}  not run")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="Comma-separated groups to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results.json"))
+    parser.add_argument("--compare", metavar="BASELINE", help="Results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    groups = [group.strip() for group in args.only.split(",") if group.strip()]
+    for group in groups:
+        if group not in BENCHMARKS:
+            parser.error(f"unknown benchmark group: {group}")
+
+    results = {}
+    for group in groups:
+        group_results = BENCHMARKS[group](args.repeat)
+        for name, result in group_results.items():
+            extra = "  ".join(f"{key} {value:.1f}" if isinstance(value, float) else f"{key} {value}"
+                              for key, value in result.items() if key != "ms")
+            print(f"{name:34} {result['ms']:10.2f} ms   {extra}")
+        results.update(group_results)
+
+    report = {
+        "meta": {"date": datetime.datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(), "repeat": args.repeat},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,27 @@
+import argparse
 import sys
 import os
 from src.game_logic import ChessGame
 from src.gui import ChessGUI
-from src.engine_wrapper import StockfishEngine
 
 def main():
+    parser = argparse.ArgumentParser(description="Open Vantage Chess")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Time frames, events and engine searches and write the stats to PATH (.json or .csv) on exit")
+    parser.add_argument("--profile-frames", type=int, metavar="N",
+                        help="Run cProfile over the first N frames and save it to frames.prof")
+    parser.add_argument("--tc", default=None,
+                        help="Play on the clock: base+increment in seconds, e.g. 300+3 (default: untimed)")
+    args = parser.parse_args()
+
+    base_time, increment = None, 0.0
+    if args.tc:
+        base, _, inc = args.tc.partition("+")
+        try:
+            base_time, increment = float(base), float(inc or 0)
+        except ValueError:
+            parser.error(f"--tc must look like 300+3, not {args.tc!r}")
+
     # Try to find stockfish path
     # For now, we assume it's in the PATH or same directory
     # You can change this path to point to your stockfish executable
@@ -26,21 +43,60 @@ def main():
 
     print(f"Using Stockfish path: {stockfish_path}")
 
-    game = ChessGame()
-    engine = StockfishEngine(stockfish_path)
-    
-    # Start engine
-    if not engine.start():
-        print("WARNING: Stockfish engine not found or failed to start.")
-        print("Game will be Player vs Player (Hotseat).")
-        engine = None
+    game = ChessGame(base_time, increment)
+
+    # Optional index of a game collection (python -m src.position_index build ...)
+    position_index = None
+    if os.path.isdir("position_index"):
+        from src.position_index import PositionIndex
+        position_index = PositionIndex("position_index")
+
+    profiler = None
+    if args.profile or args.profile_frames:
+        from src.profiler import Profiler
+        profiler = Profiler()
+        if args.profile_frames:
+            profiler.profile_frames(args.profile_frames)
+
+    gui = ChessGUI(game, position_index=position_index, profiler=profiler)
+
+    def launch_engine():
+        # Runs on a worker thread while the board is already up, so the engine
+        # modules are imported here too
+        from src.engine_wrapper import StockfishEngine
+        from src.game_analysis import GameAnalyzer
+        engine = StockfishEngine(stockfish_path)
+
+        # Optional Polyglot opening book
+        for path in ["book.bin", "books/book.bin"]:
+            if os.path.exists(path):
+                from src.opening_book import OpeningBook
+                engine.book = OpeningBook(path)
+                print(f"Using opening book: {path}")
+                break
+
+        if not engine.start():
+            print("WARNING: Stockfish engine not found or failed to start.")
+            print("Game will be Player vs Player (Hotseat).")
+            return None
+        # Post-game analysis on its own engine processes, sharing the playing engine's cache
+        gui.analyzer = GameAnalyzer(stockfish_path, cache=engine.cache)
+        return engine
 
-    gui = ChessGUI(game, engine)
+    gui.connect_engine(launch_engine)
     try:
         gui.main_loop()
     finally:
-        if engine:
-            engine.quit()
+        gui.engine_thread.join() # A launch still in progress must finish before we can quit it
+        if gui.engine:
+            gui.engine.quit()
+        if gui.analyzer:
+            gui.analyzer.quit()
+        if position_index:
+            position_index.close()
+        if args.profile:
+            profiler.export(args.profile)
+            print(f"Profile written to {args.profile}")
 
 if __name__ == "__main__":
     main()
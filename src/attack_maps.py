@@ -0,0 +1,113 @@
+from collections import OrderedDict
+import chess
+import chess.polyglot
+
+from src.bitboard_stats import attack_counts, boards_to_bitboards
+
+SLIDERS = (chess.BISHOP, chess.ROOK, chess.QUEEN)
+
+
+class AttackMaps:
+    """Attack bitboards of every piece in one position, plus per-square attack counts.
+
+    A position from scratch is counted by src.bitboard_stats (from_board).
+    Maps that follow the game one move at a time are kept up to date
+    incrementally instead (see from_parent). Both are tested against
+    python-chess.
+    """
+
+    def __init__(self):
+        self.piece_attacks = {} # square -> (colour, attack bitboard)
+        self.white_counts = [0] * 64
+        self.black_counts = [0] * 64
+        self.surfaces = {} # Rendered overlays, filled in by the GUI
+
+    def _add(self, square, color, attacks):
+        self.piece_attacks[square] = (color, attacks)
+        counts = self.white_counts if color == chess.WHITE else self.black_counts
+        for target in chess.scan_forward(attacks):
+            counts[target] += 1
+
+    def _remove(self, square):
+        color, attacks = self.piece_attacks.pop(square)
+        counts = self.white_counts if color == chess.WHITE else self.black_counts
+        for target in chess.scan_forward(attacks):
+            counts[target] -= 1
+
+    @classmethod
+    def from_board(cls, board):
+        maps = cls()
+        for square, piece in board.piece_map().items():
+            maps.piece_attacks[square] = (piece.color, board.attacks_mask(square))
+        white, black = attack_counts(boards_to_bitboards([board]))
+        maps.white_counts = white[0].tolist()
+        maps.black_counts = black[0].tolist()
+        return maps
+
+    @classmethod
+    def from_parent(cls, parent, parent_board, board):
+        """Derives the maps for `board` from those of the position one move earlier.
+
+        Only pieces on squares that changed, and sliders whose rays touched
+        one of those squares, are recomputed.
+        """
+        changed = 0
+        for color in chess.COLORS:
+            changed |= parent_board.occupied_co[color] ^ board.occupied_co[color]
+        for piece_type in chess.PIECE_TYPES:
+            changed |= parent_board.pieces_mask(piece_type, chess.WHITE) ^ board.pieces_mask(piece_type, chess.WHITE)
+            changed |= parent_board.pieces_mask(piece_type, chess.BLACK) ^ board.pieces_mask(piece_type, chess.BLACK)
+
+        maps = cls()
+        maps.piece_attacks = dict(parent.piece_attacks)
+        maps.white_counts = list(parent.white_counts)
+        maps.black_counts = list(parent.black_counts)
+
+        stale = []
+        for square, (color, attacks) in maps.piece_attacks.items():
+            if changed & chess.BB_SQUARES[square]:
+                stale.append(square)
+            elif attacks & changed and parent_board.piece_type_at(square) in SLIDERS:
+                stale.append(square)
+        for square in stale:
+            maps._remove(square)
+
+        for square in chess.scan_forward(board.occupied):
+            if square not in maps.piece_attacks:
+                maps._add(square, board.color_at(square), board.attacks_mask(square))
+        return maps
+
+
+class AttackMapCache:
+    """Small LRU of AttackMaps keyed by Zobrist hash.
+
+    When a position is missing but the one before it is cached (a move was
+    pushed or popped during time travel), the new entry is derived
+    incrementally instead of from scratch.
+    """
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, board):
+        key = chess.polyglot.zobrist_hash(board)
+        maps = self.entries.get(key)
+        if maps is not None:
+            self.entries.move_to_end(key)
+            return maps
+
+        parent = None
+        if board.move_stack:
+            parent_board = board.copy(stack=1)
+            parent_board.pop()
+            parent = self.entries.get(chess.polyglot.zobrist_hash(parent_board))
+        if parent is not None:
+            maps = AttackMaps.from_parent(parent, parent_board, board)
+        else:
+            maps = AttackMaps.from_board(board)
+
+        self.entries[key] = maps
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return maps
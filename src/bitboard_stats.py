@@ -0,0 +1,173 @@
+"""Vectorized attack statistics over many positions at once.
+
+Positions are uint64 bitboard arrays of shape (N, 2, 6): colour (0 = White,
+1 = Black) by piece type (pawn .. king, as chess.PAWN - 1 .. chess.KING - 1).
+Attack counts are computed for all N positions together with NumPy shifts and
+masks. Sliding attacks use occluded (Kogge-Stone) fills, and each direction
+of a fill reaches a square from at most one slider. The per-square counts
+are therefore exactly what summing python-chess's board.attacks() over all
+pieces gives.
+
+    python -m src.bitboard_stats games.pgn|games.bin
+"""
+import argparse
+
+import chess
+import numpy as np
+
+WHITE, BLACK = 0, 1
+
+FULL = np.uint64(0xFFFFFFFFFFFFFFFF)
+NOT_A = np.uint64(~chess.BB_FILE_A & 0xFFFFFFFFFFFFFFFF)
+NOT_H = np.uint64(~chess.BB_FILE_H & 0xFFFFFFFFFFFFFFFF)
+NOT_AB = np.uint64(~(chess.BB_FILE_A | chess.BB_FILE_B) & 0xFFFFFFFFFFFFFFFF)
+NOT_GH = np.uint64(~(chess.BB_FILE_G | chess.BB_FILE_H) & 0xFFFFFFFFFFFFFFFF)
+
+# (shift, mask applied after shifting) - the mask drops bits that wrapped around a board edge
+ROOK_DIRECTIONS = [(8, FULL), (-8, FULL), (1, NOT_A), (-1, NOT_H)]
+BISHOP_DIRECTIONS = [(9, NOT_A), (7, NOT_H), (-7, NOT_A), (-9, NOT_H)]
+KING_STEPS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+KNIGHT_STEPS = [(17, NOT_A), (15, NOT_H), (10, NOT_AB), (6, NOT_GH),
+                (-6, NOT_AB), (-10, NOT_GH), (-15, NOT_A), (-17, NOT_H)]
+PAWN_STEPS = {WHITE: [(9, NOT_A), (7, NOT_H)], BLACK: [(-7, NOT_A), (-9, NOT_H)]}
+
+SQUARE_BITS = np.uint64(1) << np.arange(64, dtype=np.uint64)
+
+
+def _shift(bb, amount):
+    if amount > 0:
+        return bb << np.uint64(amount)
+    return bb >> np.uint64(-amount)
+
+
+def _occluded_fill(gen, empty, amount, mask):
+    """Squares reachable from `gen` through `empty` squares in one direction (Kogge-Stone)."""
+    empty = empty & mask
+    gen = gen | (empty & _shift(gen, amount))
+    empty = empty & _shift(empty, amount)
+    gen = gen | (empty & _shift(gen, 2 * amount))
+    empty = empty & _shift(empty, 2 * amount)
+    return gen | (empty & _shift(gen, 4 * amount))
+
+
+def _add_bits(counts, bb):
+    # counts[n, sq] += bit sq of bb[n]
+    counts += (bb[:, None] & SQUARE_BITS) != 0
+
+
+def boards_to_bitboards(boards):
+    """Packs python-chess boards into a (N, 2, 6) uint64 array."""
+    boards = list(boards)
+    out = np.zeros((len(boards), 2, 6), dtype=np.uint64)
+    for n, board in enumerate(boards):
+        for ci, color in ((WHITE, chess.WHITE), (BLACK, chess.BLACK)):
+            for piece_type in chess.PIECE_TYPES:
+                out[n, ci, piece_type - 1] = board.pieces_mask(piece_type, color)
+    return out
+
+
+def attack_counts(bitboards):
+    """Per-square attack counts, as two (N, 64) uint8 arrays for White and Black."""
+    bitboards = np.asarray(bitboards, dtype=np.uint64)
+    n = bitboards.shape[0]
+    occupied = np.bitwise_or.reduce(bitboards.reshape(n, 12), axis=1)
+    empty = ~occupied
+
+    result = []
+    for ci in (WHITE, BLACK):
+        pawns, knights, bishops, rooks, queens, kings = (bitboards[:, ci, i] for i in range(6))
+        counts = np.zeros((n, 64), dtype=np.uint8)
+        for amount, mask in PAWN_STEPS[ci]:
+            _add_bits(counts, _shift(pawns, amount) & mask)
+        for amount, mask in KNIGHT_STEPS:
+            _add_bits(counts, _shift(knights, amount) & mask)
+        for amount, mask in KING_STEPS:
+            _add_bits(counts, _shift(kings, amount) & mask)
+        for sliders, directions in ((rooks | queens, ROOK_DIRECTIONS), (bishops | queens, BISHOP_DIRECTIONS)):
+            for amount, mask in directions:
+                fill = _occluded_fill(sliders, empty, amount, mask)
+                _add_bits(counts, _shift(fill, amount) & mask)
+        result.append(counts)
+    return result[0], result[1]
+
+
+class ControlHeatmap:
+    """Accumulates attack statistics over any number of positions."""
+
+    def __init__(self):
+        self.positions = 0
+        self.white_attacks = np.zeros(64, dtype=np.int64)
+        self.black_attacks = np.zeros(64, dtype=np.int64)
+        self.white_control = np.zeros(64, dtype=np.int64) # Positions where White attacks a square more often
+        self.black_control = np.zeros(64, dtype=np.int64)
+
+    def add(self, bitboards):
+        white, black = attack_counts(bitboards)
+        self.positions += white.shape[0]
+        self.white_attacks += white.sum(axis=0, dtype=np.int64)
+        self.black_attacks += black.sum(axis=0, dtype=np.int64)
+        self.white_control += (white > black).sum(axis=0)
+        self.black_control += (black > white).sum(axis=0)
+
+    def add_boards(self, boards, batch_size=4096):
+        batch = []
+        for board in boards:
+            batch.append(board)
+            if len(batch) >= batch_size:
+                self.add(boards_to_bitboards(batch))
+                batch = []
+        if batch:
+            self.add(boards_to_bitboards(batch))
+
+    def summary(self):
+        """Per-square averages over all positions added, each a (64,) float array."""
+        total = max(self.positions, 1)
+        return {
+            "positions": self.positions,
+            "white_attacks": self.white_attacks / total,
+            "black_attacks": self.black_attacks / total,
+            "white_control": self.white_control / total,
+            "black_control": self.black_control / total,
+        }
+
+
+def game_positions(moves, fen=None):
+    """Yields every position of a game (a copy per position)."""
+    board = chess.Board(fen) if fen else chess.Board()
+    yield board.copy(stack=False)
+    for move in moves:
+        board.push(move)
+        yield board.copy(stack=False)
+
+
+def main():
+    from src.game_records import GameRecordFile
+    from src.pgn_stream import PgnReader, unpack_move
+
+    parser = argparse.ArgumentParser(description="Square control heatmap over a game collection.")
+    parser.add_argument("source", help="PGN file or binary game record file")
+    args = parser.parse_args()
+
+    def positions():
+        if args.source.endswith(".pgn"):
+            for record in PgnReader(args.source).records():
+                yield from game_positions([unpack_move(v) for v in record.moves], record.headers.get("FEN"))
+        else:
+            with GameRecordFile(args.source) as records:
+                for n in range(len(records)):
+                    fen = records.fen(n)
+                    yield from game_positions([unpack_move(v) for v in records.moves(n)],
+                                              None if fen == chess.STARTING_FEN else fen)
+
+    heatmap = ControlHeatmap()
+    heatmap.add_boards(positions())
+    summary = heatmap.summary()
+    print(f"{summary['positions']} positions. Share of positions where White (+) or Black (-) controls each square:")
+    for rank in range(7, -1, -1):
+        row = [summary["white_control"][chess.square(f, rank)] - summary["black_control"][chess.square(f, rank)] for f in range(8)]
+        print(f"{rank + 1} " + " ".join(f"{value:+.2f}" for value in row))
+    print("  " + " ".join(f"{f:^5}" for f in "abcdefgh"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""Draws chess positions onto any pygame Surface, with or without a window.
+
+BoardRenderer builds the empty board, the square highlights and the piece
+glyphs once and reuses them for every position it draws; ChessGUI draws
+through one. The batch mode renders position thumbnails or every position
+of whole games to image files on a pool of worker processes, each with its
+own renderer, using the SDL dummy video driver:
+
+    python -m src.board_renderer games.pgn --out frames [--size 40] [--workers 4] [--gif] [--heat] [--lines]
+    python -m src.board_renderer positions.txt --out thumbs [--format jpg]
+
+Games (PGN or binary game records) become a numbered image per position in
+a directory per game, or one animated GIF per game with --gif (needs
+Pillow). Any other file is read as one FEN per line, giving one image per
+position; a job that cannot be drawn (a malformed FEN, say) is reported and
+skipped. Drawing a position takes well under a millisecond once the
+caches are warm; encoding the image is most of the cost, and PNG is by far
+the slowest format to write.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+import chess
+import pygame
+
+LIGHT_SQUARE = (240, 217, 181)
+DARK_SQUARE = (181, 136, 99)
+HIGHLIGHT = (186, 202, 68)
+LAST_MOVE = (205, 210, 106)
+
+
+class BoardRenderer:
+    def __init__(self, square_size=75, font=None):
+        self.square_size = square_size
+        self.board_size = 8 * square_size
+        if font is None:
+            pygame.font.init()
+            font = pygame.font.SysFont("segoeuisymbol", square_size * 2 // 3) # A font with chess symbols
+        self.font = font
+        # Render caches (see draw_board / get_glyph)
+        self.board_surface = None
+        self.glyph_cache = {}
+        self.attack_cache = None # Created with the first overlay
+
+    def square_origin(self, square, origin=(0, 0)):
+        """Top-left corner of a square, for a board drawn at `origin`."""
+        x = origin[0] + chess.square_file(square) * self.square_size
+        y = origin[1] + (7 - chess.square_rank(square)) * self.square_size
+        return x, y
+
+    def build_board_surfaces(self):
+        self.board_surface = pygame.Surface((self.board_size, self.board_size))
+        for row in range(8):
+            for col in range(8):
+                is_light_square = (row + col) % 2 == 0
+                bg_color = LIGHT_SQUARE if is_light_square else DARK_SQUARE
+                rect = pygame.Rect(col * self.square_size, row * self.square_size, self.square_size, self.square_size)
+                pygame.draw.rect(self.board_surface, bg_color, rect)
+
+        self.highlight_surface = pygame.Surface((self.square_size, self.square_size))
+        self.highlight_surface.set_alpha(180)
+        self.highlight_surface.fill(HIGHLIGHT)
+        self.last_move_surface = pygame.Surface((self.square_size, self.square_size))
+        self.last_move_surface.set_alpha(180)
+        self.last_move_surface.fill(LAST_MOVE)
+
+    def draw_board(self, surface, origin=(0, 0), selected=None, last_move=None):
+        """The squares, with the `selected` square and the `last_move` highlighted."""
+        # The empty board never changes, so it is rendered once and blitted each time
+        if self.board_surface is None:
+            self.build_board_surfaces()
+        surface.blit(self.board_surface, origin)
+
+        if selected is not None:
+            surface.blit(self.highlight_surface, self.square_origin(selected, origin))
+        if last_move:
+            for square in (last_move.from_square, last_move.to_square):
+                # Selection highlight wins over the last move
+                if square != selected:
+                    surface.blit(self.last_move_surface, self.square_origin(square, origin))
+
+    def get_glyph(self, piece):
+        """Piece glyph with its outline, rendered once per font/square size.
+
+        Returns the surface and its offset from the square centre.
+        """
+        key = (piece.symbol(), self.font.get_height(), self.square_size)
+        glyph = self.glyph_cache.get(key)
+        if glyph is None:
+            symbol = piece.unicode_symbol()
+            # Determine piece color
+            if piece.color == chess.WHITE:
+                text_color = (255, 255, 255) # White
+                outline_color = (0, 0, 0) # Black outline for visibility on white squares
+            else:
+                text_color = (0, 0, 0) # Black
+                outline_color = (255, 255, 255) # White outline for contrast (mostly for black on black)
+
+            text_surface = self.font.render(symbol, True, text_color)
+            outline_surface = self.font.render(symbol, True, outline_color)
+            w, h = text_surface.get_size()
+
+            # Outline offsets span x -1..1 and y -1..2, so pad the glyph by that much
+            glyph_surface = pygame.Surface((w + 2, h + 3), pygame.SRCALPHA)
+            for dx, dy in [(-1, -1), (-1, 1), (1, -1), (1, 1), (0, 2)]: # Shadow/Stroke
+                glyph_surface.blit(outline_surface, (1 + dx, 1 + dy))
+            glyph_surface.blit(text_surface, (1, 1))
+
+            glyph = (glyph_surface, (-1 - w // 2, -1 - h // 2))
+            self.glyph_cache[key] = glyph
+        return glyph
+
+    def draw_pieces(self, surface, board, origin=(0, 0)):
+        half = self.square_size // 2
+        for square, piece in board.piece_map().items():
+            glyph, (dx, dy) = self.get_glyph(piece)
+            x, y = self.square_origin(square, origin)
+            surface.blit(glyph, (x + half + dx, y + half + dy))
+
+    def draw_overlays(self, surface, board, origin=(0, 0), heat=False, lines=False):
+        """Square control heatmap and/or lines from each piece to the squares it attacks."""
+        if not (heat or lines):
+            return
+        # Attack maps and rendered overlays are cached per position, so a static
+        # position costs one blit per overlay
+        if self.attack_cache is None:
+            from src.attack_maps import AttackMapCache
+            self.attack_cache = AttackMapCache()
+        maps = self.attack_cache.get(board)
+
+        # 1. Heatmap (Colored Transparent Overlays)
+        if heat:
+            if "heat" not in maps.surfaces:
+                maps.surfaces["heat"] = self.render_heat_surface(maps)
+            surface.blit(maps.surfaces["heat"], origin)
+
+        # 2. Scope Lines
+        if lines:
+            if "lines" not in maps.surfaces:
+                maps.surfaces["lines"] = self.render_lines_surface(maps)
+            surface.blit(maps.surfaces["lines"], origin)
+
+    def render_heat_surface(self, maps):
+        size = self.square_size
+        surface = pygame.Surface((self.board_size, self.board_size), pygame.SRCALPHA)
+        for sq in chess.SQUARES:
+            w_count = maps.white_counts[sq]
+            b_count = maps.black_counts[sq]
+            if w_count == 0 and b_count == 0:
+                continue
+
+            x, y = self.square_origin(sq)
+
+            # If only White attacks -> Blue, only Black -> Red, both -> mix by ratio
+            total_attacks = w_count + b_count
+            intensity = min(200, 40 + total_attacks * 30)
+
+            color_r = int(255 * b_count / total_attacks) # Black is Red
+            color_b = int(255 * w_count / total_attacks) # White is Blue
+            color_g = 0
+
+            # Fix for purely blue or red to look nice
+            if b_count == 0: color_b = 50 # slight tint
+            if w_count == 0: color_r = 50
+
+            surface.fill((color_r, color_g, color_b, intensity), pygame.Rect(x, y, size, size))
+        return surface
+
+    def render_lines_surface(self, maps):
+        # Lines run between square centres, so a board-sized surface is enough
+        half = self.square_size // 2
+        surface = pygame.Surface((self.board_size, self.board_size), pygame.SRCALPHA)
+        # Square order, so overlapping lines come out the same whichever way the maps were built
+        for sq, (color, attacks) in sorted(maps.piece_attacks.items()):
+            x, y = self.square_origin(sq)
+            start_pos = (x + half, y + half)
+
+            # Line Color based on piece color
+            if color == chess.WHITE:
+                line_color = (100, 100, 255, 80) # Blue, semi-transparent
+            else:
+                line_color = (255, 100, 100, 80) # Red, semi-transparent
+
+            for target in chess.scan_forward(attacks):
+                x, y = self.square_origin(target)
+                pygame.draw.line(surface, line_color, start_pos, (x + half, y + half), 2)
+        return surface
+
+    def render(self, board, last_move=None, heat=False, lines=False, surface=None):
+        """Draws `board` onto `surface` (default: a new board-sized Surface) and returns it.
+
+        The last move is highlighted: `last_move` if given, else the top of the board's move stack.
+        """
+        if surface is None:
+            surface = pygame.Surface((self.board_size, self.board_size))
+        if last_move is None and board.move_stack:
+            last_move = board.peek()
+        self.draw_board(surface, last_move=last_move)
+        self.draw_overlays(surface, board, heat=heat, lines=lines)
+        self.draw_pieces(surface, board)
+        return surface
+
+
+# Per worker process: the renderer (and its caches) and the batch settings
+_renderer = None
+_options = None
+
+
+def _init_worker(options):
+    global _renderer, _options
+    _options = options
+    _renderer = BoardRenderer(options["square_size"])
+
+
+def save_gif(surfaces, path, frame_ms):
+    from PIL import Image
+    frames = [Image.frombytes("RGB", s.get_size(), pygame.image.tobytes(s, "RGB")) for s in surfaces]
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=frame_ms, loop=0)
+
+
+def render_job(job):
+    """Renders one job in a worker and returns (images drawn, error message or None).
+
+    A job is (name, fen, moves): a single position when `moves` is None,
+    else every position of the game played from `fen` (None: the start).
+    """
+    try:
+        return _render_job(*job), None
+    except ValueError as e:
+        return 0, f"{job[0]}: {e}"
+
+
+def _render_job(name, fen, moves):
+    out, heat, lines = _options["out"], _options["heat"], _options["lines"]
+    board = chess.Board(fen) if fen else chess.Board()
+    if moves is None:
+        pygame.image.save(_renderer.render(board, heat=heat, lines=lines), os.path.join(out, f"{name}.{_options['format']}"))
+        return 1
+
+    positions = [(board.copy(stack=False), None)]
+    for move in moves:
+        board.push(move)
+        positions.append((board.copy(stack=False), move))
+    if _options["gif"]:
+        surfaces = [_renderer.render(position, move, heat, lines) for position, move in positions]
+        save_gif(surfaces, os.path.join(out, f"{name}.gif"), _options["frame_ms"])
+    else:
+        directory = os.path.join(out, name)
+        os.makedirs(directory, exist_ok=True)
+        surface = pygame.Surface((_renderer.board_size, _renderer.board_size)) # Reused for every frame
+        for ply, (position, move) in enumerate(positions):
+            _renderer.render(position, move, heat, lines, surface)
+            pygame.image.save(surface, os.path.join(directory, f"{ply:03d}.{_options['format']}"))
+    return len(positions)
+
+
+def render_batch(jobs, out, workers=None, square_size=40, heat=False, lines=False, gif=False, frame_ms=500,
+                 image_format="png"):
+    """Renders every job (see render_job) into the directory `out` and returns a summary dict.
+
+    `image_format` is any file extension pygame can save: png, jpg, bmp or tga.
+    """
+    os.makedirs(out, exist_ok=True)
+    options = {"out": out, "square_size": square_size, "heat": heat, "lines": lines, "gif": gif,
+               "frame_ms": frame_ms, "format": image_format}
+    workers = workers or multiprocessing.cpu_count()
+    start = time.perf_counter()
+    count = images = 0
+    errors = []
+    if workers <= 1:
+        _init_worker(options)
+        results = map(render_job, jobs)
+    else:
+        # Spawned, not forked: a fork would copy the parent's pygame and SDL state
+        pool = multiprocessing.get_context("spawn").Pool(workers, initializer=_init_worker, initargs=(options,))
+        # Many jobs per task: a thumbnail takes about a millisecond to draw and save
+        results = pool.imap_unordered(render_job, jobs, chunksize=16)
+    try:
+        for drawn, error in results:
+            count += 1
+            images += drawn
+            if error:
+                errors.append(error)
+    finally:
+        if workers > 1:
+            pool.close()
+            pool.join()
+    elapsed = time.perf_counter() - start
+    return {"jobs": count, "images": images, "errors": errors, "seconds": elapsed,
+            "images_per_second": images / elapsed if elapsed > 0 else 0.0}
+
+
+def read_jobs(source):
+    """Jobs for every game in a PGN or game record file, or every FEN in a text file."""
+    from src.pgn_stream import unpack_move
+    if source.endswith(".pgn"):
+        from src.pgn_stream import PgnReader
+        for n, record in enumerate(PgnReader(source).records()):
+            yield f"game{n:05d}", record.headers.get("FEN"), [unpack_move(v) for v in record.moves]
+    elif source.endswith(".bin"):
+        from src.game_records import GameRecordFile
+        with GameRecordFile(source) as records:
+            for n in range(len(records)):
+                yield f"game{n:05d}", records.fen(n), [unpack_move(v) for v in records.moves(n)]
+    else:
+        with open(source) as f:
+            for n, line in enumerate(line for line in f if line.strip()):
+                yield f"pos{n:06d}", line.strip(), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render positions or whole games to image files.")
+    parser.add_argument("source", help="PGN file, binary game record file (.bin) or text file of FENs")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--size", type=int, default=40, help="Square size in pixels")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--heat", action="store_true", help="Draw the square control heatmap")
+    parser.add_argument("--lines", action="store_true", help="Draw the attack lines")
+    parser.add_argument("--format", default="png", choices=["png", "jpg", "bmp", "tga"], help="Image format")
+    parser.add_argument("--gif", action="store_true", help="One animated GIF per game instead of an image per position")
+    parser.add_argument("--frame-ms", type=int, default=500, help="GIF frame duration")
+    args = parser.parse_args()
+    if args.gif:
+        try:
+            import PIL # noqa: F401
+        except ImportError:
+            parser.error("--gif needs Pillow (pip install pillow); other formats work without it")
+
+    summary = render_batch(read_jobs(args.source), args.out, args.workers, args.size,
+                           args.heat, args.lines, args.gif, args.frame_ms, args.format)
+    for error in summary["errors"]:
+        print(f"Skipped {error}")
+    print(f"{summary['images']} images ({summary['jobs']} jobs) in {summary['seconds']:.2f}s: "
+          f"{summary['images_per_second']:.0f} images/s")
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    main()
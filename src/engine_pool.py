@@ -0,0 +1,120 @@
+"""A pool of UCI engine processes for batch analysis.
+
+All engines are driven from one asyncio event loop running on a background
+thread, using python-chess's async engine API, so the Python side stays
+light while the engine processes do the work in parallel.
+"""
+import asyncio
+import os
+import threading
+from collections import namedtuple
+
+import chess
+import chess.engine
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional; results fall back to plain lists
+    np = None
+
+# Scores are from White's point of view. Mates are also folded into `cp` as
+# +/-MATE_SCORE so the array sorts sensibly; `mate` keeps the distance (0 = no mate).
+BatchResult = namedtuple("BatchResult", ["cp", "mate", "moves"])
+MATE_SCORE = 32000
+
+
+class EnginePool:
+    def __init__(self, engine_path="stockfish", size=None, threads=1, hash_mb=64):
+        self.engine_path = engine_path
+        self.threads = threads
+        self.hash_mb = hash_mb
+        # One engine per `threads` cores by default
+        self.size = size or max(1, (os.cpu_count() or 1) // threads)
+        self.engines = []
+        self.loop = None
+        self._thread = None
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        try:
+            self._call(self._start_engines())
+            print(f"Engine pool started: {self.size} x {self.engine_path} (Threads={self.threads}, Hash={self.hash_mb}MB)")
+            return True
+        except Exception as e:
+            print(f"Failed to start engine pool: {e}")
+            self.quit()
+            return False
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def _start_engines(self):
+        async def start_one():
+            transport, engine = await chess.engine.popen_uci(self.engine_path)
+            options = {}
+            if "Threads" in engine.options:
+                options["Threads"] = self.threads
+            if "Hash" in engine.options and self.hash_mb:
+                options["Hash"] = self.hash_mb
+            await engine.configure(options)
+            return engine
+
+        self.engines = await asyncio.gather(*[start_one() for _ in range(self.size)])
+
+    def evaluate_many(self, fens, limit):
+        """Analyses every FEN with `limit` and returns a BatchResult in input order."""
+        return self.submit(fens, limit).result()
+
+    def submit(self, fens, limit, on_result=None):
+        """Starts analysing every FEN and returns a concurrent.futures.Future of the BatchResult.
+
+        `on_result(index, info)` is called on the pool thread as soon as each
+        position is done, with python-chess's analysis info. Cancelling the
+        future stops the remaining work.
+        """
+        boards = [chess.Board(fen) for fen in fens] # Bad FENs fail here, before any work starts
+        return asyncio.run_coroutine_threadsafe(self._evaluate(boards, limit, on_result), self.loop)
+
+    async def _evaluate(self, boards, limit, on_result=None):
+        n = len(boards)
+        cp = [0] * n
+        mate = [0] * n
+        moves = [""] * n
+        next_index = iter(range(n))
+
+        async def worker(engine):
+            # Each engine pulls the next position as soon as it is free
+            for i in next_index:
+                info = await engine.analyse(boards[i], limit)
+                score = info.get("score")
+                if score is not None:
+                    white = score.white()
+                    cp[i] = white.score(mate_score=MATE_SCORE)
+                    mate[i] = white.mate() or 0
+                pv = info.get("pv")
+                if pv:
+                    moves[i] = pv[0].uci()
+                if on_result is not None:
+                    on_result(i, info)
+
+        await asyncio.gather(*[worker(engine) for engine in self.engines])
+
+        if np is not None:
+            return BatchResult(np.array(cp, dtype=np.int32), np.array(mate, dtype=np.int32), np.array(moves, dtype="<U5"))
+        return BatchResult(cp, mate, moves)
+
+    def quit(self):
+        if self.loop is None:
+            return
+        if self.engines:
+            try:
+                self._call(asyncio.gather(*[engine.quit() for engine in self.engines], return_exceptions=True))
+            except Exception:
+                pass
+            self.engines = []
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self.loop = None
@@ -0,0 +1,216 @@
+"""Keeps a working UCI engine process behind StockfishEngine.
+
+A standby process is launched and configured next to the primary one. When
+the primary crashes, or a call overruns its deadline, the primary is killed,
+the standby takes over at once and a new standby is started in the
+background. Without a ready standby a new primary is started in the
+background too, and there is no engine until it is up; callers never wait
+on a process launch. Threads and Hash are sized from the machine unless given.
+"""
+import asyncio
+import ctypes
+import os
+import sys
+import threading
+
+import chess.engine
+
+# Everything a dead or hung engine can raise at the caller
+ENGINE_FAILURES = (chess.engine.EngineError, asyncio.TimeoutError, TimeoutError)
+
+
+def machine_memory_mb():
+    """Physical memory in MB, or None if it cannot be determined."""
+    if sys.platform == "win32":
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(MemoryStatus)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys // (1024 * 1024)
+        return None
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def auto_options(engine_options, processes=1, cpus=None, memory_mb=None):
+    """Threads and Hash for this machine, within the limits the engine reports.
+
+    One core is left to the GUI. The Hash budget is 1/16 of physical memory
+    (at most 2 GB), split between `processes` and rounded down to a power of two.
+    """
+    def clamp(name, value):
+        option = engine_options[name]
+        if option.min is not None:
+            value = max(option.min, value)
+        if option.max is not None:
+            value = min(option.max, value)
+        return value
+
+    options = {}
+    cpus = cpus or os.cpu_count() or 1
+    if "Threads" in engine_options:
+        options["Threads"] = clamp("Threads", max(1, cpus - 1))
+    memory_mb = memory_mb or machine_memory_mb()
+    if "Hash" in engine_options and memory_mb:
+        budget = max(16, min(memory_mb // 16, 2048) // processes)
+        options["Hash"] = clamp("Hash", 1 << (budget.bit_length() - 1))
+    return options
+
+
+class EngineSupervisor:
+    def __init__(self, engine_path="stockfish", standby=True, options=None, timeout=2.0):
+        self.engine_path = engine_path
+        self.use_standby = standby
+        self.options = options # None: sized by auto_options() on start
+        # Seconds a call may overrun its own time limit before the engine counts as hung
+        self.timeout = timeout
+        self.primary = None
+        self.standby = None
+        self.failovers = 0
+        self.closed = False
+        self.restarting = False # A new primary is being launched in the background
+        self.on_status = None # Called with "connecting", "ready" or "failed" around such a restart
+        self.timers = set() # Pending watch() timers, cancelled on quit
+        self.lock = threading.RLock()
+
+    def launch(self):
+        """Starts and configures one engine process."""
+        engine = chess.engine.SimpleEngine.popen_uci(self.engine_path)
+        if self.options is None:
+            self.options = auto_options(engine.options, processes=2 if self.use_standby else 1)
+        if self.options:
+            engine.configure(self.options)
+        # The handshake may take a while (network loading); every later call may not
+        engine.timeout = self.timeout
+        return engine
+
+    def start(self):
+        self.primary = self.launch()
+        self._spawn_standby()
+
+    def _spawn_standby(self):
+        if not self.use_standby or self.closed:
+            return
+
+        def run():
+            try:
+                engine = self.launch()
+            except Exception as e:
+                print(f"Failed to start standby engine: {e}")
+                return
+            with self.lock:
+                if self.closed or self.standby is not None:
+                    self._kill(engine)
+                else:
+                    self.standby = engine
+
+        threading.Thread(target=run, daemon=True).start()
+
+    @property
+    def engine(self):
+        return self.primary
+
+    def is_alive(self, engine):
+        return engine is not None and not engine.protocol.returncode.done()
+
+    def ensure_alive(self):
+        """Fails over straight away if the primary process has exited.
+
+        Returns the engine to use, or None while a new one is still starting.
+        """
+        if self.primary is not None and not self.is_alive(self.primary):
+            self.failover(self.primary, "process exited")
+        return self.primary
+
+    def failover(self, failed, reason):
+        """Replaces `failed` if it is still the primary, and returns the engine to use now.
+
+        Several callers may notice the same failure; only the first one swaps.
+        """
+        with self.lock:
+            if failed is not self.primary or self.closed:
+                return self.primary
+            standby, self.standby = self.standby, None
+            if standby is not None and not self.is_alive(standby):
+                standby = None
+            print(f"Engine {reason}; switching to {'standby' if standby else 'a new'} engine")
+            self._kill(failed)
+            self.primary = standby
+            self.failovers += 1
+            if standby is None:
+                self._restart()
+                return None
+        self._spawn_standby()
+        return self.primary
+
+    def _restart(self):
+        """No warm standby: launches a new primary on a worker thread."""
+        self.restarting = True
+        self._report("connecting")
+
+        def run():
+            try:
+                engine = self.launch()
+            except Exception as e:
+                print(f"Failed to restart engine: {e}")
+                engine = None
+            with self.lock:
+                self.restarting = False
+                if self.closed:
+                    if engine is not None:
+                        self._kill(engine)
+                    return
+                self.primary = engine
+            self._report("ready" if engine else "failed")
+            if engine is not None:
+                self._spawn_standby()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _report(self, status):
+        if self.on_status:
+            self.on_status(status)
+
+    def watch(self, seconds, check):
+        """Calls `check()` after `seconds` on a timer thread, unless quit() comes first."""
+        def fire():
+            with self.lock:
+                self.timers.discard(timer)
+                if self.closed:
+                    return
+            check()
+
+        timer = threading.Timer(seconds, fire)
+        timer.daemon = True
+        with self.lock:
+            if self.closed:
+                return
+            self.timers.add(timer)
+        timer.start()
+
+    def _kill(self, engine):
+        try:
+            engine.close() # Kills the process without waiting for it to answer
+        except Exception:
+            pass
+
+    def quit(self):
+        with self.lock:
+            self.closed = True
+            engines = [engine for engine in (self.primary, self.standby) if engine is not None]
+            self.primary = self.standby = None
+            timers, self.timers = self.timers, set()
+        for timer in timers:
+            timer.cancel()
+        for engine in engines:
+            try:
+                engine.quit()
+            except Exception:
+                self._kill(engine) # Hung or already gone
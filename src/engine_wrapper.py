@@ -1,36 +1,434 @@
 import chess
 import chess.engine
 import os
+import threading
+import time
+from src.engine_supervisor import ENGINE_FAILURES, EngineSupervisor
+from src.transposition import TranspositionCache
+
+def clock_limit(board, clock, default):
+    """Search limit for the side to move: `default` in untimed games, else a share of its clock."""
+    if clock is None:
+        return default
+    if board.legal_moves.count() == 1:
+        return chess.engine.Limit(time=0.01) # Forced move, nothing to think about
+    remaining = clock.time_left(board.turn)
+    # Assume the game lasts ~40 moves, but always budget for at least 10 more
+    moves_left = max(10, 40 - board.fullmove_number)
+    budget = remaining / moves_left + clock.increment * 0.75
+    # Never spend more than half the clock, and keep a safety margin for overhead
+    budget = min(budget, remaining * 0.5, max(remaining - 0.1, 0.0))
+    return chess.engine.Limit(time=max(budget, 0.01))
+
 
 class StockfishEngine:
-    def __init__(self, engine_path="stockfish"):
+    def __init__(self, engine_path="stockfish", ponder=True, cache=None, book=None, standby=True, options=None):
         self.engine_path = engine_path
-        self.engine = None
-        self.limit = chess.engine.Limit(time=0.1) # Fast move for GUI responsiveness
+        # Owns the engine process(es): timeouts, failover to a standby, Threads/Hash sizing
+        self.supervisor = EngineSupervisor(engine_path, standby=standby, options=options)
+        self.book = book # Optional OpeningBook, tried before searching
+        # Results for positions we have already searched (time travel revisits them)
+        self.cache = cache if cache is not None else TranspositionCache()
+        self.limit = chess.engine.Limit(time=1.0) # Used for untimed games
+        self.ponder_enabled = ponder
+        self.ponder_search = None
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        self.ponder_saved = 0.0 # Seconds of search already done when a ponderhit arrived
+        self.profiler = None # Optional Profiler timing each search
+
+    @property
+    def engine(self):
+        """The current engine process (a python-chess SimpleEngine), or None."""
+        return self.supervisor.engine
+
+    @property
+    def available(self):
+        return self.supervisor.engine is not None
+
+    @property
+    def connecting(self):
+        """True while a crashed engine is being replaced in the background."""
+        return self.supervisor.restarting
 
     def start(self):
         try:
-            self.engine = chess.engine.SimpleEngine.popen_uci(self.engine_path)
-            # Try to verify by pinging or setting option
-            # self.engine.configure({"Threads": 2})
-            print(f"Engine started: {self.engine_path}")
+            self.supervisor.start()
+            options = ", ".join(f"{name}={value}" for name, value in self.supervisor.options.items())
+            print(f"Engine started: {self.engine_path}" + (f" ({options})" if options else ""))
             return True
         except Exception as e:
             print(f"Failed to start engine: {e}")
-            self.engine = None
             return False
 
-    def get_best_move(self, board):
+    def get_best_move(self, board, clock=None):
         if not self.engine:
             return None
-        try:
-            result = self.engine.play(board, self.limit)
-            return result.move
-        except Exception as e:
-            print(f"Engine error: {e}")
+        book_move = self.book_move(board)
+        if book_move:
+            return book_move
+        limit = self.limit_for(board, clock)
+        entry = self.cache.lookup(board, limit)
+        if entry:
+            return entry.move
+        engine = self.supervisor.ensure_alive()
+        if engine is None:
+            return None
+        for attempt in range(2):
+            try:
+                start = time.perf_counter()
+                result = engine.play(board, limit, info=chess.engine.INFO_BASIC | chess.engine.INFO_SCORE)
+                if self.profiler:
+                    self.profiler.record_search(time.perf_counter() - start, result.info)
+                self.cache.store(board, limit, result.move, result.ponder,
+                                 result.info.get("score"), result.info.get("depth"))
+                return result.move
+            except ENGINE_FAILURES as e:
+                if attempt or engine is None:
+                    print(f"Engine error: {e}")
+                    return None
+                # Crashed or hung (the per-call timeout fired): try once more on the standby
+                engine = self.supervisor.failover(engine, f"failed ({str(e) or type(e).__name__})")
+                if engine is None:
+                    return None # No standby: a new engine is still starting
+            except Exception as e:
+                print(f"Engine error: {e}")
+                return None
+
+    def book_move(self, board):
+        if self.book is None:
+            return None
+        move = self.book.choose(board)
+        # Books can be corrupt or keyed for another variant
+        if move is not None and move in board.legal_moves:
+            return move
+        return None
+
+    def limit_for(self, board, clock=None):
+        """Sizes the search for the side to move from its remaining clock time."""
+        return clock_limit(board, clock, self.limit)
+
+    def start_search(self, board, clock=None, on_done=None):
+        """Starts a search on a worker thread and returns the BackgroundSearch handle.
+
+        `on_done` is called from the worker thread when the search finishes.
+        """
+        if not self.supervisor.ensure_alive():
+            return None
+        book_move = self.book_move(board)
+        if book_move:
+            self.stop_ponder()
+            return BackgroundSearch.finished(self, board, book_move)
+
+        limit = self.limit_for(board, clock)
+
+        entry = self.cache.lookup(board, limit)
+        if entry:
+            self.stop_ponder()
+            return BackgroundSearch.finished(self, board, entry.move, entry.ponder)
+
+        # Ponderhit: we have already been thinking about this exact position
+        pondered = self.ponder_search
+        self.ponder_search = None
+        if pondered is not None:
+            if not pondered.is_stale(board):
+                self.ponder_hits += 1
+                budget = limit.time or 0.0
+                self.ponder_saved += min(pondered.elapsed(), budget)
+                pondered.on_done = on_done
+                pondered.stop_after(budget)
+                return pondered
+            self.ponder_misses += 1
+            pondered.cancel()
+
+        search = BackgroundSearch(self, board, limit, on_done)
+        search.start()
+        return search
+
+    def start_ponder(self, board, search):
+        """Thinks about the position after the expected reply while the player moves.
+
+        `board` is the position after the engine's own move from `search`.
+        """
+        self.stop_ponder()
+        if not self.ponder_enabled or not self.engine or search.ponder is None:
+            return
+        if search.ponder not in board.legal_moves:
+            return
+        ponder_board = board.copy()
+        ponder_board.push(search.ponder)
+        # No limit: the search runs until the player moves and start_search() decides
+        self.ponder_search = BackgroundSearch(self, ponder_board, None)
+        self.ponder_search.start()
+
+    def start_analysis(self, board, multipv=3, on_update=None):
+        """Starts an infinite MultiPV analysis of `board` and returns the LiveAnalysis handle.
+
+        The engine cannot play and analyse at once, so pondering stops here.
+        """
+        if not self.supervisor.ensure_alive():
             return None
+        self.stop_ponder()
+        analysis = LiveAnalysis(self, board, multipv, on_update)
+        analysis.start()
+        return analysis
+
+    def stop_ponder(self):
+        if self.ponder_search:
+            self.ponder_search.cancel()
+            self.ponder_search = None
+
+    def ponder_stats(self):
+        total = self.ponder_hits + self.ponder_misses
+        return {
+            "hits": self.ponder_hits,
+            "misses": self.ponder_misses,
+            "hit_rate": self.ponder_hits / total if total else 0.0,
+            "saved_seconds": self.ponder_saved,
+        }
 
     def quit(self):
-        if self.engine:
-            self.engine.quit()
+        self.stop_ponder()
+        stats = self.ponder_stats()
+        if stats["hits"] or stats["misses"]:
+            print(f"Ponder: {stats['hits']}/{stats['hits'] + stats['misses']} hits "
+                  f"({stats['hit_rate']:.0%}), saved {stats['saved_seconds']:.1f}s of thinking")
+        if self.book:
+            self.book.close()
+        self.supervisor.quit()
+
+
+class BackgroundSearch:
+    """One engine search running off the GUI thread.
+
+    The board is copied when the search starts, so the caller is free to keep
+    changing its own board. Call cancel() to stop the engine early and
+    is_stale(board) before using the result. With limit=None the search runs
+    until stop() or stop_after() is called (used for pondering).
+
+    If the engine process crashes, or overruns its limit (or a stop) by the
+    supervisor's timeout, the search moves to the standby engine once.
+    """
+
+    def __init__(self, engine, board, limit, on_done=None):
+        self.engine = engine
+        self.board = board.copy()
+        self.limit = limit
+        self.on_done = on_done
+        self.move = None
+        self.ponder = None # Reply the engine expects
+        self.cancelled = False
+        self.done = False
+        self.started = None
+        self._analysis = None
+        self._process = None # Engine process the search is running on
+        self._stop_requested = False
+        self._timer = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @classmethod
+    def finished(cls, engine, board, move, ponder=None):
+        """A search that is already done, e.g. answered from the cache."""
+        search = cls(engine, board, None)
+        search.move = move
+        search.ponder = ponder
+        search.started = time.perf_counter()
+        search.done = True
+        return search
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def _run(self):
+        try:
+            process = self.engine.engine
+            for attempt in range(2):
+                try:
+                    best = self._search(process)
+                    break
+                except ENGINE_FAILURES as e:
+                    if self.cancelled or attempt:
+                        raise
+                    process = self.engine.supervisor.failover(process, f"failed ({str(e) or type(e).__name__})")
+            if best is not None and not self.cancelled:
+                self.move = best.move
+                self.ponder = best.ponder
+                info = self._analysis.info
+                if self.engine.profiler and self.limit is not None: # Ponder searches wait on the player
+                    self.engine.profiler.record_search(self.elapsed(), info)
+                if self.ponder is None:
+                    pv = info.get("pv", [])
+                    if len(pv) > 1:
+                        self.ponder = pv[1]
+                # Ponder searches have no limit of their own: record how long they actually ran
+                limit = self.limit or chess.engine.Limit(time=self.elapsed())
+                if self.move:
+                    self.engine.cache.store(self.board, limit, self.move, self.ponder,
+                                            info.get("score"), info.get("depth"))
+        except Exception as e:
+            if not self.cancelled:
+                print(f"Engine error: {e}")
+        finally:
+            self.done = True
+            if self.on_done and not self.cancelled:
+                self.on_done()
+
+    def _search(self, process):
+        with self._lock:
+            if self.cancelled:
+                return None
+            if process is None:
+                raise chess.engine.EngineTerminatedError("no engine process")
+            self._process = process
+            # analysis() instead of play() so the search can be stopped from another thread
+            self._analysis = process.analysis(self.board, self.limit)
+            if self._stop_requested:
+                self._analysis.stop()
+        if self.limit is not None and self.limit.time is not None:
+            watch(self, process, self.limit.time + self.engine.supervisor.timeout)
+        best = self._analysis.wait()
+        self._process = None
+        return best
+
+    def stop(self):
+        """Asks the engine to finish now and report its best move so far."""
+        with self._lock:
+            self._stop_requested = True
+            if self._analysis is not None and not self.done:
+                try:
+                    self._analysis.stop()
+                except Exception:
+                    pass # Engine already shut down
+                # A healthy engine answers a stop at once
+                if self._process is not None:
+                    watch(self, self._process, self.engine.supervisor.timeout)
+
+    def stop_after(self, seconds):
+        """Stops the search once it has been running for `seconds` in total."""
+        delay = self.started + seconds - time.perf_counter()
+        if delay <= 0:
+            self.stop()
+            return
+        self._timer = threading.Timer(delay, self.stop)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def cancel(self):
+        """Stops the search. The result is discarded even if it still arrives."""
+        self.cancelled = True
+        if self._timer:
+            self._timer.cancel()
+        self.stop()
+
+    def is_stale(self, board):
+        """True if `board` is no longer the position this search was started from."""
+        return board.move_stack != self.board.move_stack or board.fen() != self.board.fen()
+
+    def join(self, timeout=None):
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+
+class LiveAnalysis:
+    """Infinite MultiPV analysis of one position, shown in the GUI's analysis panel.
+
+    A fast engine sends thousands of info lines a second. The worker thread
+    only keeps the latest info per PV and calls `on_update` once, then not
+    again until the GUI has picked the lines up with snapshot(). Updates are
+    coalesced to however often the GUI draws. A crashed engine is replaced
+    by the standby and the analysis carries on there.
+    """
+
+    def __init__(self, engine, board, multipv=3, on_update=None):
+        self.engine = engine
+        self.board = board.copy()
+        self.multipv = multipv
+        self.on_update = on_update
+        self.lines = {} # multipv number -> latest info with a score and PV
+        self.version = 0 # Bumped on every new line
+        self.infos = 0 # Info lines received in total
+        self.stopped = False
+        self._pending = False
+        self._analysis = None
+        self._process = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        process = self.engine.engine
+        for attempt in range(2):
+            try:
+                self._stream(process)
+                return
+            except ENGINE_FAILURES as e:
+                if not self.stopped and not attempt:
+                    process = self.engine.supervisor.failover(process, f"failed ({str(e) or type(e).__name__})")
+                    continue
+                error = e
+            except Exception as e:
+                error = e
+            if not self.stopped:
+                print(f"Engine error: {error}")
+            return
+
+    def _stream(self, process):
+        with self._lock:
+            if self.stopped:
+                return
+            if process is None:
+                raise chess.engine.EngineTerminatedError("no engine process")
+            self._process = process
+            self._analysis = process.analysis(self.board, multipv=self.multipv)
+        for info in self._analysis:
+            self.infos += 1
+            if "score" not in info or not info.get("pv"):
+                continue # currmove, nodes and similar progress reports
+            self.lines[info.get("multipv", 1)] = info
+            self.version += 1
+            if not self._pending:
+                self._pending = True
+                if self.on_update:
+                    self.on_update()
+        self._process = None
+
+    def snapshot(self):
+        """The latest lines, best first, as (score, depth, pv) tuples."""
+        self._pending = False
+        items = sorted(list(self.lines.items()), key=lambda item: item[0])
+        return [(info["score"], info.get("depth"), info["pv"]) for _, info in items]
+
+    def stop(self):
+        with self._lock:
+            self.stopped = True
+            if self._analysis is not None:
+                try:
+                    self._analysis.stop()
+                except Exception:
+                    pass # Engine already shut down
+                if self._process is not None:
+                    watch(self, self._process, self.engine.supervisor.timeout)
+
+    def is_stale(self, board):
+        """True if `board` is no longer the position being analysed."""
+        return board.move_stack != self.board.move_stack or board.fen() != self.board.fen()
+
+    def join(self, timeout=None):
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+
+def watch(search, process, seconds):
+    """Fails over if `search` is still running on `process` after `seconds`."""
+    def check():
+        if search._process is process:
+            search.engine.supervisor.failover(process, "hung")
 
+    search.engine.supervisor.watch(seconds, check)
@@ -0,0 +1,188 @@
+"""Post-game analysis: every move annotated with its evaluation swing.
+
+The positions of a line are spread over an EnginePool, and annotations are
+handed out as soon as both positions around a move are evaluated, so a GUI
+can show partial results. Evaluations go into a TranspositionCache, so
+re-analysing a branched timeline only searches the positions that are new.
+"""
+import threading
+from collections import namedtuple
+
+import chess
+import chess.engine
+
+from src.engine_pool import EnginePool, MATE_SCORE
+from src.transposition import TranspositionCache
+
+# Evaluations are centipawns from White's point of view, clamped to +/-EVAL_CAP
+# so that "mate in 5" vs "mate in 7" is not a swing. `loss` is what the move
+# cost the side that played it; `best` is the engine's choice in that position.
+Annotation = namedtuple("Annotation", ["ply", "move", "san", "best", "best_san", "before", "after", "loss", "label"])
+EVAL_CAP = 1000
+
+# Centipawn loss thresholds, worst first
+THRESHOLDS = [(300, "blunder"), (100, "mistake"), (50, "inaccuracy")]
+NAGS = {"blunder": "??", "mistake": "?", "inaccuracy": "?!"}
+
+
+def classify(loss):
+    for threshold, label in THRESHOLDS:
+        if loss >= threshold:
+            return label
+    return None
+
+
+def terminal_eval(board):
+    """Evaluation of a finished position, which needs no engine."""
+    if board.is_checkmate():
+        return -EVAL_CAP if board.turn == chess.WHITE else EVAL_CAP
+    return 0
+
+
+def clamp_score(score):
+    """Clamped White centipawns of a PovScore."""
+    cp = score.white().score(mate_score=MATE_SCORE)
+    return max(-EVAL_CAP, min(EVAL_CAP, cp))
+
+
+class GameAnalysis:
+    """Annotations for one line of a game, filled in as the engines finish."""
+
+    def __init__(self, boards, moves, on_annotation=None):
+        self.boards = boards # Position before each move, plus the final one
+        self.moves = moves
+        self.sans = [board.san(move) for board, move in zip(boards, moves)]
+        self.evals = [None] * len(boards)
+        self.best = [None] * len(boards)
+        self.annotations = [None] * len(moves)
+        self.on_annotation = on_annotation
+        self.searched = 0 # Positions that needed the engine (the rest came from the cache)
+        self.cancelled = False
+        self.finished = threading.Event()
+        self.future = None
+        self.lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.finished.is_set()
+
+    def progress(self):
+        return sum(a is not None for a in self.annotations), len(self.annotations)
+
+    def set_eval(self, index, cp, best):
+        ready = []
+        with self.lock:
+            self.evals[index] = cp
+            self.best[index] = best
+            # The moves into and out of this position may now be complete
+            for ply in (index - 1, index):
+                if 0 <= ply < len(self.moves) and self.annotations[ply] is None \
+                        and self.evals[ply] is not None and self.evals[ply + 1] is not None:
+                    self.annotations[ply] = self._annotate(ply)
+                    ready.append(self.annotations[ply])
+        if self.on_annotation is not None and not self.cancelled:
+            for annotation in ready:
+                self.on_annotation(annotation)
+
+    def _annotate(self, ply):
+        before, after = self.evals[ply], self.evals[ply + 1]
+        sign = 1 if self.boards[ply].turn == chess.WHITE else -1
+        move, best = self.moves[ply], self.best[ply]
+        loss = 0 if move == best else max(0, (before - after) * sign)
+        best_san = self.boards[ply].san(best) if best else None
+        return Annotation(ply, move, self.sans[ply], best, best_san, before, after, loss, classify(loss))
+
+    def cancel(self):
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+        self.finished.set()
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+    def summary(self):
+        """Counts of each label per side, e.g. {chess.WHITE: {"blunder": 1, ...}, ...}."""
+        counts = {color: {label: 0 for _, label in THRESHOLDS} for color in chess.COLORS}
+        for annotation in self.annotations:
+            if annotation and annotation.label:
+                counts[self.boards[annotation.ply].turn][annotation.label] += 1
+        return counts
+
+
+class GameAnalyzer:
+    """Annotates whole games on a pool of engine processes.
+
+    The pool is started on first use. Pass the playing engine's cache to
+    share evaluations between play and analysis. Two engines by default:
+    analysis runs next to the game, which has its own engine.
+    """
+
+    def __init__(self, engine_path="stockfish", workers=2, limit=None, cache=None, threads=1, hash_mb=64):
+        self.pool = EnginePool(engine_path, size=workers, threads=threads, hash_mb=hash_mb)
+        self.limit = limit or chess.engine.Limit(depth=12)
+        self.cache = cache if cache is not None else TranspositionCache()
+        self.started = None # None until the pool was tried, then True/False
+        self.start_lock = threading.Lock()
+
+    def start(self):
+        with self.start_lock:
+            if self.started is None:
+                self.started = self.pool.start()
+            return self.started
+
+    def analyse(self, moves, fen=None, on_annotation=None):
+        """Starts annotating the line `moves` (from `fen`) and returns its GameAnalysis.
+
+        `on_annotation(annotation)` is called from a worker thread for each
+        move as soon as it is ready; wait() on the result to block until the
+        whole line is done.
+        """
+        board = chess.Board(fen) if fen else chess.Board()
+        boards = [board.copy(stack=False)]
+        for move in moves:
+            board.push(move)
+            boards.append(board.copy(stack=False))
+        analysis = GameAnalysis(boards, list(moves), on_annotation)
+        # Starting the engines can take a moment: never do it on the caller's thread
+        threading.Thread(target=self._run, args=(analysis,), daemon=True).start()
+        return analysis
+
+    def _run(self, analysis):
+        pending = []
+        for index, board in enumerate(analysis.boards):
+            if board.is_game_over():
+                analysis.set_eval(index, terminal_eval(board), None)
+                continue
+            entry = self.cache.lookup(board, self.limit)
+            if entry is not None and entry.score is not None:
+                analysis.set_eval(index, clamp_score(entry.score), entry.move)
+            else:
+                pending.append(index)
+
+        if not pending or analysis.cancelled:
+            analysis.finished.set()
+            return
+        if not self.start():
+            print("Analysis engines failed to start.")
+            analysis.finished.set()
+            return
+
+        def on_result(i, info):
+            index = pending[i]
+            board = analysis.boards[index]
+            score = info.get("score")
+            pv = info.get("pv")
+            best = pv[0] if pv else None
+            if best is not None and score is not None:
+                self.cache.store(board, self.limit, best, pv[1] if len(pv) > 1 else None, score, info.get("depth"))
+            analysis.set_eval(index, clamp_score(score) if score is not None else 0, best)
+
+        analysis.searched = len(pending)
+        analysis.future = self.pool.submit([analysis.boards[i].fen() for i in pending], self.limit, on_result)
+        analysis.future.add_done_callback(lambda _: analysis.finished.set())
+        if analysis.cancelled: # Cancelled while the pool was starting
+            analysis.future.cancel()
+
+    def quit(self):
+        self.pool.quit()
@@ -1,36 +1,296 @@
+import time
+from collections import namedtuple
 import chess
 
-class ChessGame:
+# Everything the GUI asks about a position every frame, computed once per position
+PositionStatus = namedtuple("PositionStatus", ["legal_moves", "legal_set", "is_check", "outcome"])
+
+
+class GameClock:
+    """Chess clock with a base time and a per-move increment (both in seconds)."""
+
+    def __init__(self, base_time, increment=0.0):
+        self.base_time = base_time
+        self.increment = increment
+        self.reset()
+
+    def reset(self):
+        self.remaining = {chess.WHITE: float(self.base_time), chess.BLACK: float(self.base_time)}
+        self.running = None # Colour whose clock is ticking
+        self.started_at = None
+
+    def start(self, color):
+        self.stop()
+        self.running = color
+        self.started_at = time.monotonic()
+
+    def stop(self):
+        if self.running is not None:
+            self.remaining[self.running] -= time.monotonic() - self.started_at
+            self.running = None
+            self.started_at = None
+
+    def press(self, color):
+        """`color` has just moved: bank its time plus increment and start the opponent."""
+        if self.running == color:
+            self.stop()
+        self.remaining[color] += self.increment
+        self.start(not color)
+
+    def time_left(self, color):
+        left = self.remaining[color]
+        if self.running == color:
+            left -= time.monotonic() - self.started_at
+        return max(0.0, left)
+
+    def flagged(self, color):
+        return self.time_left(color) <= 0.0
+
+    def snapshot(self):
+        """Time left on both clocks, for restore()."""
+        return self.time_left(chess.WHITE), self.time_left(chess.BLACK)
+
+    def restore(self, times):
+        """Stops the clock and sets the time left on both sides."""
+        self.stop()
+        self.remaining[chess.WHITE], self.remaining[chess.BLACK] = times
+
+
+class GameNode:
+    """One position in the game tree, reached by `move` from `parent`."""
+
+    __slots__ = ("id", "parent", "move", "ply", "children", "last_child", "clock")
+
+    def __init__(self, node_id, parent, move):
+        self.id = node_id
+        self.parent = parent
+        self.move = move
+        self.ply = parent.ply + 1 if parent else 0 # Moves from the root
+        self.children = []
+        self.last_child = None # Child to follow when going forward in time
+        self.clock = None # GameClock.snapshot() when the position was last left (timed games)
+
+
+class GameTree:
+    """Every line played in a game, with branches kept.
+
+    Lines share their common prefix, so a branch only costs one node per new
+    move. Nodes hold moves, not positions: the board follows the tree by
+    popping back to the common ancestor and pushing forward from there, so
+    undo and redo are a single pop or push, and a jump costs one pop or push
+    per ply between the two nodes. The board must only be changed through
+    ChessGame, or it and `current` drift apart.
+    """
+
     def __init__(self):
-        self.board = chess.Board()
+        self.nodes = []
+        self.root = self._new_node(None, None)
+        self.current = self.root
+
+    def _new_node(self, parent, move):
+        node = GameNode(len(self.nodes), parent, move)
+        self.nodes.append(node)
+        return node
+
+    def add(self, move):
+        """Records `move`, already pushed on the board, as a child of the current node."""
+        parent = self.current
+        node = next((child for child in parent.children if child.move == move), None)
+        if node is None:
+            node = self._new_node(parent, move)
+            parent.children.append(node)
+        parent.last_child = node
+        self.current = node
+        return node
+
+    def restore(self, board, node):
+        """Sets `board`, which is at the current node, to the position at `node`, history included."""
+        back = self.current
+        forward = []
+        target = node
+        while back.ply > target.ply:
+            back = back.parent
+        while target.ply > back.ply:
+            forward.append(target)
+            target = target.parent
+        while back is not target:
+            back = back.parent
+            forward.append(target)
+            target = target.parent
+
+        for _ in range(self.current.ply - back.ply):
+            board.pop()
+        for child in reversed(forward):
+            child.parent.last_child = child # Going forward again follows this line
+            board.push(child.move)
+        self.current = node
+
+    def siblings(self, node):
+        return node.parent.children if node.parent else [node]
+
+    def line(self, node=None):
+        """Nodes from the root through `node` (default: current) to the tip of its timeline."""
+        node = node or self.current
+        nodes = []
+        while node is not None:
+            nodes.append(node)
+            node = node.parent
+        nodes.reverse()
+        while nodes[-1].last_child is not None:
+            nodes.append(nodes[-1].last_child)
+        return nodes
+
+
+class ChessGame:
+    def __init__(self, base_time=None, increment=0.0, fen=None):
+        self.board = chess.Board(fen) if fen else chess.Board()
+        self.tree = GameTree()
+        self._status = None # PositionStatus of the current position, built on demand
+        # Clocks are optional: without a base time the game is untimed
+        self.clock = GameClock(base_time, increment) if base_time else None
+        self._save_clock()
 
     def make_move(self, move_uci):
         """Attempts to make a move. Returns True if successful, False if illegal."""
         try:
             move = chess.Move.from_uci(move_uci)
-            if move in self.board.legal_moves:
-                self.board.push(move)
+            if self.is_legal(move):
+                self.push_move(move)
                 return True
             else:
                 return False
         except ValueError:
             return False
 
+    def push_move(self, move):
+        """Plays a legal move, starting a new branch if we are back in time."""
+        self._save_clock()
+        self.board.push(move)
+        self.tree.add(move)
+        self._status = None
+        self.press_clock()
+        self._save_clock()
+
+    def jump_to(self, node):
+        """Jumps to any position in the game tree (a GameNode or its id).
+
+        Costs one pop or push per ply between the current node and `node`.
+        In timed games both clocks go back to what they were when `node`
+        was last left, and the side to move carries on from there.
+        """
+        if isinstance(node, int):
+            node = self.tree.nodes[node]
+        self._save_clock()
+        self.tree.restore(self.board, node)
+        self._status = None
+        if self.clock is not None:
+            self.clock.restore(node.clock)
+            # Before the first move no clock runs, as in a new game
+            if node.parent is not None and self.status().outcome is None:
+                self.clock.start(self.board.turn)
+
+    def redo_move(self):
+        """Goes forward along the line we last visited."""
+        if self.tree.current.last_child is None:
+            return False
+        self.jump_to(self.tree.current.last_child)
+        return True
+
+    def switch_branch(self, step):
+        """Moves to another timeline that branches off at the current ply."""
+        siblings = self.tree.siblings(self.tree.current)
+        if len(siblings) < 2:
+            return False
+        index = siblings.index(self.tree.current)
+        self.jump_to(siblings[(index + step) % len(siblings)])
+        return True
+
+    def is_live(self):
+        """True at the tip of a line (nothing to redo)."""
+        return not self.tree.current.children
+
+    def status(self):
+        """Legal moves, check and outcome of the current position.
+
+        Generating legal moves is the expensive part of every status query,
+        so it happens once per position. Any change to the board must go
+        through ChessGame (or call invalidate()) to keep this in sync.
+        """
+        if self._status is None:
+            legal_moves = list(self.board.legal_moves)
+            self._status = PositionStatus(legal_moves, frozenset(legal_moves),
+                                          self.board.is_check(), self.board.outcome())
+        return self._status
+
+    def invalidate(self):
+        self._status = None
+
+    def is_legal(self, move):
+        return move in self.status().legal_set
+
     def get_legal_moves(self):
         """Returns a list of legal moves in UCI format."""
-        return [move.uci() for move in self.board.legal_moves]
+        return [move.uci() for move in self.status().legal_moves]
+
+    def is_check(self):
+        return self.status().is_check
+
+    def is_checkmate(self):
+        outcome = self.status().outcome
+        return outcome is not None and outcome.termination == chess.Termination.CHECKMATE
+
+    def is_stalemate(self):
+        outcome = self.status().outcome
+        return outcome is not None and outcome.termination == chess.Termination.STALEMATE
 
     def is_game_over(self):
-        return self.board.is_game_over()
+        return self.status().outcome is not None or self.is_time_out()
+
+    def is_time_out(self):
+        return self.clock is not None and self.clock.flagged(self.board.turn)
+
+    def _save_clock(self):
+        if self.clock is not None:
+            self.tree.current.clock = self.clock.snapshot()
+
+    def press_clock(self):
+        """Call after a move has been pushed: charges the mover and starts the opponent's clock."""
+        if self.clock is None:
+            return
+        self.clock.press(not self.board.turn)
+        if self.status().outcome is not None:
+            self.clock.stop()
+
+    def save(self, path, tags=None):
+        """Saves the current line to a binary game record file (see src/game_records.py).
+
+        Only the line leading to the current position is stored, not the other timelines.
+        """
+        from src.game_records import GameRecordWriter
+        with GameRecordWriter(path) as writer:
+            writer.add_game(self, tags)
+
+    @classmethod
+    def load(cls, path, index=0):
+        """Loads game `index` from a binary game record file."""
+        from src.game_records import GameRecordFile
+        with GameRecordFile(path) as records:
+            return records.game(index)
 
     def get_fen(self):
         return self.board.fen()
 
     def undo_move(self):
-        if len(self.board.move_stack) > 0:
-            self.board.pop()
-            return True
-        return False
+        """Steps back one move. The line stays in the tree for redo_move()."""
+        if self.tree.current.parent is None:
+            return False
+        self.jump_to(self.tree.current.parent)
+        return True
 
     def reset(self):
         self.board.reset()
+        self.tree = GameTree()
+        self._status = None
+        if self.clock:
+            self.clock.reset()
+            self._save_clock()
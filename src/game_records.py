@@ -0,0 +1,193 @@
+"""Compact binary storage for many games.
+
+Layout (little endian):
+
+    file header   b"OVCG" | version u16 | reserved u16
+    game blocks   one per game, see BLOCK below
+    index         u64 file offset of every game block
+    footer        index offset u64 | game count u64 | b"OVCG"
+
+A game block is BLOCK followed by the start FEN (empty for the standard
+start), the moves as 16-bit values (see pgn_stream.pack_move) and the tags
+as NUL-separated UTF-8 key/value pairs. The FEN and the tags are padded to
+an even length, so every block and its moves start at an even offset.
+The reader memory-maps the file and finds game N through the index, so it
+never parses games 0..N-1, and moves() returns a view into the mapping.
+Such views should not outlive the reader: one still alive at close() keeps
+the mapping open until it is dropped.
+
+Appending never overwrites anything: new blocks go after the old footer,
+and close() writes an index of all games and a new footer at the end. A
+writer that never reaches close() leaves the previous footer in place, and
+find_footer() falls back to it, so a crash only loses the games of that
+session.
+"""
+import mmap
+import os
+import struct
+from array import array
+
+import chess
+
+from src.pgn_stream import pack_move, unpack_move
+
+MAGIC = b"OVCG"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sHH")
+FOOTER = struct.Struct("<QQ4s")
+# move count, FEN length (without padding), result code, reserved, tags offset (from block start), tags length
+BLOCK = struct.Struct("<IHBBII")
+
+RESULTS = ["*", "1-0", "0-1", "1/2-1/2"]
+
+
+def find_footer(data):
+    """(index offset, game count, end of footer) of the last complete index in `data`.
+
+    Normally that is the footer at the very end. After an append that never
+    reached close(), the data ends in unindexed blocks instead, and the footer
+    of the previous session is found by searching back for its magic.
+    """
+    end = len(data)
+    while end >= FILE_HEADER.size + FOOTER.size:
+        index_offset, count, magic = FOOTER.unpack_from(data, end - FOOTER.size)
+        if magic == MAGIC and index_offset >= FILE_HEADER.size and index_offset + count * 8 == end - FOOTER.size:
+            return index_offset, count, end
+        end = data.rfind(MAGIC, 0, end - 1) + len(MAGIC)
+    raise ValueError("no game index found")
+
+
+class GameRecordWriter:
+    """Writes games to a record file. mode="a" appends to an existing file."""
+
+    def __init__(self, path, mode="w"):
+        self.path = path
+        self.offsets = array("Q")
+        if mode == "a" and os.path.exists(path) and os.path.getsize(path) > FILE_HEADER.size:
+            self.f = open(path, "r+b")
+            with mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                try:
+                    index_offset, count, end = find_footer(mm)
+                except ValueError:
+                    self.f.close()
+                    raise ValueError(f"{path} is not a game record file") from None
+                self.offsets.frombytes(mm[index_offset:index_offset + count * 8])
+            # Blocks left behind by a session that never closed are not indexed anyway
+            self.f.truncate(end)
+            self.f.seek(end)
+        else:
+            self.f = open(path, "wb")
+            self.f.write(FILE_HEADER.pack(MAGIC, VERSION, 0))
+
+    def add(self, moves, result="*", fen=None, tags=None):
+        """Adds one game: `moves` are chess.Move objects from the start position."""
+        fen_bytes = b"" if fen in (None, chess.STARTING_FEN) else fen.encode("ascii")
+        padded_fen = fen_bytes + b"\0" * (len(fen_bytes) % 2)
+        packed = array("H", (pack_move(move) for move in moves))
+        tag_bytes = b"".join(f"{key}\0{value}\0".encode("utf-8") for key, value in (tags or {}).items())
+        padding = b"\0" * (len(tag_bytes) % 2) # So the next block starts at an even offset
+
+        tags_offset = BLOCK.size + len(padded_fen) + len(packed) * 2
+        self.offsets.append(self.f.tell())
+        self.f.write(BLOCK.pack(len(packed), len(fen_bytes), RESULTS.index(result), 0, tags_offset, len(tag_bytes)))
+        self.f.write(padded_fen)
+        self.f.write(packed.tobytes())
+        self.f.write(tag_bytes + padding)
+        return len(self.offsets) - 1
+
+    def add_game(self, game, tags=None):
+        """Adds the current line of a ChessGame."""
+        board = game.board
+        outcome = game.status().outcome
+        return self.add(board.move_stack, outcome.result() if outcome else "*", board.root().fen(), tags)
+
+    def close(self):
+        if self.f is None:
+            return
+        index_offset = self.f.tell()
+        self.f.write(self.offsets.tobytes())
+        self.f.write(FOOTER.pack(index_offset, len(self.offsets), MAGIC))
+        self.f.close()
+        self.f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GameRecordFile:
+    """Memory-mapped, random-access reader for record files."""
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "rb")
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mm)
+        magic, version, _ = FILE_HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} game record file")
+        index_offset, count, _ = find_footer(self.mm)
+        self.offsets = self.view[index_offset:index_offset + count * 8].cast("Q")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _block(self, n):
+        offset = self.offsets[n]
+        return offset, BLOCK.unpack_from(self.mm, offset)
+
+    def moves(self, n):
+        """Packed moves of game `n` as a zero-copy uint16 view.
+
+        The view reads straight from the mapping, so drop it before close();
+        use .tolist() for moves that must outlive the reader.
+        """
+        offset, (count, fen_len, _, _, _, _) = self._block(n)
+        start = offset + BLOCK.size + fen_len + fen_len % 2
+        return self.view[start:start + count * 2].cast("H")
+
+    def fen(self, n):
+        offset, (_, fen_len, _, _, _, _) = self._block(n)
+        if fen_len == 0:
+            return chess.STARTING_FEN
+        start = offset + BLOCK.size
+        return bytes(self.mm[start:start + fen_len]).decode("ascii")
+
+    def result(self, n):
+        return RESULTS[self._block(n)[1][2]]
+
+    def tags(self, n):
+        offset, (_, _, _, _, tags_offset, tags_len) = self._block(n)
+        start = offset + tags_offset
+        parts = bytes(self.mm[start:start + tags_len]).decode("utf-8").split("\0")[:-1]
+        return dict(zip(parts[::2], parts[1::2]))
+
+    def game(self, n):
+        """Replays game `n` into a ChessGame."""
+        from src.game_logic import ChessGame
+        fen = self.fen(n)
+        game = ChessGame(fen=None if fen == chess.STARTING_FEN else fen)
+        for value in self.moves(n):
+            game.push_move(unpack_move(value))
+        return game
+
+    def close(self):
+        if self.mm is None:
+            return
+        # Views into the mapping must be released before it can be closed
+        self.offsets.release()
+        self.view.release()
+        try:
+            self.mm.close()
+        except BufferError:
+            pass # A moves() view is still alive: the mapping goes when the last view does
+        self.mm = None
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,437 @@
+"""Headless asyncio server hosting many ChessGame sessions against a shared engine pool.
+
+Clients send newline-delimited JSON over TCP. Every request is an object
+with an "op", and any "id" it carries is echoed in the response:
+
+    {"op": "new", "color": "white"}             -> {"ok": true, "session": 1, "fen": ..., "reply": null, ...}
+    {"op": "move", "session": 1, "move": "e2e4"} -> {"ok": true, "fen": ..., "reply": "e7e5", "result": "*"}
+    {"op": "hint", "session": 1}                 -> {"ok": true, "move": "g1f3"}
+    {"op": "undo", "session": 1}                 (takes back the engine's reply and our move)
+    {"op": "state", "session": 1}
+    {"op": "close", "session": 1}
+    {"op": "stats"}
+
+Failed requests get {"ok": false, "error": ...}; "busy" means the request
+was refused by backpressure and may be retried. "new" also takes
+"base_time"/"increment" (seconds) for a timed game and "fen".
+
+    python -m src.game_server --engine stockfish --engines 4 --movetime 0.05 --port 8765
+"""
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import time
+from collections import deque
+
+import chess
+import chess.engine
+
+from src.engine_wrapper import clock_limit
+from src.game_logic import ChessGame
+
+
+class RequestError(Exception):
+    pass
+
+
+class Busy(RequestError):
+    def __init__(self):
+        super().__init__("busy")
+
+
+class FairScheduler:
+    """Shares a few engine processes between many sessions.
+
+    Each session has its own queue of searches. Free engines serve the
+    sessions with queued work in round-robin order, one search per turn, so
+    a session with a long queue cannot starve the others. A session may
+    have at most `max_pending` searches queued or running, and the server
+    at most `max_queued` waiting; past either, play() raises Busy instead
+    of queueing. If an engine dies and cannot be restarted the pool shrinks;
+    once no engine is left every search fails. Engines only need an async
+    play(board, limit).
+    """
+
+    def __init__(self, engines, max_pending=2, max_queued=10000, restart=None):
+        self.idle = list(engines)
+        self.size = len(self.idle)
+        self.max_pending = max_pending
+        self.max_queued = max_queued
+        self.restart = restart # Optional coroutine function starting a replacement for a dead engine
+        self.queues = {} # session id -> deque of (board, limit, future)
+        self.turns = deque() # Sessions with queued searches, in serving order
+        self.pending = {} # session id -> searches queued or running
+        self.queued = 0
+        self.searches = 0
+        self.busy_time = 0.0 # Engine-seconds spent searching
+        self.tasks = set()
+
+    async def play(self, session_id, board, limit):
+        if not self.size:
+            raise RequestError("no engines left")
+        if self.pending.get(session_id, 0) >= self.max_pending or self.queued >= self.max_queued:
+            raise Busy()
+        future = asyncio.get_running_loop().create_future()
+        queue = self.queues.get(session_id)
+        if queue is None:
+            queue = self.queues[session_id] = deque()
+            self.turns.append(session_id)
+        queue.append((board.copy(), limit, future))
+        self.pending[session_id] = self.pending.get(session_id, 0) + 1
+        self.queued += 1
+        self._dispatch()
+        try:
+            return await future
+        finally:
+            self.pending[session_id] -= 1
+            if not self.pending[session_id]:
+                del self.pending[session_id]
+
+    def _dispatch(self):
+        while self.idle and self.turns:
+            session_id = self.turns.popleft()
+            queue = self.queues[session_id]
+            job = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self.turns.append(session_id) # Back of the line for its next search
+            else:
+                del self.queues[session_id]
+            if job[2].done():
+                continue # The session went away while this was queued
+            task = asyncio.ensure_future(self._run(self.idle.pop(), job))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, engine, job):
+        board, limit, future = job
+        start = time.perf_counter()
+        try:
+            result = await engine.play(board, limit)
+            if not future.done():
+                future.set_result(result)
+        except chess.engine.EngineTerminatedError as e:
+            if not future.done():
+                future.set_exception(RequestError(f"engine failed: {e}"))
+            try:
+                engine = await self.restart() if self.restart else None
+            except Exception:
+                engine = None
+            if engine is None:
+                self.size -= 1 # Carry on with one engine fewer
+                if not self.size:
+                    self.fail_all(RequestError("no engines left"))
+                return
+        except Exception as e:
+            if not future.done():
+                future.set_exception(RequestError(f"engine failed: {e}"))
+        finally:
+            self.searches += 1
+            self.busy_time += time.perf_counter() - start
+        self.idle.append(engine)
+        self._dispatch()
+
+    def fail_all(self, error):
+        """Fails every queued search, e.g. when no engine is left to run them."""
+        for queue in self.queues.values():
+            for _, _, future in queue:
+                if not future.done():
+                    future.set_exception(error)
+        self.queues.clear()
+        self.turns.clear()
+        self.queued = 0
+
+    def cancel(self, session_id):
+        """Drops the queued searches of a closed session."""
+        queue = self.queues.pop(session_id, None)
+        if queue is None:
+            return
+        self.turns.remove(session_id)
+        self.queued -= len(queue)
+        for _, _, future in queue:
+            future.set_exception(RequestError("session closed"))
+
+
+class Session:
+    def __init__(self, session_id, game, engine_color):
+        self.id = session_id
+        self.game = game
+        self.engine_color = engine_color
+        self.busy = False # The engine is thinking about this game's next move
+        self.closed = False
+
+
+def game_result(game):
+    if game.is_time_out():
+        return "0-1" if game.board.turn == chess.WHITE else "1-0"
+    outcome = game.status().outcome
+    return outcome.result() if outcome else "*"
+
+
+def number_field(request, name, default=None, kind=(int, float)):
+    """request[name] if it is a non-negative number (or missing: `default`), else a RequestError."""
+    value = request.get(name, default)
+    if value is None:
+        return value
+    # bool is an int to Python, but not to a JSON client
+    if isinstance(value, bool) or not isinstance(value, kind) or value < 0:
+        raise RequestError(f"{name} must be a non-negative {'integer' if kind is int else 'number'}")
+    return value
+
+
+class GameServer:
+    def __init__(self, engine_command, engines=None, limit=None, hash_mb=16,
+                 max_sessions=10000, max_pending=2, max_inflight=32):
+        self.engine_command = engine_command
+        self.engine_count = engines or os.cpu_count() or 1
+        self.limit = limit or chess.engine.Limit(time=0.05) # For untimed sessions
+        self.hash_mb = hash_mb
+        self.max_sessions = max_sessions
+        self.max_pending = max_pending
+        self.max_inflight = max_inflight # Requests per connection before we stop reading from it
+        self.sessions = {}
+        self.next_id = 1
+        self.moves = 0
+        self.engines = []
+        self.scheduler = None
+        self.server = None
+        self.started = None
+
+    async def start_engine(self):
+        _, engine = await chess.engine.popen_uci(self.engine_command)
+        options = {}
+        if "Threads" in engine.options:
+            options["Threads"] = 1 # Parallelism comes from the pool
+        if "Hash" in engine.options and self.hash_mb:
+            options["Hash"] = self.hash_mb
+        await engine.configure(options)
+        self.engines.append(engine)
+        return engine
+
+    async def start(self, host="127.0.0.1", port=8765):
+        """Starts the engines and the listener; returns the port (useful with port=0)."""
+        engines = await asyncio.gather(*[self.start_engine() for _ in range(self.engine_count)])
+        self.scheduler = FairScheduler(engines, self.max_pending, restart=self.start_engine)
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+        self.started = (time.perf_counter(), time.process_time())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        await asyncio.gather(*[engine.quit() for engine in self.engines], return_exceptions=True)
+
+    async def handle_client(self, reader, writer):
+        owned = set() # Sessions of this connection, closed with it
+        write_lock = asyncio.Lock()
+        inflight = asyncio.Semaphore(self.max_inflight)
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                # Too many requests in flight: stop reading and let TCP push back on the client
+                await inflight.acquire()
+                task = asyncio.ensure_future(self.serve(line, owned, writer, write_lock, inflight))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass # ValueError: a line longer than the stream limit
+        finally:
+            for task in tasks:
+                task.cancel()
+            for session_id in owned:
+                self.close_session(session_id)
+            writer.close()
+
+    async def serve(self, line, owned, writer, write_lock, inflight):
+        try:
+            request = {}
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise RequestError("request must be a JSON object")
+                response = await self.dispatch(request, owned)
+            except RequestError as e:
+                response = {"ok": False, "error": str(e)}
+            except json.JSONDecodeError:
+                response = {"ok": False, "error": "bad JSON"}
+            except Exception as e:
+                # A bug must not cost the client its answer, nor the connection its other requests
+                print(f"Error serving {line[:200]!r}: {type(e).__name__}: {e}")
+                response = {"ok": False, "error": f"internal error: {type(e).__name__}"}
+            if "id" in request:
+                response["id"] = request["id"]
+            async with write_lock:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            inflight.release()
+
+    async def dispatch(self, request, owned):
+        op = request.get("op")
+        if op == "new":
+            return await self.op_new(request, owned)
+        if op == "stats":
+            return self.op_stats()
+        if op not in ("move", "hint", "undo", "state", "close"):
+            raise RequestError(f"unknown op: {op}")
+        session = self.sessions.get(number_field(request, "session", kind=int))
+        if session is None or session.id not in owned:
+            raise RequestError("no such session")
+        return await getattr(self, f"op_{op}")(session, request)
+
+    def describe(self, session):
+        game = session.game
+        response = {"ok": True, "session": session.id, "fen": game.get_fen(), "result": game_result(game)}
+        if game.clock:
+            response["clock"] = [round(game.clock.time_left(color), 2) for color in (chess.WHITE, chess.BLACK)]
+        return response
+
+    async def op_new(self, request, owned):
+        if len(self.sessions) >= self.max_sessions:
+            raise RequestError("server full")
+        color = request.get("color", "white")
+        if color not in ("white", "black"):
+            raise RequestError("color must be white or black")
+        try:
+            game = ChessGame(number_field(request, "base_time"), number_field(request, "increment", 0.0),
+                             request.get("fen"))
+        except (ValueError, TypeError) as e:
+            raise RequestError(f"bad game settings: {e}")
+        session = Session(self.next_id, game, chess.BLACK if color == "white" else chess.WHITE)
+        self.next_id += 1
+        self.sessions[session.id] = session
+        owned.add(session.id)
+        try:
+            reply = await self.engine_move(session)
+        except RequestError:
+            # The engine never made its first move: drop the session rather than leave it stuck
+            self.close_session(session.id)
+            owned.discard(session.id)
+            raise
+        return dict(self.describe(session), reply=reply)
+
+    async def op_move(self, session, request):
+        game = session.game
+        if session.busy:
+            raise RequestError("engine is thinking")
+        if game.is_game_over():
+            raise RequestError("game is over")
+        if game.board.turn == session.engine_color:
+            raise RequestError("not your turn")
+        if not game.make_move(str(request.get("move"))):
+            raise RequestError("illegal move")
+        try:
+            reply = await self.engine_move(session)
+        except RequestError:
+            # No reply (busy, engine failure): take the move back so the client can send it again
+            if not session.closed:
+                game.undo_move()
+            raise
+        self.moves += 1
+        return dict(self.describe(session), reply=reply)
+
+    async def engine_move(self, session):
+        """Lets the engine reply if it is its turn; returns the move in UCI, or None."""
+        game = session.game
+        if game.is_game_over() or game.board.turn != session.engine_color:
+            return None
+        session.busy = True
+        try:
+            limit = clock_limit(game.board, game.clock, self.limit)
+            result = await self.scheduler.play(session.id, game.board, limit)
+        finally:
+            session.busy = False
+        if session.closed or result.move is None or not game.is_legal(result.move):
+            return None
+        game.push_move(result.move)
+        return result.move.uci()
+
+    async def op_hint(self, session, request):
+        # One search per session at a time, so hints cannot use up the budget a move needs
+        if session.busy:
+            raise RequestError("engine is thinking")
+        session.busy = True
+        try:
+            result = await self.scheduler.play(session.id, session.game.board, self.limit)
+        finally:
+            session.busy = False
+        return {"ok": True, "move": result.move.uci() if result.move else None}
+
+    async def op_undo(self, session, request):
+        if session.busy:
+            raise RequestError("engine is thinking")
+        game = session.game
+        if not game.undo_move():
+            raise RequestError("nothing to undo")
+        if game.board.turn == session.engine_color:
+            game.undo_move() # The engine's reply went, now our own move
+        return self.describe(session)
+
+    async def op_state(self, session, request):
+        return dict(self.describe(session), moves=[move.uci() for move in session.game.board.move_stack])
+
+    async def op_close(self, session, request):
+        self.close_session(session.id)
+        return {"ok": True}
+
+    def close_session(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session:
+            session.closed = True
+            self.scheduler.cancel(session_id)
+
+    def op_stats(self):
+        wall = time.perf_counter() - self.started[0]
+        cpu = time.process_time() - self.started[1]
+        return {
+            "ok": True,
+            "sessions": len(self.sessions),
+            "moves": self.moves,
+            "searches": self.scheduler.searches,
+            "engines": self.scheduler.size,
+            "queued": self.scheduler.queued,
+            "uptime": round(wall, 3),
+            "cpu": round(cpu, 3), # Server process only, engines excluded
+            "engine_busy": round(self.scheduler.busy_time, 3),
+        }
+
+
+async def serve(args):
+    limit = chess.engine.Limit(depth=args.depth) if args.depth else chess.engine.Limit(time=args.movetime)
+    server = GameServer(shlex.split(args.engine), engines=args.engines, limit=limit, hash_mb=args.hash,
+                        max_sessions=args.max_sessions)
+    port = await server.start(args.host, args.port)
+    print(f"Listening on {args.host}:{port} with {server.engine_count} engines", flush=True)
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-session chess server sharing an engine pool.")
+    parser.add_argument("--engine", default="stockfish", help="Engine command")
+    parser.add_argument("--engines", type=int, default=None, help="Engine processes (default: one per core)")
+    parser.add_argument("--movetime", type=float, default=0.05, help="Seconds per engine move (untimed games)")
+    parser.add_argument("--depth", type=int, default=None, help="Fixed depth instead of movetime")
+    parser.add_argument("--hash", type=int, default=16, help="Hash per engine in MB")
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
+import threading
+import time
 import pygame
 import chess
+from src.board_renderer import DARK_SQUARE, LIGHT_SQUARE, BoardRenderer
 from src.game_logic import ChessGame
+from src.profiler import NULL_TIMER
 
 # Constants
 WIDTH, HEIGHT = 800, 800
@@ -8,15 +12,44 @@ BOARD_SIZE = 600
 SQUARE_SIZE = BOARD_SIZE // 8
 OFFSET_X = (WIDTH - BOARD_SIZE) // 2
 OFFSET_Y = (HEIGHT - BOARD_SIZE) // 2
-WHITE = (240, 217, 181)
-BLACK = (181, 136, 99)
-HIGHLIGHT = (186, 202, 68)
+BOARD_ORIGIN = (OFFSET_X, OFFSET_Y)
+WHITE, BLACK = LIGHT_SQUARE, DARK_SQUARE # Square colours, drawn by BoardRenderer
 TEXT_COLOR = (0, 0, 0)
+# Engine analysis panel, added to the right of the window while it is shown
+PANEL_WIDTH = 320
+ANALYSIS_LINES = 3
+FRAME_RATE = 60
+# The profiling HUD (F3) shows new numbers at most this often, in seconds
+HUD_REFRESH = 1.0
+
+# Posted from the engine thread when a background search finishes
+ENGINE_EVENT = pygame.USEREVENT + 1
+# Posted from the analysis workers whenever a move annotation is ready
+ANALYSIS_EVENT = pygame.USEREVENT + 2
+# Window events that mean the whole window has to be repainted
+EXPOSE_EVENTS = {pygame.VIDEOEXPOSE, pygame.VIDEORESIZE, pygame.ACTIVEEVENT, pygame.WINDOWEXPOSED,
+                 pygame.WINDOWSHOWN, pygame.WINDOWRESTORED, pygame.WINDOWSIZECHANGED}
 
 class ChessGUI:
-    def __init__(self, game, engine=None):
+    def __init__(self, game, engine=None, render_mode="event", position_index=None, analyzer=None, profiler=None):
         self.game = game
         self.engine = engine
+        # Optional Profiler timing frames, event handling and engine searches (see enable_profiler)
+        self.profiler = None
+        self.show_hud = False
+        self.hud_rect = pygame.Rect(OFFSET_X, OFFSET_Y, 280, 130)
+        self.hud_cache = (0.0, [])
+        # "connecting" while connect_engine() is launching one in the background,
+        # or while the engine supervisor replaces a crashed process
+        self.engine_status = "ready" if engine else None
+        self.engine_thread = None
+        if engine:
+            engine.supervisor.on_status = self.engine_status_changed
+        self.analyzer = analyzer # Optional GameAnalyzer for post-game annotations
+        self.position_index = position_index # Optional PositionIndex for the game explorer line
+        # "event": sleep until something happens and redraw only what changed
+        # "continuous": redraw everything at 60 FPS
+        self.render_mode = render_mode
         pygame.init()
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("Python Chess")
@@ -29,59 +62,81 @@ class ChessGUI:
         # Feature Toggles
         self.show_lines = False
         self.show_heat = False
+        self.show_analysis = False
         
         # UI Elements
         self.ui_font = pygame.font.SysFont("Arial", 20)
         self.chk_lines_rect = pygame.Rect(20, 20, 150, 30)
         self.chk_heat_rect = pygame.Rect(180, 20, 150, 30)
+        self.chk_analysis_rect = pygame.Rect(340, 20, 150, 30)
+        self.panel_rect = pygame.Rect(WIDTH, 0, PANEL_WIDTH, HEIGHT)
+        self.clock_rect = pygame.Rect(WIDTH - 260, 20, 260, 30)
+        self.analysis_rect = pygame.Rect(0, HEIGHT - 100, WIDTH, 30)
         
-        # History
-        self.redo_stack = []
+        # Engine search running in the background (None when idle)
+        self.search = None
+        # Infinite MultiPV analysis for the panel, and its rendered text (see draw_analysis_panel)
+        self.live_analysis = None
+        self.panel_cache = (None, [])
+
+        # Post-game analysis of one timeline; annotations are kept per game tree node
+        self.analysis = None
+        self.analysis_line = None
+        self.annotations = {}
+
+        # Board, pieces and overlays, with their render caches
+        self.renderer = BoardRenderer(SQUARE_SIZE, self.font)
+        self.explorer_cache = (None, [])
+
+        # Dirty tracking for the event render mode
+        self.dirty_rects = []
+        self.view_state = None
+
+        # CPU seconds used per wall-clock second, sampled about once a second
+        self.cpu_load = 0.0
+        self.cpu_samples = []
+        self.cpu_mark = (time.perf_counter(), time.process_time())
 
         # Audio
         self.move_sound = self.generate_move_sound()
+
+        if profiler:
+            self.enable_profiler(profiler)
     
     def undo_move(self):
-        # Go back in history
-        if self.game.board.move_stack:
-            move = self.game.board.pop()
-            self.redo_stack.append(move)
-            
-            # If we are in engine mode (and stack was empty), pop again to skip engine move?
-            # User wants to review "forward backward", so 1 step at a time is more precise.
-            # We just need to make sure engine DOES NOT think while we are in history.
-            
+        # Go back in history. The line we leave stays in the game tree.
+        # User wants to review "forward backward", so 1 step at a time is more precise.
+        # We just need to make sure engine DOES NOT think while we are in history.
+        self.cancel_search()
+        self.game.undo_move()
+
     def redo_move(self):
-        # Go forward in history
-        if self.redo_stack:
-            move = self.redo_stack.pop()
-            self.game.board.push(move)
+        # Go forward in history, along the timeline we last visited
+        self.cancel_search()
+        if self.game.redo_move():
+            self.play_move_sound()
+
+    def switch_timeline(self, step):
+        # Jump to a sibling branch at the current ply
+        self.cancel_search()
+        if self.game.switch_branch(step):
             self.play_move_sound()
     
     def generate_move_sound(self):
         # Generate a simple synthetic click sound
         # 44100Hz, 16bit, 2 channels
         # A short decay noise or sine wave
+        import numpy as np
         sound_length = 2000 # samples
         sampling_rate = 44100
-        buffer = []
-        import math
-        import array
-        
-        # Simple click/thud: fast decay sine wave
-        for i in range(sound_length):
-            t = float(i) / sampling_rate
-            # 200Hz frequency with expo decay
-            val = 32000 * math.sin(2.0 * math.pi * 200.0 * t) * math.exp(-15.0 * t)
-            val = int(val)
-            # Stereo
-            buffer.append(val)
-            buffer.append(val)
-        
-        # Convert to bytes for pygame mixer
-        sound_array = array.array('h', buffer)
+
+        # Simple click/thud: fast decay sine wave, 200Hz frequency with expo decay
+        t = np.arange(sound_length) / sampling_rate
+        wave = (32000 * np.sin(2.0 * np.pi * 200.0 * t) * np.exp(-15.0 * t)).astype(np.int16)
+        # Stereo: every sample twice, interleaved
+        sound_array = np.repeat(wave, 2)
         try:
-            return pygame.mixer.Sound(buffer=sound_array)
+            return pygame.mixer.Sound(buffer=sound_array.tobytes())
         except Exception as e:
             print(f"Audio init failed: {e}")
             return None
@@ -91,81 +146,17 @@ class ChessGUI:
             self.move_sound.play()
 
     def draw_board(self):
-        self.screen.fill((30, 30, 30)) # Clear screen
-        
-        # Explicit colors to ensure they aren't lost
-        color_white = (240, 217, 181)
-        color_black = (181, 136, 99)
-        color_highlight = (186, 202, 68)
-        color_last_move = (205, 210, 106)
-
-        for row in range(8):
-            for col in range(8):
-                # Calculate correct square index
-                # Visual row 0 is rank 7, row 7 is rank 0
-                rank = 7 - row
-                square_idx = chess.square(col, rank)
-                
-                # Draw Base Square
-                is_light_square = (row + col) % 2 == 0
-                bg_color = color_white if is_light_square else color_black
-                
-                x = OFFSET_X + col * SQUARE_SIZE
-                y = OFFSET_Y + row * SQUARE_SIZE
-                rect = pygame.Rect(x, y, SQUARE_SIZE, SQUARE_SIZE)
-                
-                pygame.draw.rect(self.screen, bg_color, rect)
-
-                # Overlays (Highlight/Last Move)
-                # Draw these directly on top if needed
-                if self.selected_square == (col, rank):
-                    # Highlight selected
-                    s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE))
-                    s.set_alpha(180)
-                    s.fill(color_highlight)
-                    self.screen.blit(s, (x, y))
-                elif self.game.board.move_stack:
-                    last_move = self.game.board.peek()
-                    if square_idx == last_move.from_square or square_idx == last_move.to_square:
-                        # Highlight last move
-                        s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE))
-                        s.set_alpha(180)
-                        s.fill(color_last_move)
-                        self.screen.blit(s, (x, y))
+        self.screen.fill((30, 30, 30))
+        selected = chess.square(*self.selected_square) if self.selected_square else None
+        last_move = self.game.board.peek() if self.game.board.move_stack else None
+        self.renderer.draw_board(self.screen, BOARD_ORIGIN, selected, last_move)
 
-    def draw_pieces(self):
-        board = self.game.board
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece:
-                col = chess.square_file(square)
-                row = 7 - chess.square_rank(square) 
-                
-                symbol = piece.unicode_symbol()
-                
-                # Determine piece color
-                if piece.color == chess.WHITE:
-                    text_color = (255, 255, 255) # White
-                    # Optional: Add a black outline for visibility on white squares
-                    # For simple text rendering, we can render slightly larger black text behind
-                    outline_color = (0, 0, 0)
-                else:
-                    text_color = (0, 0, 0) # Black
-                    outline_color = (255, 255, 255) # White outline for contrast (optional, mostly for black on black)
+    def square_origin(self, square):
+        """Top-left screen position of a square."""
+        return self.renderer.square_origin(square, BOARD_ORIGIN)
 
-                center_x = OFFSET_X + col * SQUARE_SIZE + SQUARE_SIZE // 2
-                center_y = OFFSET_Y + row * SQUARE_SIZE + SQUARE_SIZE // 2
-
-                # Draw Outline (Simple shadow/stroke effect)
-                for dx, dy in [(-1, -1), (-1, 1), (1, -1), (1, 1), (0, 2)]: # Shadow/Stroke
-                    outline_surface = self.font.render(symbol, True, outline_color)
-                    outline_rect = outline_surface.get_rect(center=(center_x + dx, center_y + dy))
-                    self.screen.blit(outline_surface, outline_rect)
-
-                # Draw Main Piece
-                text_surface = self.font.render(symbol, True, text_color)
-                text_rect = text_surface.get_rect(center=(center_x, center_y))
-                self.screen.blit(text_surface, text_rect)
+    def draw_pieces(self):
+        self.renderer.draw_pieces(self.screen, self.game.board, BOARD_ORIGIN)
 
     def get_square_under_mouse(self, pos):
         x, y = pos
@@ -176,48 +167,283 @@ class ChessGUI:
         return None
 
     def main_loop(self):
+        self.mark_dirty()
         while self.running:
             # Event Handling
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    self.handle_click(event.pos)
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_LEFT:
-                        self.undo_move()
-                    elif event.key == pygame.K_RIGHT:
-                        self.redo_move()
-
-            # Engine Move Logic
-            # Only run engine if we are at the LIVE game tip (redo_stack empty)
-            if self.engine and not self.redo_stack and not self.game.is_game_over() and self.game.board.turn != self.player_color:
-                # Let user see the player's move before engine blocks
-                # We can do this by handling the engine move AFTER a draw cycle
-                # But since we are simple:
-                
-                # Draw current state (Player just moved)
+            if self.render_mode == "event":
+                events = self.wait_events()
+            else:
+                events = pygame.event.get()
+            frame_start = time.perf_counter()
+            if events:
+                with self.timed("events"):
+                    self.handle_events(events)
+
+            self.update_engine()
+
+            # Annotate the game once it is over (again if it ended on a new timeline)
+            if self.analyzer and self.game.is_game_over():
+                self.start_analysis()
+
+            if self.render_mode == "event":
+                self.update_dirty()
+            else:
+                # Standard Draw
                 self.draw_game()
                 pygame.display.flip()
-                
-                # Yield to OS/Pump events
-                pygame.event.pump()
-                
-                # Get engine move
-                best_move = self.engine.get_best_move(self.game.board)
-                if best_move:
-                    self.game.board.push(best_move)
-                    self.play_move_sound() # Sound
-                else:
-                    print("Engine failed to return move.")
-                
-            # Standard Draw
-            self.draw_game()
-            pygame.display.flip()
-            self.clock.tick(60)
+            if self.profiler:
+                # The whole iteration, without the wait for events or the frame rate cap
+                self.profiler.record("frame", time.perf_counter() - frame_start)
 
+            if self.render_mode == "event":
+                # Engine info arrives far faster than it can be read: redraw at most at the frame rate
+                if self.live_analysis:
+                    self.clock.tick(FRAME_RATE)
+            else:
+                self.clock.tick(60)
+            self.sample_cpu()
+            if self.profiler:
+                self.profiler.frame_done()
+
+        self.cancel_search()
+        self.stop_live_analysis()
+        if self.analysis:
+            self.analysis.cancel()
+        if self.cpu_samples:
+            print(f"CPU load ({self.render_mode} rendering): {sum(self.cpu_samples) / len(self.cpu_samples):.1%}")
         pygame.quit()
 
+    def update_engine(self):
+        """Once per loop: keeps the analysis panel current and lets the engine move."""
+        if self.engine_status == "failed" and self.engine:
+            # Not even a fresh engine process could be started: carry on without one
+            self.engine = None
+            if self.show_analysis:
+                self.set_analysis_panel(False)
+
+        # The panel follows the board through moves and time travel
+        if self.engine and self.show_analysis and (self.live_analysis is None or self.live_analysis.is_stale(self.game.board)):
+            self.restart_live_analysis()
+
+        # Engine Move Logic
+        # Only run engine if we are at the LIVE tip of a timeline (nothing to redo)
+        # While the panel is open the engine analyses instead of playing
+        if self.engine and not self.show_analysis and self.game.is_live() and not self.game.is_game_over() and self.game.board.turn != self.player_color:
+            # The search runs on a worker thread; we just check on it once per loop
+            if self.search is None:
+                self.search = self.engine.start_search(self.game.board, self.game.clock, on_done=self.post_engine_event)
+            if self.search and self.search.done:
+                self.apply_search_result()
+
+    def handle_events(self, events):
+        for event in events:
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                self.handle_click(event.pos)
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_LEFT:
+                    self.undo_move()
+                elif event.key == pygame.K_RIGHT:
+                    self.redo_move()
+                elif event.key == pygame.K_UP:
+                    self.switch_timeline(-1)
+                elif event.key == pygame.K_DOWN:
+                    self.switch_timeline(1)
+                elif event.key == pygame.K_a:
+                    self.start_analysis()
+                elif event.key == pygame.K_F3:
+                    self.toggle_hud()
+            elif event.type in EXPOSE_EVENTS:
+                self.mark_dirty()
+
+    def wait_events(self):
+        # Wake up at least when a ticking clock needs a new second drawn
+        timeout = 200 if self.game.clock and self.game.clock.running is not None else 0
+        event = pygame.event.wait(timeout) # 0 waits forever
+        events = pygame.event.get()
+        if event.type != pygame.NOEVENT:
+            events.insert(0, event)
+        return events
+
+    def connect_engine(self, launch):
+        """Runs `launch()` on a worker thread while the board is already playable.
+
+        `launch` returns a started engine, or None if there is none; the
+        engine joins the game as soon as it is ready.
+        """
+        self.engine_status = "connecting"
+
+        def run():
+            engine = None
+            try:
+                engine = launch()
+            finally:
+                if engine:
+                    engine.supervisor.on_status = self.engine_status_changed
+                if engine and self.profiler:
+                    engine.profiler = self.profiler
+                self.engine = engine
+                self.engine_status = "ready" if engine else "failed"
+                self.post_engine_event()
+
+        self.engine_thread = threading.Thread(target=run, daemon=True)
+        self.engine_thread.start()
+
+    def engine_status_changed(self, status):
+        # Called from the supervisor's restart thread
+        self.engine_status = status
+        self.post_engine_event()
+
+    def enable_profiler(self, profiler=None):
+        """Starts timing the draw phases, event handling and engine searches."""
+        from src.profiler import Profiler
+        self.profiler = profiler or Profiler()
+        if self.engine:
+            self.engine.profiler = self.profiler
+
+    def timed(self, name):
+        return self.profiler.timed(name) if self.profiler else NULL_TIMER
+
+    def toggle_hud(self):
+        # Showing the HUD for the first time is what turns profiling on
+        if not self.profiler:
+            self.enable_profiler()
+        self.show_hud = not self.show_hud
+        self.hud_cache = (0.0, [])
+
+    def post_engine_event(self, event_type=ENGINE_EVENT):
+        # Called from the search thread; pygame's event queue is thread-safe
+        try:
+            pygame.event.post(pygame.event.Event(event_type))
+        except pygame.error:
+            pass # Display already closed
+
+    def set_analysis_panel(self, show):
+        self.cancel_search()
+        self.show_analysis = show
+        if not show:
+            self.stop_live_analysis()
+        width = WIDTH + PANEL_WIDTH if show else WIDTH
+        self.screen = pygame.display.set_mode((width, HEIGHT))
+        self.mark_dirty()
+
+    def restart_live_analysis(self):
+        self.stop_live_analysis()
+        if self.game.is_game_over():
+            return
+        self.live_analysis = self.engine.start_analysis(self.game.board, ANALYSIS_LINES, self.post_engine_event)
+
+    def stop_live_analysis(self):
+        if self.live_analysis:
+            self.live_analysis.stop()
+            self.live_analysis = None
+        self.panel_cache = (None, [])
+
+    def start_analysis(self):
+        """Annotates the current timeline, unless that is already under way."""
+        if not self.analyzer:
+            return
+        line = self.game.tree.line()
+        ids = tuple(node.id for node in line)
+        if ids == self.analysis_line:
+            return
+        if self.analysis:
+            self.analysis.cancel()
+
+        def on_annotation(annotation):
+            # Worker thread: store the result and wake the main loop
+            self.annotations[line[annotation.ply + 1].id] = annotation
+            self.post_engine_event(ANALYSIS_EVENT)
+
+        self.analysis_line = ids
+        self.analysis = self.analyzer.analyse([node.move for node in line[1:]], self.game.board.root().fen(), on_annotation)
+
+    def mark_dirty(self, rect=None):
+        """Queues `rect` (default: the whole window) for the next redraw."""
+        self.dirty_rects.append(rect or self.screen.get_rect())
+
+    def square_rect(self, col, rank):
+        x, y = self.square_origin(chess.square(col, rank))
+        return pygame.Rect(x, y, SQUARE_SIZE, SQUARE_SIZE)
+
+    def get_view_state(self):
+        board = self.game.board
+        last_move = board.peek() if board.move_stack else None
+        return {
+            "board": (board.fen(), last_move, self.game.is_time_out()),
+            "toggles": (self.show_lines, self.show_heat, self.engine_status, self.show_hud),
+            "selected": self.selected_square,
+            "clocks": self.clock_labels() if self.game.clock else None,
+            "analysis": self.analysis_label(),
+            "panel": self.live_analysis.version if self.live_analysis else None,
+            "hud": self.hud_rows() if self.show_hud else None,
+        }
+
+    def update_dirty(self):
+        # Work out what changed since the last redraw
+        state = self.get_view_state()
+        old = self.view_state
+        if old is None or state["board"] != old["board"] or state["toggles"] != old["toggles"]:
+            self.mark_dirty()
+        else:
+            if state["selected"] != old["selected"]:
+                for square in (old["selected"], state["selected"]):
+                    if square:
+                        self.mark_dirty(self.square_rect(*square))
+            if state["clocks"] != old["clocks"]:
+                self.mark_dirty(self.clock_rect)
+            if state["analysis"] != old["analysis"]:
+                self.mark_dirty(self.analysis_rect)
+            if state["panel"] != old["panel"]:
+                self.mark_dirty(self.panel_rect)
+            if state["hud"] != old["hud"]:
+                self.mark_dirty(self.hud_rect)
+        self.view_state = state
+
+        if not self.dirty_rects:
+            return
+        # The scene is cheap to compose off-screen; pushing pixels to the window is what we limit
+        self.draw_game()
+        if any(rect == self.screen.get_rect() for rect in self.dirty_rects):
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.dirty_rects)
+        self.dirty_rects = []
+
+    def sample_cpu(self):
+        now, cpu = time.perf_counter(), time.process_time()
+        wall = now - self.cpu_mark[0]
+        if wall >= 1.0:
+            self.cpu_load = (cpu - self.cpu_mark[1]) / wall
+            self.cpu_samples.append(self.cpu_load)
+            self.cpu_mark = (now, cpu)
+
+    def apply_search_result(self):
+        search = self.search
+        self.search = None
+        # Never push a move onto a board that changed while the engine was thinking
+        if search.cancelled or search.is_stale(self.game.board):
+            return
+        if search.move and self.game.is_legal(search.move):
+            self.game.push_move(search.move)
+            self.play_move_sound() # Sound
+            # Think on the player's time about the reply we expect
+            self.engine.start_ponder(self.game.board, search)
+        else:
+            print("Engine failed to return move.")
+            if not self.engine.available and not self.engine.connecting:
+                # Not even a fresh engine process could be started: carry on without one
+                self.engine = None
+                self.engine_status = "failed"
+
+    def cancel_search(self):
+        if self.search:
+            self.search.cancel()
+            self.search = None
+        if self.engine:
+            self.engine.stop_ponder()
+
     def handle_click(self, pos):
         # UI Clicks
         if self.chk_lines_rect.collidepoint(pos):
@@ -226,6 +452,9 @@ class ChessGUI:
         if self.chk_heat_rect.collidepoint(pos):
              self.show_heat = not self.show_heat
              return
+        if self.engine and self.chk_analysis_rect.collidepoint(pos):
+            self.set_analysis_panel(not self.show_analysis)
+            return
              
         # New Game Button Check (only if game is over)
         if self.game.is_game_over():
@@ -233,6 +462,10 @@ class ChessGUI:
                 self.reset_game()
                 return
 
+        # Board is locked while the engine is thinking
+        if self.search:
+            return
+
         square = self.get_square_under_mouse(pos)
         if square:
             col, rank = square
@@ -244,14 +477,14 @@ class ChessGUI:
                 move = chess.Move(prev_sq, sq_idx)
                 
                 # Auto-promote to Queen
-                if chess.Move(prev_sq, sq_idx, promotion=chess.QUEEN) in self.game.board.legal_moves:
+                if self.game.is_legal(chess.Move(prev_sq, sq_idx, promotion=chess.QUEEN)):
                     move.promotion = chess.QUEEN
 
-                if move in self.game.board.legal_moves:
-                    self.game.board.push(move)
+                if self.game.is_legal(move):
+                    # In the past this starts a new timeline; the old one is kept
+                    self.game.push_move(move)
                     self.play_move_sound() # Sound
                     self.selected_square = None
-                    self.redo_stack.clear() # Clear future history on new branch
                 else:
                     if self.game.board.piece_at(sq_idx) and self.game.board.piece_at(sq_idx).color == self.game.board.turn:
                         self.selected_square = square
@@ -262,113 +495,7 @@ class ChessGUI:
                     self.selected_square = square
 
     def draw_overlays(self):
-        # 1. Heatmap (Colored Transparent Overlays)
-        if self.show_heat:
-            # Reuse surface
-            if not hasattr(self, 'heat_surface'):
-                 self.heat_surface = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE))
-
-            # Calculate attack counts for White and Black separately
-            white_attacks = [0] * 64
-            black_attacks = [0] * 64
-            
-            for sq in chess.SQUARES:
-                piece = self.game.board.piece_at(sq)
-                if piece:
-                    attacks = self.game.board.attacks(sq)
-                    target_list = attacks # Bitboard to list iteration happens implicity or we iterate
-                    # Actually board.attacks returns a Bitboard, we need to iterate squares
-                    # Bitboard is iterable yielding square indices? Yes in python-chess it behaves like set of squares
-                    
-                    if piece.color == chess.WHITE:
-                        for target in attacks:
-                            white_attacks[target] += 1
-                    else:
-                        for target in attacks:
-                            black_attacks[target] += 1
-            
-            # Draw overlays
-            for sq in chess.SQUARES:
-                w_count = white_attacks[sq]
-                b_count = black_attacks[sq]
-                
-                if w_count > 0 or b_count > 0:
-                    c = chess.square_file(sq)
-                    r = 7 - chess.square_rank(sq)
-                    x = OFFSET_X + c * SQUARE_SIZE
-                    y = OFFSET_Y + r * SQUARE_SIZE
-                    
-                    # Logic: 
-                    # If only White attacks -> Blue
-                    # If only Black attacks -> Red
-                    # If both -> Purple/Mixed? Or Dominant?
-                    # Let's mix colors.
-                    
-                    # Base colors
-                    # Blue: (100, 100, 255) | Red: (255, 100, 100)
-                    
-                    # Calculate net intensity
-                    # We can simply draw Red then Blue on top with additive blending or just calculate final color
-                    
-                    total_attacks = w_count + b_count
-                    intensity = min(200, 40 + total_attacks * 30)
-                    
-                    # Mix Color
-                    # Simple lerp based on ratio
-                    if total_attacks > 0:
-                        r_ratio = b_count / total_attacks # Black is Red
-                        b_ratio = w_count / total_attacks # White is Blue
-                        
-                        color_r = int(255 * r_ratio)
-                        color_b = int(255 * b_ratio)
-                        color_g = 0 
-                        
-                        # Fix for purely blue or red to look nice
-                        if b_count == 0: color_b = 50 # slight tint
-                        if w_count == 0: color_r = 50
-                    
-                    else:
-                        continue # Should not happen inside this if
-
-                    self.heat_surface.fill((color_r, color_g, color_b))
-                    self.heat_surface.set_alpha(intensity)
-                    self.screen.blit(self.heat_surface, (x, y))
-
-        # 2. Scope Lines
-        if self.show_lines:
-            if not hasattr(self, 'line_surface'):
-                self.line_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            
-            self.line_surface.fill((0, 0, 0, 0)) # Clear
-            
-            for sq in chess.SQUARES:
-                piece = self.game.board.piece_at(sq)
-                if piece:
-                    start_col = chess.square_file(sq)
-                    start_row = 7 - chess.square_rank(sq)
-                    start_pos = (
-                        OFFSET_X + start_col * SQUARE_SIZE + SQUARE_SIZE // 2,
-                        OFFSET_Y + start_row * SQUARE_SIZE + SQUARE_SIZE // 2
-                    )
-                    
-                    # Line Color based on piece color
-                    if piece.color == chess.WHITE:
-                        line_color = (100, 100, 255, 80) # Blue, semi-transparent
-                    else:
-                        line_color = (255, 100, 100, 80) # Red, semi-transparent
-
-                    attacks = self.game.board.attacks(sq)
-                    for target in attacks:
-                        t_col = chess.square_file(target)
-                        t_row = 7 - chess.square_rank(target)
-                        end_pos = (
-                            OFFSET_X + t_col * SQUARE_SIZE + SQUARE_SIZE // 2,
-                            OFFSET_Y + t_row * SQUARE_SIZE + SQUARE_SIZE // 2
-                        )
-                        
-                        pygame.draw.line(self.line_surface, line_color, start_pos, end_pos, 2)
-            
-            self.screen.blit(self.line_surface, (0, 0))
+        self.renderer.draw_overlays(self.screen, self.game.board, BOARD_ORIGIN, self.show_heat, self.show_lines)
 
     def draw_ui(self):
         # Draw Checkboxes
@@ -386,17 +513,57 @@ class ChessGUI:
         text_heat = self.ui_font.render("Show Scope", True, (0,0,0))
         self.screen.blit(text_heat, (self.chk_heat_rect.x + 10, self.chk_heat_rect.y + 5))
 
+        # Analysis (only with an engine)
+        if self.engine_status in ("connecting", "failed"):
+            label = "Engine connecting..." if self.engine_status == "connecting" else "No engine"
+            text = self.ui_font.render(label, True, (200, 200, 200))
+            self.screen.blit(text, (self.chk_analysis_rect.x, self.chk_analysis_rect.y + 5))
+        elif self.engine:
+            color_analysis = (100, 200, 100) if self.show_analysis else (100, 100, 100)
+            pygame.draw.rect(self.screen, color_analysis, self.chk_analysis_rect)
+            pygame.draw.rect(self.screen, (255,255,255), self.chk_analysis_rect, 2)
+            text_analysis = self.ui_font.render("Analysis", True, (0,0,0))
+            self.screen.blit(text_analysis, (self.chk_analysis_rect.x + 10, self.chk_analysis_rect.y + 5))
+        if self.show_analysis:
+            self.draw_analysis_panel()
+        if self.show_hud:
+            self.draw_hud()
+
+        # Clocks
+        if self.game.clock:
+            self.draw_clocks()
+
+        # Game explorer: what was played from here in the indexed games
+        if self.position_index:
+            self.draw_explorer()
+
+        # Annotation of the move that led here, or analysis progress
+        label = self.analysis_label()
+        if label:
+            text = self.ui_font.render(label, True, (200, 200, 200))
+            self.screen.blit(text, (20, self.analysis_rect.y + 5))
+
+        # Timeline indicator when the current ply has alternatives
+        siblings = self.game.tree.siblings(self.game.tree.current)
+        if len(siblings) > 1:
+            index = siblings.index(self.game.tree.current) + 1
+            text = self.ui_font.render(f"Timeline {index}/{len(siblings)} (Up/Down)", True, (200, 200, 200))
+            self.screen.blit(text, (20, HEIGHT - 40))
+
         # Game Status Message
         status_text = ""
         is_game_over = False
         
-        if self.game.board.is_checkmate():
+        if self.game.is_time_out():
+            status_text = "TIME OUT"
+            is_game_over = True
+        elif self.game.is_checkmate():
             status_text = "CHECKMATE!"
             is_game_over = True
-        elif self.game.board.is_stalemate():
+        elif self.game.is_stalemate():
             status_text = "STALEMATE"
             is_game_over = True
-        elif self.game.board.is_check():
+        elif self.game.is_check():
             status_text = "CHECK!"
             # Check is NOT game over, just a warning
         
@@ -426,17 +593,138 @@ class ChessGUI:
                 rect = text_surf.get_rect(center=(WIDTH//2, HEIGHT - 50))
                 self.screen.blit(text_surf, rect)
     
+    def draw_explorer(self):
+        board = self.game.board
+        key = (board.fen(), len(board.move_stack))
+        if self.explorer_cache[0] != key:
+            # A Zobrist collision can bring in moves from another position entirely
+            stats = [(move, entry) for move, entry in self.position_index.move_stats(board) if move in board.legal_moves]
+            self.explorer_cache = (key, stats)
+        stats = self.explorer_cache[1]
+        if stats:
+            parts = []
+            for move, entry in stats[:3]:
+                # White wins / draws / Black wins in percent
+                w, d, b = (round(100 * entry[k] / entry["games"]) for k in ("white", "draws", "black"))
+                parts.append(f"{board.san(move)} {entry['games']} ({w}/{d}/{b}%)")
+            label = "Games: " + "   ".join(parts)
+        else:
+            label = "Games: no indexed games reach this position"
+        text = self.ui_font.render(label, True, (200, 200, 200))
+        self.screen.blit(text, (20, 65))
+
+    def draw_analysis_panel(self):
+        pygame.draw.rect(self.screen, (45, 45, 45), self.panel_rect)
+        live = self.live_analysis
+        if live is None:
+            rows = ["Engine: connecting..." if self.engine_status == "connecting" else "Engine: game over"]
+        else:
+            # Text is only re-rendered when new engine lines came in
+            if self.panel_cache[0] != live.version:
+                self.panel_cache = (live.version, self.panel_rows(live.board, live.snapshot()))
+            rows = self.panel_cache[1]
+        for i, row in enumerate(rows):
+            text = self.ui_font.render(row, True, (220, 220, 220))
+            self.screen.blit(text, (self.panel_rect.x + 15, 20 + i * 30))
+
+    def panel_rows(self, board, lines):
+        if not lines:
+            return ["Engine: thinking..."]
+        rows = [f"Engine: depth {max(depth or 0 for _, depth, _ in lines)}"]
+        for score, _, pv in lines:
+            white = score.white()
+            label = f"#{white.mate()}" if white.is_mate() else f"{white.score() / 100:+.2f}"
+            # As many moves of the line as fit the panel
+            moves = board.variation_san(pv).split()
+            while moves and self.ui_font.size(f"{label}  {' '.join(moves)}")[0] > PANEL_WIDTH - 30:
+                moves.pop()
+            rows.append(f"{label}  {' '.join(moves)}")
+        return rows
+
+    def draw_hud(self):
+        s = pygame.Surface(self.hud_rect.size, pygame.SRCALPHA)
+        s.fill((0, 0, 0, 180))
+        self.screen.blit(s, self.hud_rect)
+        for i, row in enumerate(self.hud_rows()):
+            text = self.ui_font.render(row, True, (255, 255, 255))
+            self.screen.blit(text, (self.hud_rect.x + 10, self.hud_rect.y + 8 + i * 30))
+
+    def hud_rows(self):
+        # Refreshed on a timer: redrawing on every new sample would itself produce new samples
+        now = time.perf_counter()
+        if now - self.hud_cache[0] < HUD_REFRESH:
+            return self.hud_cache[1]
+
+        def ms(name):
+            histogram = self.profiler.histograms.get(name)
+            if not histogram or not histogram.count:
+                return "-"
+            return f"p50 {histogram.percentile(50) * 1000:.1f} p99 {histogram.percentile(99) * 1000:.1f} ms"
+
+        nps = self.profiler.histograms.get("nps")
+        rows = [f"Frame {ms('frame')}", f"Draw {ms('draw')}", f"Engine {ms('engine')}",
+                f"Engine {nps.percentile(50) / 1000:.0f} knodes/s" if nps and nps.count else "Engine - nodes/s"]
+        self.hud_cache = (now, rows)
+        return rows
+
+    def analysis_label(self):
+        if not self.analysis:
+            return None
+        annotation = self.annotations.get(self.game.tree.current.id)
+        if annotation:
+            board = self.game.board
+            # The move was played by the side not to move now
+            number = f"{board.fullmove_number}." if board.turn == chess.BLACK else f"{board.fullmove_number - 1}..."
+            from src.game_analysis import NAGS
+            label = f"{number} {annotation.san}{NAGS.get(annotation.label, '')}  {annotation.before / 100:+.2f} -> {annotation.after / 100:+.2f}"
+            if annotation.label:
+                label += f"  {annotation.label}, best was {annotation.best_san}"
+        else:
+            label = ""
+        done, total = self.analysis.progress()
+        if done < total and not self.analysis.done:
+            label = f"{label}  (analysing {done}/{total})".strip()
+        return label
+
+    def clock_labels(self):
+        clock = self.game.clock
+        labels = []
+        for color in (chess.WHITE, chess.BLACK):
+            minutes, seconds = divmod(int(clock.time_left(color)), 60)
+            label = "White" if color == chess.WHITE else "Black"
+            # Highlight the clock that is ticking
+            text_color = (255, 255, 255) if clock.running == color else (150, 150, 150)
+            labels.append((f"{label} {minutes}:{seconds:02d}", text_color))
+        return labels
+
+    def draw_clocks(self):
+        for i, (label, text_color) in enumerate(self.clock_labels()):
+            text = self.ui_font.render(label, True, text_color)
+            self.screen.blit(text, (self.clock_rect.x + i * 130, self.clock_rect.y + 5))
+
     def reset_game(self):
+        self.cancel_search()
+        self.stop_live_analysis()
+        if self.analysis:
+            self.analysis.cancel()
+        self.analysis = None
+        self.analysis_line = None
+        self.annotations = {}
         self.game.reset()
         self.selected_square = None
         self.running = True # Should already be true if we are clicking
         # Clear/Reset engine if needed (usually just board reset is enough)
 
     def draw_game(self):
-        self.draw_board()
-        self.draw_overlays() # New Overlay Layer
-        self.draw_pieces()
-        self.draw_ui() # New UI Layer
+        with self.timed("draw"):
+            with self.timed("draw_board"):
+                self.draw_board()
+            with self.timed("draw_overlays"):
+                self.draw_overlays() # New Overlay Layer
+            with self.timed("draw_pieces"):
+                self.draw_pieces()
+            with self.timed("draw_ui"):
+                self.draw_ui() # New UI Layer
 
 if __name__ == "__main__":
     game = ChessGame()
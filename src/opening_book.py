@@ -0,0 +1,72 @@
+import random
+import struct
+from collections import defaultdict
+import chess
+import chess.polyglot
+
+class OpeningBook:
+    """Polyglot (.bin) opening book consulted before the engine.
+
+    python-chess memory-maps the file and binary-searches it by Zobrist key,
+    so opening even a very large book is instant and the pages are shared
+    through the OS page cache.
+    """
+
+    def __init__(self, path, max_depth=20, weighted=True, seed=None):
+        self.path = path
+        self.max_depth = max_depth # In plies
+        self.weighted = weighted
+        self.random = random.Random(seed)
+        self.reader = chess.polyglot.open_reader(path)
+
+    def choose(self, board):
+        """Returns a book move for `board`, or None when out of book."""
+        if board.ply() >= self.max_depth:
+            return None
+        try:
+            if self.weighted:
+                entry = self.reader.weighted_choice(board, random=self.random)
+            else:
+                entry = self.reader.find(board)
+        except IndexError:
+            return None
+        return entry.move
+
+    def moves(self, board):
+        """All book moves for `board` with their weights."""
+        return [(entry.move, entry.weight) for entry in self.reader.find_all(board)]
+
+    def close(self):
+        self.reader.close()
+
+
+def encode_move(board, move):
+    """Polyglot move encoding. Castling is stored as king-takes-rook."""
+    to_square = move.to_square
+    if board.is_castling(move):
+        rook_file = 7 if board.is_kingside_castling(move) else 0
+        to_square = chess.square(rook_file, chess.square_rank(move.from_square))
+    raw = to_square | (move.from_square << 6)
+    if move.promotion:
+        raw |= (move.promotion - 1) << 12
+    return raw
+
+
+def write_polyglot_book(path, lines):
+    """Writes a Polyglot book from opening lines.
+
+    `lines` is an iterable of (uci_moves, weight) pairs, e.g.
+    (["e2e4", "e7e5"], 10). Weights of repeated moves are summed.
+    """
+    weights = defaultdict(int)
+    for moves, weight in lines:
+        board = chess.Board()
+        for uci in moves:
+            move = chess.Move.from_uci(uci)
+            weights[(chess.polyglot.zobrist_hash(board), encode_move(board, move))] += weight
+            board.push(move)
+
+    with open(path, "wb") as f:
+        # Polyglot requires entries sorted by key
+        for (key, raw), weight in sorted(weights.items()):
+            f.write(struct.pack(">QHHI", key, raw, min(weight, 0xFFFF), 0))
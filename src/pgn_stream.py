@@ -0,0 +1,245 @@
+"""Streaming reader for large PGN files.
+
+Games are cut out of the file by byte offset (a game starts with the first
+tag line after the previous game's movetext, whichever tag that is) and
+parsed one at a time with chess.pgn.read_game, so memory use does not grow
+with the file. The file can also be split into chunks that are parsed in
+parallel worker processes, at most two chunks per worker at a time, and
+reading can resume from the byte offset of any game.
+
+    python -m src.pgn_stream games.pgn [--workers 4] [--offset N]
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import time
+from array import array
+from collections import deque, namedtuple
+
+import chess
+import chess.pgn
+
+from src.game_logic import ChessGame
+
+try:
+    import resource
+except ImportError: # Not available on Windows
+    resource = None
+
+# offset: byte offset of the game in the file (resume from here)
+# moves: mainline moves packed to 16 bits each, see pack_move()
+GameRecord = namedtuple("GameRecord", ["offset", "headers", "moves"])
+
+# Chunks handed to each worker at once; parsed chunks are held until their turn comes
+CHUNKS_PER_WORKER = 2
+
+
+def pack_move(move):
+    """from (6 bits) | to (6 bits) | promotion piece type (3 bits)."""
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def unpack_move(value):
+    return chess.Move(value & 0x3F, (value >> 6) & 0x3F, (value >> 12) & 0x7 or None)
+
+
+def record_to_game(record):
+    """Replays a GameRecord into a ChessGame."""
+    game = ChessGame(fen=record.headers.get("FEN"))
+    for value in record.moves:
+        game.push_move(unpack_move(value))
+    return game
+
+
+class _MoveArrayVisitor(chess.pgn.BaseVisitor):
+    """Collects headers and the mainline as packed moves; skips variations."""
+
+    def begin_game(self):
+        self.headers = {}
+        self.moves = array("H")
+        self.error = None
+
+    def visit_header(self, tagname, tagvalue):
+        self.headers[tagname] = tagvalue
+
+    def begin_variation(self):
+        return chess.pgn.SKIP
+
+    def visit_move(self, board, move):
+        self.moves.append(pack_move(move))
+
+    def handle_error(self, error):
+        # Keep the moves read so far instead of aborting the whole stream
+        self.error = error
+
+    def result(self):
+        return self.headers, self.moves
+
+
+def _is_tag(line):
+    return line.startswith(b"[")
+
+
+def _follows_tag(f, pos):
+    """Whether the last non-blank line before byte `pos` is a tag line (False at the start of the file)."""
+    end = pos
+    tail = b""
+    while end > 0:
+        begin = max(0, end - 4096)
+        f.seek(begin)
+        tail = f.read(end - begin) + tail
+        lines = tail.splitlines()
+        # The first line may be cut off unless it starts the file
+        for line in reversed(lines if begin == 0 else lines[1:]):
+            if line.strip():
+                return _is_tag(line)
+        end = begin
+    return False
+
+
+def _iter_spans(f, start, end):
+    """Yields (offset, raw bytes) for each game whose first line starts in [start, end).
+
+    A game starts at a tag line that does not follow another tag line, so
+    games are split on the gap between one game's movetext and the next
+    game's tags, in whatever order the tags come.
+    """
+    if start > 0:
+        f.seek(start - 1)
+        pos = start - 1 + len(f.readline()) # Skip to the first line starting at or after `start`
+        in_tags = _follows_tag(f, pos)
+        f.seek(pos)
+        current = None # Lines before our first game belong to the previous chunk
+    else:
+        f.seek(0)
+        pos = 0
+        in_tags = False
+        current = [] # Text before the first tag still gets parsed
+    current_offset = pos
+    for line in f:
+        if _is_tag(line) and not in_tags:
+            if current:
+                yield current_offset, b"".join(current)
+            if end is not None and pos >= end:
+                return
+            current_offset = pos
+            current = [line]
+        elif current is not None:
+            current.append(line)
+        if line.strip():
+            in_tags = _is_tag(line)
+        pos += len(line)
+    if current:
+        yield current_offset, b"".join(current)
+
+
+def _parse_span(offset, data):
+    handle = io.StringIO(data.decode("utf-8", errors="replace"))
+    while True:
+        parsed = chess.pgn.read_game(handle, Visitor=_MoveArrayVisitor)
+        if parsed is None:
+            return
+        headers, moves = parsed
+        if headers or moves:
+            yield GameRecord(offset, headers, moves)
+
+
+def _parse_chunk(args):
+    path, start, end = args
+    with open(path, "rb") as f:
+        return [record for offset, data in _iter_spans(f, start, end) for record in _parse_span(offset, data)]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its finished children, in MB."""
+    if resource is None:
+        return None, None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if os.uname().sysname == "Darwin" else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+
+
+class PgnReader:
+    def __init__(self, path, workers=1, chunk_bytes=16 * 1024 * 1024):
+        self.path = path
+        self.workers = workers
+        self.chunk_bytes = chunk_bytes
+        self.games_read = 0
+        self.bytes_read = 0
+        self.seconds = 0.0
+
+    def records(self, offset=0):
+        """Yields GameRecords in file order, starting at byte `offset`."""
+        start = time.perf_counter()
+        size = os.path.getsize(self.path)
+        try:
+            if self.workers <= 1:
+                with open(self.path, "rb") as f:
+                    for span_offset, data in _iter_spans(f, offset, None):
+                        for record in _parse_span(span_offset, data):
+                            self.games_read += 1
+                            yield record
+            else:
+                chunks = ((self.path, chunk, min(chunk + self.chunk_bytes, size))
+                          for chunk in range(offset, size, self.chunk_bytes))
+                # Spawned, not forked: the caller may have threads running (pygame, engines)
+                # and a forked child can inherit one of their locks held
+                with multiprocessing.get_context("spawn").Pool(self.workers) as pool:
+                    # Results come back in file order, with a bounded number of chunks in flight
+                    pending = deque()
+                    for chunk in chunks:
+                        pending.append(pool.apply_async(_parse_chunk, (chunk,)))
+                        if len(pending) < self.workers * CHUNKS_PER_WORKER:
+                            continue
+                        yield from self._count(pending.popleft().get())
+                    while pending:
+                        yield from self._count(pending.popleft().get())
+        finally:
+            self.bytes_read += size - offset
+            self.seconds += time.perf_counter() - start
+
+    def _count(self, records):
+        for record in records:
+            self.games_read += 1
+            yield record
+
+    def games(self, offset=0):
+        """Like records(), but yields ChessGame objects."""
+        for record in self.records(offset):
+            yield record_to_game(record)
+
+    def report(self):
+        rss_self, rss_children = peak_rss_mb()
+        return {
+            "games": self.games_read,
+            "bytes": self.bytes_read,
+            "seconds": self.seconds,
+            "games_per_second": self.games_read / self.seconds if self.seconds else 0.0,
+            "peak_rss_mb": rss_self,
+            "peak_rss_children_mb": rss_children,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream games out of a PGN file.")
+    parser.add_argument("pgn")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--offset", type=int, default=0, help="Resume from this byte offset")
+    parser.add_argument("--chunk-mb", type=int, default=16)
+    args = parser.parse_args()
+
+    reader = PgnReader(args.pgn, args.workers, args.chunk_mb * 1024 * 1024)
+    last_offset = args.offset
+    for record in reader.records(args.offset):
+        last_offset = record.offset
+    report = reader.report()
+    print(f"{report['games']} games in {report['seconds']:.1f}s ({report['games_per_second']:.0f} games/sec)")
+    if report["peak_rss_mb"] is not None:
+        print(f"Peak RSS: {report['peak_rss_mb']:.1f} MB (workers: {report['peak_rss_children_mb']:.1f} MB)")
+    print(f"Last game offset: {last_offset}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""On-disk index from position (Zobrist hash) to the games that reach it.
+
+An index is a directory of immutable segments plus a results file:
+
+    seg_NNNNN.idx   count u64 | keys u64[count] | next moves u16[count]
+                    | results u8[count] | games u32[count] | plies u16[count]
+    results.bin     one result code per game id (see game_records.RESULTS)
+
+Entries are sorted by (key, next move, result), and segments are
+memory-mapped and searched with bisect. Per-move statistics therefore cost
+a handful of binary searches per move however many games reach the
+position. New games are
+buffered and written as a new segment on flush(); once there are too many
+segments they are merged into one.
+
+    python -m src.position_index build games.pgn|games.bin index_dir
+"""
+import argparse
+import bisect
+import heapq
+import mmap
+import os
+import re
+import struct
+import time
+from array import array
+
+import chess
+import chess.polyglot
+
+from src.game_records import RESULTS, GameRecordFile
+from src.pgn_stream import PgnReader, pack_move, unpack_move
+
+SEGMENT_HEADER = struct.Struct("<Q")
+SEGMENT_NAME = re.compile(r"seg_(\d+)\.idx")
+
+
+def segment_number(path):
+    """The NNNNN of seg_NNNNN.idx, or None for any other file."""
+    match = SEGMENT_NAME.fullmatch(os.path.basename(path))
+    return int(match.group(1)) if match else None
+
+
+class Segment:
+    COLUMNS = [("keys", "Q"), ("moves", "H"), ("results", "B"), ("games", "I"), ("plies", "H")]
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "rb")
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.mm)
+        (count,) = SEGMENT_HEADER.unpack_from(self.mm, 0)
+        self.views = [view]
+        offset = SEGMENT_HEADER.size
+        # Widest columns first keeps every column aligned
+        for name, code in sorted(self.COLUMNS, key=lambda column: -struct.calcsize(column[1])):
+            size = struct.calcsize(code)
+            column = view[offset:offset + count * size].cast(code)
+            setattr(self, name, column)
+            self.views.append(column)
+            offset += count * size
+
+    def __len__(self):
+        return len(self.keys)
+
+    def find(self, key):
+        return bisect.bisect_left(self.keys, key), bisect.bisect_right(self.keys, key)
+
+    def entries(self):
+        for i in range(len(self.keys)):
+            yield self.keys[i], self.moves[i], self.results[i], self.games[i], self.plies[i]
+
+    def close(self):
+        for view in reversed(self.views):
+            view.release()
+        self.mm.close()
+        self.f.close()
+
+    @classmethod
+    def write(cls, path, entries, count):
+        """Writes `count` entries (key, move, result, game, ply), already sorted."""
+        columns = {name: array(code) for name, code in cls.COLUMNS}
+        appends = [columns[name].append for name, _ in cls.COLUMNS]
+        for entry in entries:
+            for append, value in zip(appends, entry):
+                append(value)
+        assert len(columns["keys"]) == count
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(SEGMENT_HEADER.pack(count))
+            for name, code in sorted(cls.COLUMNS, key=lambda column: -struct.calcsize(column[1])):
+                columns[name].tofile(f)
+        os.replace(tmp, path) # Readers never see a half-written segment
+
+
+class PositionIndex:
+    def __init__(self, directory, flush_entries=1_000_000, max_segments=8):
+        self.directory = directory
+        self.flush_entries = flush_entries
+        self.max_segments = max_segments
+        os.makedirs(directory, exist_ok=True)
+
+        self.results = bytearray()
+        results_path = os.path.join(directory, "results.bin")
+        if os.path.exists(results_path):
+            with open(results_path, "rb") as f:
+                self.results = bytearray(f.read())
+        self.results_written = len(self.results)
+
+        names = [name for name in os.listdir(directory) if segment_number(name) is not None]
+        self.segments = [Segment(os.path.join(directory, name)) for name in sorted(names, key=segment_number)]
+        self.pending = []
+
+    def add_game(self, moves, result="*", fen=None):
+        """Indexes every position of a game and returns its game id.
+
+        A position the game reaches more than once is indexed at its first
+        visit only, so each game counts once in move_stats().
+        """
+        game_id = len(self.results)
+        code = RESULTS.index(result) if result in RESULTS else 0
+        self.results.append(code)
+        board = chess.Board(fen) if fen else chess.Board()
+        seen = set()
+        for ply, move in enumerate(moves):
+            key = chess.polyglot.zobrist_hash(board)
+            if key not in seen:
+                seen.add(key)
+                self.pending.append((key, pack_move(move), code, game_id, ply))
+            board.push(move)
+        key = chess.polyglot.zobrist_hash(board)
+        if key not in seen:
+            self.pending.append((key, 0, code, game_id, len(moves))) # Final position
+        if len(self.pending) >= self.flush_entries:
+            self.flush()
+        return game_id
+
+    def flush(self):
+        """Writes buffered games to disk and makes them visible to lookups."""
+        with open(os.path.join(self.directory, "results.bin"), "ab") as f:
+            f.write(self.results[self.results_written:])
+        self.results_written = len(self.results)
+
+        if self.pending:
+            self.pending.sort()
+            path = self._segment_path()
+            Segment.write(path, self.pending, len(self.pending))
+            self.pending = []
+            self.segments.append(Segment(path))
+        if len(self.segments) > self.max_segments:
+            self.compact()
+
+    def compact(self):
+        """Merges all segments into one, streaming so memory use stays flat."""
+        if len(self.segments) < 2:
+            return
+        count = sum(len(segment) for segment in self.segments)
+        path = self._segment_path()
+        Segment.write(path, heapq.merge(*[segment.entries() for segment in self.segments]), count)
+        for segment in self.segments:
+            segment.close()
+            os.remove(segment.path)
+        self.segments = [Segment(path)]
+
+    def _segment_path(self):
+        number = 0
+        if self.segments:
+            number = segment_number(self.segments[-1].path) + 1
+        return os.path.join(self.directory, f"seg_{number:05d}.idx")
+
+    def lookup(self, board):
+        """(game id, ply, next move or None) for every indexed game reaching `board`."""
+        key = chess.polyglot.zobrist_hash(board)
+        hits = []
+        for segment in self.segments:
+            lo, hi = segment.find(key)
+            for i in range(lo, hi):
+                move = segment.moves[i]
+                hits.append((segment.games[i], segment.plies[i], unpack_move(move) if move else None))
+        return hits
+
+    def move_stats(self, board):
+        """Per next move: number of games and White wins / draws / Black wins, most played first."""
+        key = chess.polyglot.zobrist_hash(board)
+        stats = {}
+        for segment in self.segments:
+            lo, hi = segment.find(key)
+            # Entries of one position are grouped by move, then by result: count whole groups
+            i = lo
+            while i < hi:
+                packed = segment.moves[i]
+                move_end = bisect.bisect_right(segment.moves, packed, i, hi)
+                if packed: # 0 marks the final position of a game
+                    entry = stats.setdefault(unpack_move(packed), {"games": 0, "white": 0, "draws": 0, "black": 0})
+                    entry["games"] += move_end - i
+                    while i < move_end:
+                        code = segment.results[i]
+                        result_end = bisect.bisect_right(segment.results, code, i, move_end)
+                        result = RESULTS[code]
+                        if result == "1-0":
+                            entry["white"] += result_end - i
+                        elif result == "0-1":
+                            entry["black"] += result_end - i
+                        elif result == "1/2-1/2":
+                            entry["draws"] += result_end - i
+                        i = result_end
+                i = move_end
+        return sorted(stats.items(), key=lambda item: -item[1]["games"])
+
+    def close(self):
+        self.flush()
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+
+
+def build(source, directory):
+    index = PositionIndex(directory)
+    start = time.perf_counter()
+    games = 0
+    if source.endswith(".pgn"):
+        for record in PgnReader(source).records():
+            index.add_game([unpack_move(v) for v in record.moves], record.headers.get("Result", "*"), record.headers.get("FEN"))
+            games += 1
+    else:
+        with GameRecordFile(source) as records:
+            for n in range(len(records)):
+                fen = records.fen(n)
+                index.add_game([unpack_move(v) for v in records.moves(n)], records.result(n),
+                               None if fen == chess.STARTING_FEN else fen)
+                games += 1
+    index.close()
+    print(f"Indexed {games} games in {time.perf_counter() - start:.1f}s into {directory}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a position index.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("source", help="PGN file or binary game record file")
+    parser.add_argument("directory")
+    args = parser.parse_args()
+    build(args.source, args.directory)
+
+
+if __name__ == "__main__":
+    main()
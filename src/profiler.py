@@ -0,0 +1,144 @@
+"""Opt-in timing of the GUI and engine hot paths.
+
+Every measurement goes into a fixed-size ring buffer per name, so recording
+is a clock read and a list store and memory never grows. Timings are in
+seconds; "nps" holds nodes per second of engine searches. Summaries give
+p50/p99 over the buffered samples and can be exported as JSON or CSV.
+"""
+import contextlib
+import threading
+import time
+
+# Returned by timed() when profiling is off
+NULL_TIMER = contextlib.nullcontext()
+
+
+class RingHistogram:
+    """The last `size` samples of one measurement."""
+
+    def __init__(self, size=1024):
+        self.size = size
+        self.samples = [0.0] * size
+        self.count = 0 # Samples recorded in total, including overwritten ones
+
+    def add(self, value):
+        self.samples[self.count % self.size] = value
+        self.count += 1
+
+    def values(self):
+        """Buffered samples, oldest first."""
+        if self.count <= self.size:
+            return self.samples[:self.count]
+        start = self.count % self.size
+        return self.samples[start:] + self.samples[:start]
+
+    def percentile(self, p):
+        values = sorted(self.values())
+        if not values:
+            return None
+        # Nearest rank
+        return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+    def summary(self):
+        values = self.values()
+        if not values:
+            return {"count": 0, "mean": None, "p50": None, "p99": None, "max": None}
+        return {"count": self.count, "mean": sum(values) / len(values),
+                "p50": self.percentile(50), "p99": self.percentile(99), "max": max(values)}
+
+
+class Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.add(time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    """Named ring-buffer histograms, plus an optional cProfile run over some frames."""
+
+    def __init__(self, size=1024):
+        self.size = size
+        self.histograms = {}
+        self.lock = threading.Lock() # The GUI and engine threads both add histograms
+        self.cprofile = None
+        self.cprofile_frames = 0 # Frames left to profile
+        self.cprofile_path = None
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(name, RingHistogram(self.size))
+        return histogram
+
+    def timed(self, name):
+        """Context manager adding the duration of its block to `name`."""
+        return Timer(self.histogram(name))
+
+    def record(self, name, value):
+        self.histogram(name).add(value)
+
+    def record_search(self, seconds, info):
+        """Latency of one engine search, and its speed if the engine reported nodes."""
+        self.record("engine", seconds)
+        nps = info.get("nps")
+        if nps is None and info.get("nodes") and seconds > 0:
+            nps = info["nodes"] / seconds
+        if nps is not None:
+            self.record("nps", nps)
+
+    def summary(self):
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+        return {name: histogram.summary() for name, histogram in histograms}
+
+    def export(self, path):
+        """Writes the summary to `path`: CSV if it ends in .csv, JSON otherwise.
+
+        JSON also carries the buffered samples of each measurement.
+        """
+        import csv
+        import json
+        summary = self.summary()
+        if path.lower().endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["name", "count", "mean", "p50", "p99", "max"])
+                for name, stats in summary.items():
+                    writer.writerow([name] + [stats[key] for key in ("count", "mean", "p50", "p99", "max")])
+        else:
+            for name, stats in summary.items():
+                stats["samples"] = self.histograms[name].values()
+            with open(path, "w") as f:
+                json.dump(summary, f, indent=1)
+
+    def profile_frames(self, frames, path="frames.prof"):
+        """Runs cProfile over the next `frames` frames and saves the stats to `path`."""
+        import cProfile
+        self.cprofile = cProfile.Profile()
+        self.cprofile_frames = frames
+        self.cprofile_path = path
+        self.cprofile.enable()
+
+    def frame_done(self):
+        """Called by the main loop once per frame; ends a profile_frames() run when it is due."""
+        if self.cprofile is None:
+            return
+        self.cprofile_frames -= 1
+        if self.cprofile_frames > 0:
+            return
+        import pstats
+        self.cprofile.disable()
+        self.cprofile.dump_stats(self.cprofile_path)
+        print(f"cProfile stats written to {self.cprofile_path}; top functions by cumulative time:")
+        pstats.Stats(self.cprofile).sort_stats("cumulative").print_stats(15)
+        self.cprofile = None
@@ -0,0 +1,226 @@
+"""Headless engine-vs-engine self-play across a process pool.
+
+    python -m src.selfplay --engine-a stockfish --engine-b "stockfish" \\
+        --option-b Hash=64 --games 200 --workers 4 --movetime 0.05 --pgn out.pgn
+
+Each worker process starts one StockfishEngine per player and keeps them
+for all the games it plays; their result caches are cleared before every
+game, so no game is played from what a worker saw in earlier ones. Players
+alternate colours. Results are written as PGN, and a summary with the Elo
+difference of A over B (95% error bars) and games/sec is printed.
+"""
+import argparse
+import math
+import multiprocessing
+import random
+import shlex
+import time
+from multiprocessing.util import Finalize
+
+import chess
+import chess.engine
+import chess.pgn
+
+from src.engine_wrapper import StockfishEngine
+from src.game_logic import ChessGame
+from src.opening_book import OpeningBook
+
+# Engines of the current worker process, keyed by player name
+_engines = {}
+_config = None
+
+
+def _init_worker(config):
+    global _config
+    _config = config
+    for name, player in config["players"].items():
+        book = OpeningBook(config["book"], seed=None) if config.get("book") else None
+        # Exactly the options given (no auto-sizing: the workers already share the cores),
+        # and no standby process per player
+        engine = StockfishEngine(player["command"], ponder=False, book=book,
+                                 standby=False, options=player.get("options") or {})
+        engine.limit = config["limit"]
+        if not engine.start():
+            raise RuntimeError(f"Could not start engine for player {name}: {player['command']}")
+        _engines[name] = engine
+    Finalize(None, _shutdown_worker, exitpriority=10)
+
+
+def _shutdown_worker():
+    for engine in _engines.values():
+        engine.quit()
+    _engines.clear()
+
+
+def play_game(index):
+    """Plays game `index` in a worker. Player A has White in even games."""
+    config = _config
+    white, black = ("A", "B") if index % 2 == 0 else ("B", "A")
+    game = ChessGame(config["base_time"], config["increment"])
+    for engine in _engines.values():
+        engine.cache.clear()
+
+    # Optional random opening plies for variety; both colour-swapped games share it
+    rng = random.Random(f"{config['seed']}:{index // 2}")
+    for _ in range(config["random_plies"]):
+        if game.is_game_over():
+            break
+        game.push_move(rng.choice(game.status().legal_moves))
+    if game.clock:
+        # The random plies are free, and the first engine move is on the clock like every other
+        game.clock.reset()
+        game.clock.start(game.board.turn)
+
+    result = None
+    while result is None:
+        if game.is_time_out():
+            result = "0-1" if game.board.turn == chess.WHITE else "1-0"
+        elif game.is_game_over():
+            result = game.status().outcome.result()
+        elif game.board.ply() >= config["max_plies"]:
+            result = "1/2-1/2" # Adjudicated
+        else:
+            engine = _engines[white if game.board.turn == chess.WHITE else black]
+            move = engine.get_best_move(game.board, game.clock)
+            if move is None or not game.is_legal(move):
+                # An engine that cannot move loses the game
+                result = "0-1" if game.board.turn == chess.WHITE else "1-0"
+            else:
+                game.push_move(move)
+
+    return {
+        "index": index,
+        "white": white,
+        "black": black,
+        "result": result,
+        "moves": [move.uci() for move in game.board.move_stack],
+    }
+
+
+def score_for_a(record):
+    if record["result"] == "1/2-1/2":
+        return 0.5
+    a_is_white = record["white"] == "A"
+    return 1.0 if (record["result"] == "1-0") == a_is_white else 0.0
+
+
+def elo_difference(scores):
+    """Elo difference implied by a list of per-game scores, with its 95% error bar."""
+    n = len(scores)
+    if n == 0:
+        return 0.0, float("inf")
+    mean = sum(scores) / n
+    stdev = math.sqrt(sum((s - mean) ** 2 for s in scores) / n)
+    margin = 1.96 * stdev / math.sqrt(n)
+
+    def elo(score):
+        score = min(max(score, 1e-6), 1 - 1e-6)
+        return -400.0 * math.log10(1.0 / score - 1.0)
+
+    return elo(mean), (elo(mean + margin) - elo(mean - margin)) / 2.0
+
+
+def to_pgn(record, config):
+    board = chess.Board()
+    for uci in record["moves"]:
+        board.push_uci(uci)
+    pgn = chess.pgn.Game.from_board(board)
+    pgn.headers["Event"] = "Self-play"
+    pgn.headers["Round"] = str(record["index"] + 1)
+    pgn.headers["White"] = config["players"][record["white"]]["name"]
+    pgn.headers["Black"] = config["players"][record["black"]]["name"]
+    pgn.headers["Result"] = record["result"]
+    return pgn
+
+
+def run_selfplay(config, games, workers=None, pgn_path=None):
+    """Plays `games` games and returns (records in game order, summary dict)."""
+    workers = workers or multiprocessing.cpu_count()
+    records = []
+    start = time.perf_counter()
+    pgn_file = open(pgn_path, "w") if pgn_path else None
+    try:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(config,)) as pool:
+            for record in pool.imap_unordered(play_game, range(games)):
+                records.append(record)
+                if pgn_file:
+                    print(to_pgn(record, config), file=pgn_file, end="\n\n")
+            pool.close()
+            pool.join()
+    finally:
+        if pgn_file:
+            pgn_file.close()
+    elapsed = time.perf_counter() - start
+
+    records.sort(key=lambda record: record["index"])
+    scores = [score_for_a(record) for record in records]
+    elo, margin = elo_difference(scores)
+    summary = {
+        "games": len(records),
+        "a_wins": scores.count(1.0),
+        "b_wins": scores.count(0.0),
+        "draws": scores.count(0.5),
+        "score_a": sum(scores) / len(scores) if scores else 0.0,
+        "elo_a_minus_b": elo,
+        "elo_error_95": margin,
+        "seconds": elapsed,
+        "games_per_second": len(records) / elapsed if elapsed > 0 else 0.0,
+    }
+    return records, summary
+
+
+def parse_options(pairs):
+    options = {}
+    for pair in pairs or []:
+        name, value = pair.split("=", 1)
+        options[name] = int(value) if value.isdigit() else value
+    return options
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless engine-vs-engine self-play.")
+    parser.add_argument("--engine-a", default="stockfish", help="Engine command for player A")
+    parser.add_argument("--engine-b", default=None, help="Engine command for player B (default: same as A)")
+    parser.add_argument("--option-a", action="append", help="UCI option for A, e.g. Hash=64 (repeatable)")
+    parser.add_argument("--option-b", action="append", help="UCI option for B (repeatable)")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--movetime", type=float, default=0.05, help="Seconds per move (untimed games)")
+    parser.add_argument("--depth", type=int, default=None, help="Fixed depth instead of movetime")
+    parser.add_argument("--tc", default=None, help="Clock as base+increment in seconds, e.g. 10+0.1")
+    parser.add_argument("--book", default=None, help="Polyglot book used by both players")
+    parser.add_argument("--random-plies", type=int, default=0, help="Random opening plies per game pair")
+    parser.add_argument("--max-plies", type=int, default=400, help="Adjudicate a draw after this many plies")
+    parser.add_argument("--seed", default="0")
+    parser.add_argument("--pgn", default="selfplay.pgn")
+    args = parser.parse_args()
+
+    base_time, increment = None, 0.0
+    if args.tc:
+        base, _, inc = args.tc.partition("+")
+        base_time, increment = float(base), float(inc or 0)
+    limit = chess.engine.Limit(depth=args.depth) if args.depth else chess.engine.Limit(time=args.movetime)
+
+    engine_b = args.engine_b or args.engine_a
+    config = {
+        "players": {
+            "A": {"name": f"A ({args.engine_a})", "command": shlex.split(args.engine_a), "options": parse_options(args.option_a)},
+            "B": {"name": f"B ({engine_b})", "command": shlex.split(engine_b), "options": parse_options(args.option_b)},
+        },
+        "limit": limit,
+        "base_time": base_time,
+        "increment": increment,
+        "book": args.book,
+        "random_plies": args.random_plies,
+        "max_plies": args.max_plies,
+        "seed": args.seed,
+    }
+
+    _, summary = run_selfplay(config, args.games, args.workers, args.pgn)
+    print(f"Games: {summary['games']}  A wins: {summary['a_wins']}  B wins: {summary['b_wins']}  Draws: {summary['draws']}")
+    print(f"Elo A - B: {summary['elo_a_minus_b']:+.1f} +/- {summary['elo_error_95']:.1f} (95%)")
+    print(f"{summary['games_per_second']:.2f} games/sec over {summary['seconds']:.1f}s, PGN written to {args.pgn}")
+
+
+if __name__ == "__main__":
+    main()
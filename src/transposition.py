@@ -0,0 +1,80 @@
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+import chess.polyglot
+
+CacheEntry = namedtuple("CacheEntry", ["move", "ponder", "score", "depth", "limit"])
+
+# Rough size of one cached entry: the OrderedDict slot, the int key and the namedtuple.
+# Moves, scores and limits are small objects shared with the engine results.
+ENTRY_BYTES = 100 + sys.getsizeof(2**63) + sys.getsizeof(CacheEntry(None, None, None, 0, None))
+
+
+class TranspositionCache:
+    """LRU cache of engine results keyed by the position's Zobrist hash.
+
+    Size it either by entry count (max_entries) or by an approximate memory
+    budget in bytes (max_bytes). Safe to share between threads, e.g. the
+    GUI's search threads and an analysis pool.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        if max_entries is None and max_bytes is None:
+            max_entries = 10000
+        if max_bytes is not None:
+            max_entries = max(1, max_bytes // ENTRY_BYTES)
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, board, limit):
+        """Returns a CacheEntry searched at least as deeply as `limit` asks for, or None."""
+        key = chess.polyglot.zobrist_hash(board)
+        with self.lock:
+            entry = self.entries.get(key)
+            # The move check guards against the (rare) hash collision
+            if entry is None or not self._covers(entry, limit) or entry.move not in board.legal_moves:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def store(self, board, limit, move, ponder=None, score=None, depth=None):
+        key = chess.polyglot.zobrist_hash(board)
+        with self.lock:
+            old = self.entries.get(key)
+            # Keep the deeper of two results for the same position
+            if old is not None and (old.depth or 0) > (depth or 0):
+                self.entries.move_to_end(key)
+                return
+            self.entries[key] = CacheEntry(move, ponder, score, depth or 0, limit)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def _covers(self, entry, limit):
+        if limit.depth is not None:
+            return entry.depth >= limit.depth
+        if limit.time is not None and entry.limit is not None and entry.limit.time is not None:
+            return entry.limit.time >= limit.time
+        return entry.limit == limit
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,21 @@
+"""Helpers shared by several test modules."""
+import chess
+import pytest
+
+
+def attack_counts_slow(board):
+    """Per-square attack counts of (White, Black), straight from python-chess."""
+    white_attacks = [0] * 64
+    black_attacks = [0] * 64
+    for sq in chess.SQUARES:
+        piece = board.piece_at(sq)
+        if piece:
+            counts = white_attacks if piece.color == chess.WHITE else black_attacks
+            for target in board.attacks(sq):
+                counts[target] += 1
+    return white_attacks, black_attacks
+
+
+@pytest.fixture
+def reference_counts():
+    return attack_counts_slow
@@ -0,0 +1,185 @@
+"""Tiny UCI engine for tests and benchmarks, so nothing needs Stockfish installed.
+
+It plays a legal move chosen from a material-only evaluation, with ties broken
+by a seeded random number so games between two fake engines vary:
+
+    python tests/fake_engine.py [--seed N] [--delay SECONDS] [--info-rate N] [--start-delay SECONDS]
+                                [--crash-after N] [--hang-after N]
+
+"go infinite" and "go ponder" searches run until "stop" (or "ponderhit");
+timed searches answer after `--delay` seconds (default: immediately). With
+--info-rate, infinite searches stream that many info lines per second (one
+per MultiPV line and depth) like a fast engine would. --start-delay holds
+back the "uci" handshake, as loading a large network does.
+
+Faults can be injected for supervisor tests: --crash-after N exits on the
+(N+1)th "go", --hang-after N stops answering anything from the (N+1)th "go"
+on (the process only ends when its input is closed).
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+import chess
+
+PIECE_VALUES = {chess.PAWN: 100, chess.KNIGHT: 300, chess.BISHOP: 300, chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 0}
+
+
+def material(board, color):
+    return sum(PIECE_VALUES[p.piece_type] * (1 if p.color == color else -1) for p in board.piece_map().values())
+
+
+def ranked_moves(board):
+    """(score, move) for every legal move, best first, scored by material only."""
+    scored = []
+    for move in board.legal_moves:
+        board.push(move)
+        scored.append((100000 if board.is_checkmate() else material(board, not board.turn), move.uci()))
+        board.pop()
+    scored.sort(key=lambda item: -item[0])
+    return scored
+
+
+def choose_move(board, rng):
+    best_score, best_moves = None, []
+    for move in board.legal_moves:
+        board.push(move)
+        if board.is_checkmate():
+            score = 100000
+        else:
+            score = material(board, not board.turn)
+        board.pop()
+        if best_score is None or score > best_score:
+            best_score, best_moves = score, [move]
+        elif score == best_score:
+            best_moves.append(move)
+    if not best_moves:
+        return None, 0
+    return rng.choice(best_moves), best_score
+
+
+class FakeEngine:
+    def __init__(self, seed, delay, info_rate=0, start_delay=0.0, crash_after=None, hang_after=None):
+        self.seed = seed
+        self.delay = delay
+        self.info_rate = info_rate
+        self.start_delay = start_delay
+        self.crash_after = crash_after
+        self.hang_after = hang_after
+        self.searches = 0
+        self.hung = False
+        self.multipv = 1
+        self.board = chess.Board()
+        self.stop_event = threading.Event()
+        self.search = None
+        self.lock = threading.Lock()
+
+    def send(self, line):
+        with self.lock:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+
+    def go(self, tokens):
+        board = self.board.copy()
+        infinite = "infinite" in tokens or "ponder" in tokens
+        wait = None if infinite else self.delay
+        self.stop_event.clear()
+
+        def run():
+            if wait is None and self.info_rate:
+                self.stream_info(board)
+            elif wait is None or wait > 0:
+                self.stop_event.wait(wait)
+            rng = random.Random(f"{self.seed}:{board.fen()}")
+            move, score = choose_move(board, rng)
+            if move is None:
+                self.send("info depth 0 score mate 0")
+                self.send("bestmove (none)")
+                return
+            board.push(move)
+            reply, _ = choose_move(board, rng)
+            pv = move.uci() + (f" {reply.uci()}" if reply else "")
+            score_text = "mate 1" if score == 100000 else f"cp {score}"
+            self.send(f"info depth 1 seldepth 1 nodes {board.legal_moves.count() + 1} score {score_text} pv {pv}")
+            self.send(f"bestmove {move.uci()}" + (f" ponder {reply.uci()}" if reply else ""))
+
+        self.search = threading.Thread(target=run, daemon=True)
+        self.search.start()
+
+    def stream_info(self, board):
+        ranked = ranked_moves(board)[:self.multipv]
+        depth = 0
+        while not self.stop_event.is_set():
+            depth += 1
+            for index, (score, uci) in enumerate(ranked):
+                score_text = "mate 1" if score == 100000 else f"cp {score}"
+                self.send(f"info depth {depth} multipv {index + 1} score {score_text} pv {uci}")
+                if self.stop_event.wait(1.0 / self.info_rate):
+                    return
+
+    def position(self, tokens):
+        if tokens[1] == "startpos":
+            self.board = chess.Board()
+            rest = tokens[2:]
+        else:
+            self.board = chess.Board(" ".join(tokens[2:8]))
+            rest = tokens[8:]
+        if rest and rest[0] == "moves":
+            for uci in rest[1:]:
+                self.board.push_uci(uci)
+
+    def run(self):
+        for line in sys.stdin:
+            tokens = line.split()
+            if not tokens:
+                continue
+            command = tokens[0]
+            if self.hung:
+                continue
+            if command == "go":
+                if self.searches == self.crash_after:
+                    os._exit(3)
+                if self.searches == self.hang_after:
+                    self.hung = True
+                    continue
+                self.searches += 1
+            if command == "uci":
+                time.sleep(self.start_delay)
+                self.send("id name FakeEngine")
+                self.send("id author tests")
+                self.send("option name Threads type spin default 1 min 1 max 1024")
+                self.send("option name Hash type spin default 16 min 1 max 33554432")
+                self.send("option name Ponder type check default false")
+                self.send("option name MultiPV type spin default 1 min 1 max 500")
+                self.send("uciok")
+            elif command == "setoption" and tokens[2] == "MultiPV":
+                self.multipv = int(tokens[4])
+            elif command == "isready":
+                self.send("readyok")
+            elif command == "position":
+                self.position(tokens)
+            elif command == "go":
+                self.go(tokens)
+            elif command in ("stop", "ponderhit"):
+                self.stop_event.set()
+            elif command == "quit":
+                break
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seed", default="0")
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--info-rate", type=float, default=0.0)
+    parser.add_argument("--start-delay", type=float, default=0.0)
+    parser.add_argument("--crash-after", type=int)
+    parser.add_argument("--hang-after", type=int)
+    args = parser.parse_args()
+    FakeEngine(args.seed, args.delay, args.info_rate, args.start_delay, args.crash_after, args.hang_after).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import random
+import chess
+from src.attack_maps import AttackMaps, AttackMapCache
+
+def test_from_board(reference_counts):
+    board = chess.Board("r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4")
+    maps = AttackMaps.from_board(board)
+    assert (maps.white_counts, maps.black_counts) == reference_counts(board)
+
+def test_incremental_matches_full(reference_counts):
+    rng = random.Random(1)
+    for _ in range(20):
+        cache = AttackMapCache(max_entries=4)
+        board = chess.Board()
+        cache.get(board)
+        while not board.is_game_over() and board.ply() < 120:
+            board.push(rng.choice(list(board.legal_moves)))
+            maps = cache.get(board)
+            assert (maps.white_counts, maps.black_counts) == reference_counts(board)
+
+        # Walking back hits entries that are cached or derived from their neighbour
+        while board.move_stack:
+            board.pop()
+            maps = cache.get(board)
+            assert (maps.white_counts, maps.black_counts) == reference_counts(board)
+
+def test_lru_reuse():
+    cache = AttackMapCache(max_entries=2)
+    board = chess.Board()
+    first = cache.get(board)
+    assert cache.get(board) is first
+    for uci in ["e2e4", "e7e5"]:
+        board.push_uci(uci)
+        cache.get(board)
+    assert len(cache.entries) == 2
+    assert cache.get(chess.Board()) is not first
@@ -0,0 +1,41 @@
+import random
+import chess
+from src.bitboard_stats import ControlHeatmap, attack_counts, boards_to_bitboards, game_positions
+
+def random_corpus(count, seed):
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(count):
+        board = chess.Board()
+        for _ in range(rng.randint(0, 160)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        boards.append(board)
+    # Edge cases: empty board, pieces on the rims, promotions pending
+    boards.append(chess.Board(None))
+    boards.append(chess.Board("Q6q/1P4p1/8/8/8/8/1p4P1/q6Q w - - 0 1"))
+    boards.append(chess.Board("7k/8/8/3NN3/3NN3/8/8/K7 w - - 0 1"))
+    return boards
+
+def test_counts_match_python_chess(reference_counts):
+    boards = random_corpus(300, seed=5)
+    white, black = attack_counts(boards_to_bitboards(boards))
+    for n, board in enumerate(boards):
+        assert (white[n].tolist(), black[n].tolist()) == reference_counts(board)
+
+def test_heatmap_accumulates_over_batches(reference_counts):
+    boards = list(game_positions([chess.Move.from_uci(m) for m in ["e2e4", "e7e5", "g1f3", "b8c6"]]))
+    heatmap = ControlHeatmap()
+    heatmap.add_boards(boards, batch_size=2)
+    summary = heatmap.summary()
+    assert summary["positions"] == 5
+
+    white_total = sum(reference_counts(board)[0][chess.E4] for board in boards)
+    assert summary["white_attacks"][chess.E4] == white_total / 5
+    # The start position is symmetric, so each side controls only its own half
+    start = ControlHeatmap()
+    start.add(boards_to_bitboards([chess.Board()]))
+    assert start.white_control[chess.E3] == 1 and start.black_control[chess.E6] == 1
+    assert start.white_control[chess.E5] == 0 and start.black_control[chess.E4] == 0
@@ -0,0 +1,46 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import chess
+import pygame
+import pytest
+from src.board_renderer import BoardRenderer, render_batch
+from src.game_logic import ChessGame
+from src.gui import BOARD_ORIGIN, BOARD_SIZE, ChessGUI
+
+MOVES = ["e2e4", "e7e5", "g1f3", "b8c6", "f1c4", "g8f6"]
+
+@pytest.fixture(autouse=True)
+def shut_down_pygame():
+    yield
+    pygame.quit()
+
+def test_renderer_draws_what_the_gui_draws():
+    game = ChessGame()
+    for uci in MOVES:
+        game.make_move(uci)
+    gui = ChessGUI(game)
+    gui.show_heat = gui.show_lines = True
+    gui.draw_game()
+    on_screen = gui.screen.subsurface(pygame.Rect(BOARD_ORIGIN, (BOARD_SIZE, BOARD_SIZE)))
+
+    # Off-screen, with a renderer of its own
+    image = BoardRenderer(font=gui.font).render(game.board, heat=True, lines=True)
+    assert pygame.image.tobytes(image, "RGB") == pygame.image.tobytes(on_screen, "RGB")
+
+def test_render_batch(tmp_path):
+    moves = [chess.Move.from_uci(uci) for uci in MOVES]
+    jobs = [("start", None, None), ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", None),
+            ("italian", None, moves), ("broken", "not a fen", None)]
+
+    summary = render_batch(jobs, str(tmp_path), workers=1, square_size=20, heat=True)
+    assert summary["jobs"] == 4 and summary["images"] == 2 + len(MOVES) + 1
+    assert len(summary["errors"]) == 1 and summary["errors"][0].startswith("broken: ")
+    assert pygame.image.load(str(tmp_path / "start.png")).get_size() == (160, 160)
+    assert sorted(os.listdir(tmp_path / "italian")) == [f"{ply:03d}.png" for ply in range(len(MOVES) + 1)]
+
+    # The same images from a process pool
+    pooled = tmp_path / "pooled"
+    assert render_batch(jobs, str(pooled), workers=2, square_size=20, heat=True)["images"] == summary["images"]
+    for name in ("start.png", "italian/006.png"):
+        assert (pooled / name).read_bytes() == (tmp_path / name).read_bytes()
@@ -0,0 +1,25 @@
+import os
+import sys
+import chess
+import chess.engine
+from src.engine_pool import EnginePool, MATE_SCORE
+
+FAKE_ENGINE = os.path.join(os.path.dirname(__file__), "fake_engine.py")
+
+def test_evaluate_many_keeps_input_order():
+    pool = EnginePool([sys.executable, FAKE_ENGINE], size=2)
+    assert pool.start()
+    try:
+        fens = [
+            chess.STARTING_FEN,
+            "6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1", # Back-rank mate in one
+            "4k3/8/8/8/8/8/8/4K2R b K - 0 1", # White is a rook up, Black to move
+        ] * 4
+        result = pool.evaluate_many(fens, chess.engine.Limit(time=0.01))
+    finally:
+        pool.quit()
+
+    assert list(result.moves[:3]) == ["b2b4", "a1a8", "e8e7"]
+    assert list(result.moves) == list(result.moves[:3]) * 4
+    assert result.mate[1] == 1 and result.cp[1] == MATE_SCORE - 1
+    assert result.cp[2] == 500 # From White's point of view
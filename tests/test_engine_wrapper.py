@@ -0,0 +1,175 @@
+import os
+import sys
+import time
+import chess
+import chess.engine
+import pytest
+from src.engine_supervisor import auto_options
+from src.engine_wrapper import StockfishEngine, clock_limit
+from src.game_logic import GameClock
+
+FAKE_ENGINE = os.path.join(os.path.dirname(__file__), "fake_engine.py")
+
+def test_live_analysis_coalesces_updates():
+    engine = StockfishEngine([sys.executable, FAKE_ENGINE, "--info-rate", "2000"])
+    assert engine.start()
+    try:
+        updates = []
+        board = chess.Board("4k3/8/8/8/8/8/3q4/R3K3 w - - 0 1")
+        analysis = engine.start_analysis(board, multipv=2, on_update=lambda: updates.append(1))
+        deadline = time.time() + 5
+        while analysis.infos < 200 and time.time() < deadline:
+            time.sleep(0.05)
+        # Nobody read the lines yet, so a single update was signalled
+        assert analysis.infos >= 200 and len(updates) == 1
+
+        lines = analysis.snapshot()
+        assert len(lines) == 2
+        score, depth, pv = lines[0]
+        assert pv[0] == chess.Move.from_uci("e1d2") and score.white().score() == 500 and depth >= 1
+        deadline = time.time() + 5
+        while len(updates) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(updates) == 2 # Reading the lines re-arms the update
+
+        assert not analysis.is_stale(board)
+        board.push_uci("e1d2")
+        assert analysis.is_stale(board)
+        analysis.stop()
+        analysis.join(5)
+
+        # The engine moves on to the next position
+        analysis = engine.start_analysis(board, multipv=1)
+        deadline = time.time() + 5
+        while not analysis.snapshot() and time.time() < deadline:
+            time.sleep(0.01)
+        assert analysis.snapshot()[0][2][0] in board.legal_moves
+        analysis.stop()
+    finally:
+        engine.quit()
+
+def wait_for_standby(engine):
+    deadline = time.time() + 10
+    while engine.supervisor.standby is None and time.time() < deadline:
+        time.sleep(0.01)
+    assert engine.supervisor.standby is not None
+
+def test_failover_on_crash_and_hang():
+    for fault in ("--crash-after", "--hang-after"):
+        engine = StockfishEngine([sys.executable, FAKE_ENGINE, fault, "1"], ponder=False)
+        engine.supervisor.timeout = 0.3
+        engine.limit = chess.engine.Limit(time=0.05)
+        assert engine.start()
+        try:
+            board = chess.Board()
+            for _ in range(3):
+                # Every engine process fails on its second search; the standby answers instead
+                wait_for_standby(engine)
+                search = engine.start_search(board)
+                search.join(5)
+                assert search.move in board.legal_moves
+                board.push(search.move)
+            assert engine.supervisor.failovers == 2
+
+            wait_for_standby(engine)
+            engine.start_search(board).join(5) # First search of the new primary
+            assert engine.get_best_move(board) in board.legal_moves
+            assert engine.supervisor.failovers == 3
+        finally:
+            engine.quit()
+
+def test_restart_without_standby_runs_in_background():
+    engine = StockfishEngine([sys.executable, FAKE_ENGINE, "--crash-after", "1"], ponder=False, standby=False)
+    engine.limit = chess.engine.Limit(time=0.05)
+    statuses = []
+    engine.supervisor.on_status = statuses.append
+    assert engine.start()
+    try:
+        board = chess.Board()
+        engine.start_search(board).join(5)
+        board.push_uci("e2e4")
+        # The crash is noticed, but the replacement is not waited for
+        search = engine.start_search(board)
+        search.join(5)
+        assert search.move is None
+        assert statuses == ["connecting"]
+        deadline = time.time() + 10
+        while engine.connecting and time.time() < deadline:
+            time.sleep(0.01)
+        assert statuses == ["connecting", "ready"]
+        assert engine.get_best_move(board) in board.legal_moves
+
+        # Pending hang checks die with the engine
+        engine.supervisor.watch(60, lambda: None)
+        assert engine.supervisor.timers
+    finally:
+        engine.quit()
+    assert not engine.supervisor.timers
+
+def test_auto_options():
+    options = {
+        "Threads": chess.engine.Option("Threads", "spin", 1, 1, 64, []),
+        "Hash": chess.engine.Option("Hash", "spin", 16, 1, 1024, []),
+    }
+    assert auto_options(options, processes=2, cpus=8, memory_mb=16384) == {"Threads": 7, "Hash": 512}
+    assert auto_options(options, cpus=1, memory_mb=100000) == {"Threads": 1, "Hash": 1024} # Engine maximum
+    assert auto_options(options, cpus=2, memory_mb=100) == {"Threads": 1, "Hash": 16}
+
+def test_clock_limit():
+    default = chess.engine.Limit(time=1.0)
+    board = chess.Board()
+    assert clock_limit(board, None, default) is default
+
+    # A share of the clock for ~40 moves, plus most of the increment
+    clock = GameClock(60, 1)
+    assert clock_limit(board, clock, default).time == pytest.approx(60 / 39 + 0.75)
+    clock.remaining[chess.WHITE] = 1
+    assert clock_limit(board, clock, default).time == pytest.approx(0.5) # Never more than half the clock
+    clock.remaining[chess.WHITE] = 0.05
+    assert clock_limit(board, clock, default).time == 0.01
+    # Only Kb1 is legal
+    assert clock_limit(chess.Board("k7/8/8/8/8/8/7r/K7 w - - 0 1"), GameClock(60), default).time == 0.01
+
+def test_ponder_hit_and_miss():
+    engine = StockfishEngine([sys.executable, FAKE_ENGINE], standby=False)
+    assert engine.start()
+    try:
+        board = chess.Board()
+        clock = GameClock(15) # About 0.4s per move
+        search = engine.start_search(board, clock)
+        search.join(5)
+        board.push(search.move)
+        engine.start_ponder(board, search)
+        pondered = engine.ponder_search
+        assert pondered is not None and not pondered.done # Thinks until told otherwise
+
+        # The player plays the expected reply: the running search takes over
+        time.sleep(0.15)
+        board.push(search.ponder)
+        budget = clock_limit(board, clock, engine.limit).time
+        start = time.perf_counter()
+        hit = engine.start_search(board, clock)
+        assert hit is pondered
+        hit.join(5)
+        # It only gets what is left of the budget after the time already spent pondering
+        assert time.perf_counter() - start < budget - 0.15 + 0.2
+        assert hit.move in board.legal_moves
+        stats = engine.ponder_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 0
+        assert 0.15 <= stats["saved_seconds"] <= budget
+
+        # Next time the player surprises the engine: the ponder search is dropped
+        board.push(hit.move)
+        engine.start_ponder(board, hit)
+        pondered = engine.ponder_search
+        board.push(next(move for move in board.legal_moves if move != hit.ponder))
+        miss = engine.start_search(board, clock)
+        assert miss is not pondered and pondered.cancelled
+        miss.join(5)
+        assert miss.move in board.legal_moves
+        pondered.join(5)
+        assert pondered.done and pondered.move is None # Its result was discarded
+        stats = engine.ponder_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1 and stats["hit_rate"] == 0.5
+    finally:
+        engine.quit()
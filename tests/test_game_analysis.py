@@ -0,0 +1,37 @@
+import os
+import sys
+import chess
+import chess.engine
+from src.game_analysis import EVAL_CAP, GameAnalyzer, classify
+from src.transposition import TranspositionCache
+
+FAKE_ENGINE = os.path.join(os.path.dirname(__file__), "fake_engine.py")
+FOOLS_MATE = [chess.Move.from_uci(m) for m in ["f2f3", "e7e5", "g2g4", "d8h4"]]
+
+def test_classify():
+    assert classify(20) is None
+    assert classify(50) == "inaccuracy"
+    assert classify(150) == "mistake"
+    assert classify(300) == "blunder"
+
+def test_annotations_stream_and_cache_branches():
+    cache = TranspositionCache()
+    analyzer = GameAnalyzer([sys.executable, FAKE_ENGINE], workers=2, limit=chess.engine.Limit(time=0.01), cache=cache)
+    try:
+        streamed = []
+        analysis = analyzer.analyse(FOOLS_MATE, on_annotation=streamed.append)
+        assert analysis.wait(10)
+        assert sorted(a.ply for a in streamed) == [0, 1, 2, 3]
+        assert analysis.progress() == (4, 4)
+        # The final position is mate and is scored without the engine
+        assert analysis.searched == 4 and analysis.evals[-1] == -EVAL_CAP
+        mate = analysis.annotations[3]
+        assert mate.san == "Qh4#" and mate.after == -EVAL_CAP and mate.label is None
+
+        # A branch from the third ply only has one position the cache has not seen
+        branch = analyzer.analyse(FOOLS_MATE[:2] + [chess.Move.from_uci("g1f3")])
+        assert branch.wait(10)
+        assert branch.searched == 1 and branch.progress() == (3, 3)
+        assert branch.annotations[:2] == analysis.annotations[:2]
+    finally:
+        analyzer.quit()
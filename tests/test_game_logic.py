@@ -1,3 +1,4 @@
+import chess
 from src.game_logic import ChessGame
 
 def test_game():
@@ -22,5 +23,141 @@ def test_game():
     game.undo_move()
     print("FEN after undo:", game.get_fen())
     
+def test_clock_increment():
+    game = ChessGame(base_time=60, increment=2)
+    assert game.clock.running is None
+
+    game.make_move("e2e4")
+    # White banked the increment, Black's clock is now running
+    assert game.clock.running == chess.BLACK
+    assert 61.5 < game.clock.time_left(chess.WHITE) <= 62
+    assert not game.is_time_out()
+
+    game.clock.remaining[chess.BLACK] = 0
+    assert game.is_time_out()
+    assert game.is_game_over()
+
+    game.reset()
+    assert game.clock.time_left(chess.BLACK) == 60
+
+def test_clock_follows_time_travel():
+    game = ChessGame(base_time=60, increment=2)
+    game.make_move("e2e4")
+    game.clock.remaining[chess.BLACK] = 30 # Black thinks for half a minute
+    game.make_move("e7e5")
+    game.clock.remaining[chess.WHITE] = 50
+
+    # Taking Black's move back gives Black the clock from before the increment
+    game.undo_move()
+    assert game.clock.running == chess.BLACK
+    assert 29.5 < game.clock.time_left(chess.BLACK) <= 30
+    assert 61.5 < game.clock.time_left(chess.WHITE) <= 62
+
+    # And going forward again restores the times the tip was left with
+    game.redo_move()
+    assert game.clock.running == chess.WHITE
+    assert 49.5 < game.clock.time_left(chess.WHITE) <= 50
+    assert 31.5 < game.clock.time_left(chess.BLACK) <= 32
+
+    game.jump_to(0)
+    assert game.clock.running is None
+    assert game.clock.time_left(chess.WHITE) == game.clock.time_left(chess.BLACK) == 60
+
+def test_branching_time_travel():
+    game = ChessGame()
+    for uci in ["e2e4", "e7e5", "g1f3"]:
+        game.make_move(uci)
+    main_line_fen = game.get_fen()
+
+    # Go back two moves and play something else: a new timeline
+    game.undo_move()
+    game.undo_move()
+    game.make_move("c7c5")
+    assert not game.redo_move()
+    assert game.board.move_stack == [chess.Move.from_uci("e2e4"), chess.Move.from_uci("c7c5")]
+
+    # The old line is still there
+    assert game.switch_branch(1)
+    assert game.board.peek() == chess.Move.from_uci("e7e5")
+    assert game.redo_move()
+    assert game.get_fen() == main_line_fen
+    assert game.is_live()
+
+    # Jumps restore the full history, so the board still behaves normally
+    game.jump_to(0)
+    assert game.get_fen() == chess.STARTING_FEN
+    game.jump_to(game.tree.nodes[-1])
+    assert game.board.peek() == chess.Move.from_uci("c7c5")
+    assert game.undo_move()
+    assert game.get_fen() == chess.Board("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1").fen()
+
+def test_jump_across_branches():
+    game = ChessGame()
+    for uci in ["e2e4", "e7e5", "g1f3", "b8c6"]:
+        game.make_move(uci)
+    for _ in range(3):
+        game.undo_move()
+    for uci in ["c7c5", "g1f3", "d7d6", "d2d4"]:
+        game.make_move(uci)
+    sicilian = game.board.copy()
+
+    # Straight from one branch tip to the other and back
+    game.jump_to(4)
+    assert game.board.move_stack == [chess.Move.from_uci(uci) for uci in ["e2e4", "e7e5", "g1f3", "b8c6"]]
+    game.jump_to(game.tree.nodes[-1])
+    assert game.board == sicilian and game.board.move_stack == sicilian.move_stack
+    assert game.tree.line()[-1] is game.tree.current
+
+def test_tree_shares_prefix():
+    game = ChessGame()
+    game.make_move("e2e4")
+    game.make_move("e7e5")
+    game.undo_move()
+    game.make_move("e7e5") # Same move again reuses the existing node
+    assert len(game.tree.nodes) == 3
+
+    # The timeline runs on past the current node to its tip
+    game.jump_to(1)
+    assert [node.move.uci() for node in game.tree.line()[1:]] == ["e2e4", "e7e5"]
+
+def test_status_cache():
+    game = ChessGame()
+    assert len(game.get_legal_moves()) == 20
+    assert not game.is_check()
+
+    for uci in ["f2f3", "e7e5", "g2g4", "d8h4"]: # Fool's mate
+        game.make_move(uci)
+    assert game.is_check()
+    assert game.is_checkmate()
+    assert game.is_game_over()
+    assert game.get_legal_moves() == []
+
+    game.undo_move()
+    assert not game.is_game_over()
+    assert game.is_legal(chess.Move.from_uci("d8h4"))
+
+    game.reset()
+    assert not game.is_legal(chess.Move.from_uci("d8h4"))
+    assert len(game.get_legal_moves()) == 20
+
+def test_perft_through_game():
+    # Every move played and taken back through the game tree, as the GUI does
+    def perft(game, depth):
+        moves = game.status().legal_moves
+        if depth == 1:
+            return len(moves)
+        total = 0
+        for move in moves:
+            game.push_move(move)
+            total += perft(game, depth - 1)
+            game.undo_move()
+        return total
+
+    # Castling, en passant and promotions all occur within two plies of Kiwipete
+    game = ChessGame(fen="r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    assert perft(game, 2) == 2039
+    assert perft(ChessGame(), 3) == 8902
+    assert game.tree.current is game.tree.root
+
 if __name__ == "__main__":
     test_game()
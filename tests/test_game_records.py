@@ -0,0 +1,71 @@
+import chess
+from src.game_logic import ChessGame
+from src.game_records import GameRecordFile, GameRecordWriter
+from src.pgn_stream import unpack_move
+
+def test_save_and_load(tmp_path):
+    game = ChessGame()
+    for uci in ["f2f3", "e7e5", "g2g4", "d8h4"]:
+        game.make_move(uci)
+    path = str(tmp_path / "game.bin")
+    game.save(path, tags={"White": "Player", "Black": "Engine"})
+
+    loaded = ChessGame.load(path)
+    assert loaded.board.move_stack == game.board.move_stack
+    assert loaded.is_checkmate()
+    with GameRecordFile(path) as records:
+        assert records.result(0) == "0-1"
+        assert records.tags(0) == {"White": "Player", "Black": "Engine"}
+
+def test_random_access_and_append(tmp_path):
+    path = str(tmp_path / "games.bin")
+    lines = [["e2e4", "e7e5"], ["d2d4"], [], ["a7a8q"]]
+    fens = [None, None, None, "4k3/P7/8/8/8/8/8/4K3 w - - 0 1"]
+    with GameRecordWriter(path) as writer:
+        for moves, fen in zip(lines[:2], fens[:2]):
+            writer.add([chess.Move.from_uci(uci) for uci in moves], fen=fen)
+    with GameRecordWriter(path, mode="a") as writer:
+        for moves, fen in zip(lines[2:], fens[2:]):
+            writer.add([chess.Move.from_uci(uci) for uci in moves], fen=fen, tags={"Round": "2"})
+
+    with GameRecordFile(path) as records:
+        assert len(records) == 4
+        for n in reversed(range(4)):
+            assert [unpack_move(v).uci() for v in records.moves(n)] == lines[n]
+        assert records.fen(3) == fens[3]
+        assert records.fen(0) == chess.STARTING_FEN
+        assert records.tags(0) == {}
+        assert records.tags(2) == {"Round": "2"}
+        assert records.game(3).board.piece_at(chess.A8).symbol() == "Q"
+
+def test_interrupted_append_keeps_old_games(tmp_path):
+    path = str(tmp_path / "games.bin")
+    with GameRecordWriter(path) as writer:
+        writer.add([chess.Move.from_uci("e2e4")], tags={"Event": "odd"})
+        writer.add([chess.Move.from_uci("d2d4")])
+
+    # A session that dies before close() writes no index of its own
+    writer = GameRecordWriter(path, mode="a")
+    writer.add([chess.Move.from_uci("c2c4")], tags={"Round": "3"})
+    writer.f.close()
+    with GameRecordFile(path) as records:
+        assert len(records) == 2
+        assert records.tags(0) == {"Event": "odd"}
+
+    with GameRecordWriter(path, mode="a") as writer:
+        assert writer.add([chess.Move.from_uci("g1f3")]) == 2
+    with GameRecordFile(path) as records:
+        assert [unpack_move(records.moves(n)[0]).uci() for n in range(3)] == ["e2e4", "d2d4", "g1f3"]
+        assert all(offset % 2 == 0 for offset in records.offsets)
+
+def test_close_with_live_view(tmp_path):
+    path = str(tmp_path / "games.bin")
+    with GameRecordWriter(path) as writer:
+        writer.add([chess.Move.from_uci("e2e4"), chess.Move.from_uci("e7e5")])
+
+    records = GameRecordFile(path)
+    moves = records.moves(0)
+    records.close() # The view keeps the mapping, not the reader, alive
+    assert records.f.closed
+    assert [unpack_move(v).uci() for v in moves] == ["e2e4", "e7e5"]
+    records.close()
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import sys
+import chess
+import chess.engine
+import pytest
+from src.game_logic import ChessGame
+from src.game_server import Busy, FairScheduler, GameServer, RequestError, Session
+
+FAKE_ENGINE = os.path.join(os.path.dirname(__file__), "fake_engine.py")
+
+class TaggedEngine:
+    """Records which search it ran; the tag travels in limit.nodes."""
+
+    def __init__(self, log):
+        self.log = log
+
+    async def play(self, board, limit):
+        await asyncio.sleep(0.01)
+        self.log.append(limit.nodes)
+        return chess.engine.PlayResult(None, None)
+
+def test_scheduler_round_robin_and_backpressure():
+    async def run():
+        log = []
+        scheduler = FairScheduler([TaggedEngine(log)], max_pending=4)
+        board = chess.Board()
+        jobs = [asyncio.ensure_future(scheduler.play("A", board, chess.engine.Limit(nodes=tag))) for tag in ("A1", "A2", "A3", "A4")]
+        await asyncio.sleep(0)
+        with pytest.raises(Busy): # A fifth search from A is refused
+            await scheduler.play("A", board, chess.engine.Limit(nodes="A5"))
+        jobs += [asyncio.ensure_future(scheduler.play("B", board, chess.engine.Limit(nodes=tag))) for tag in ("B1", "B2")]
+        await asyncio.gather(*jobs)
+        return log
+
+    # B's searches do not wait behind all of A's
+    assert asyncio.run(run()) == ["A1", "A2", "B1", "A3", "B2", "A4"]
+
+class DeadEngine:
+    async def play(self, board, limit):
+        await asyncio.sleep(0.01)
+        raise chess.engine.EngineTerminatedError("engine process died unexpectedly")
+
+def test_scheduler_fails_queued_searches_without_engines():
+    async def run():
+        scheduler = FairScheduler([DeadEngine()])
+        board = chess.Board()
+        results = await asyncio.gather(*[scheduler.play(session, board, chess.engine.Limit(time=0.01))
+                                         for session in ("A", "B", "C")], return_exceptions=True)
+        with pytest.raises(RequestError, match="no engines left"):
+            await scheduler.play("D", board, chess.engine.Limit(time=0.01))
+        return results, scheduler.queued
+
+    results, queued = asyncio.run(run())
+    assert all(isinstance(result, RequestError) for result in results) and queued == 0
+
+class StubScheduler:
+    """Answers with the first legal move, or raises `error`."""
+
+    def __init__(self, error=None):
+        self.error = error
+
+    async def play(self, session_id, board, limit):
+        if self.error:
+            raise self.error
+        return chess.engine.PlayResult(next(iter(board.legal_moves)), None)
+
+def test_move_taken_back_when_engine_cannot_reply():
+    async def run():
+        server = GameServer([sys.executable, FAKE_ENGINE], engines=1)
+        session = server.sessions[1] = Session(1, ChessGame(), chess.BLACK)
+        server.scheduler = StubScheduler(Busy())
+        with pytest.raises(Busy):
+            await server.op_move(session, {"move": "e2e4"})
+        assert session.game.board.move_stack == [] and not session.busy
+
+        # The same move goes through once the engine is free again
+        server.scheduler = StubScheduler()
+        response = await server.op_move(session, {"move": "e2e4"})
+        assert response["reply"] and len(session.game.board.move_stack) == 2
+
+        # No hint while a search for this session is running
+        session.busy = True
+        with pytest.raises(RequestError, match="engine is thinking"):
+            await server.op_hint(session, {})
+
+    asyncio.run(run())
+
+def test_sessions_over_tcp():
+    async def run():
+        server = GameServer([sys.executable, FAKE_ENGINE], engines=2, limit=chess.engine.Limit(time=0.01))
+        port = await server.start(port=0)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+        async def request(**fields):
+            writer.write(json.dumps(fields).encode() + b"\n")
+            await writer.drain()
+            return json.loads(await reader.readline())
+
+        try:
+            new = await request(op="new", color="black", id=7)
+            assert new["ok"] and new["id"] == 7 and new["reply"] in [m.uci() for m in chess.Board().legal_moves]
+            session = new["session"]
+            assert (await request(op="move", session=session, move="e7e9"))["error"] == "illegal move"
+
+            moved = await request(op="move", session=session, move="e7e5")
+            assert moved["ok"] and moved["reply"] and moved["result"] == "*"
+            state = await request(op="state", session=session)
+            assert state["moves"] == [new["reply"], "e7e5", moved["reply"]]
+            assert (await request(op="undo", session=session))["ok"] # Takes back our move and the reply
+            assert (await request(op="state", session=session))["moves"] == [new["reply"]]
+
+            assert (await request(op="move", session=999, move="e7e5"))["error"] == "no such session"
+            assert (await request(op="stats"))["sessions"] == 1
+
+            # Fields of the wrong type are refused up front
+            bad = await request(op="new", base_time=60, increment="3")
+            assert bad["error"] == "increment must be a non-negative number"
+            assert (await request(op="new", base_time=True))["error"] == "base_time must be a non-negative number"
+            bad = await request(op="move", session=[session], move="d7d5")
+            assert bad["error"] == "session must be a non-negative integer"
+
+            # Anything unexpected still gets an answer, and the connection lives on
+            server.op_stats = lambda: 1 / 0
+            assert await request(op="stats", id=8) == {"ok": False, "error": "internal error: ZeroDivisionError", "id": 8}
+            assert (await request(op="state", session=session))["ok"]
+        finally:
+            writer.close()
+            await asyncio.sleep(0.1)
+            sessions = len(server.sessions)
+            await server.stop()
+        return sessions
+
+    # Sessions end with their connection
+    assert asyncio.run(run()) == 0
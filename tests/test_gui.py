@@ -0,0 +1,79 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import sys
+import chess
+import pygame
+import pytest
+from src.engine_wrapper import StockfishEngine
+from src.game_logic import ChessGame
+from src.gui import ENGINE_EVENT, ChessGUI
+
+FAKE_ENGINE = os.path.join(os.path.dirname(__file__), "fake_engine.py")
+
+@pytest.fixture(autouse=True)
+def shut_down_pygame():
+    yield
+    pygame.quit()
+
+@pytest.fixture
+def engine():
+    engine = StockfishEngine([sys.executable, FAKE_ENGINE], ponder=False, standby=False)
+    assert engine.start()
+    yield engine
+    engine.quit()
+
+@pytest.fixture
+def slow_engine():
+    # Takes half a second per move, so the board can change under a running search
+    engine = StockfishEngine([sys.executable, FAKE_ENGINE, "--delay", "0.5"], ponder=False, standby=False)
+    assert engine.start()
+    yield engine
+    engine.quit()
+
+def test_failed_restart_closes_the_analysis_panel(engine):
+    game = ChessGame()
+    gui = ChessGUI(game, engine)
+    gui.set_analysis_panel(True)
+    gui.update_engine()
+    assert gui.live_analysis is not None
+
+    # The supervisor could not replace a crashed engine
+    gui.engine_status_changed("failed")
+    game.make_move("e2e4")
+    gui.update_engine()
+    assert gui.engine is None
+    assert not gui.show_analysis and gui.live_analysis is None
+    gui.update_engine() # And the loop keeps running without an engine
+
+def test_cancelled_search_is_dropped(slow_engine):
+    game = ChessGame()
+    gui = ChessGUI(game, slow_engine)
+    game.make_move("e2e4")
+    gui.update_engine()
+    search = gui.search
+    assert search is not None and not search.done
+
+    search.cancel()
+    search.join(5)
+    assert search.done and search.move is None
+    assert not pygame.event.get(ENGINE_EVENT) # on_done is not called for a cancelled search
+    gui.apply_search_result()
+    assert gui.search is None
+    assert game.board.move_stack == [chess.Move.from_uci("e2e4")]
+
+def test_stale_search_is_not_played(slow_engine):
+    game = ChessGame()
+    gui = ChessGUI(game, slow_engine)
+    game.make_move("e2e4")
+    gui.update_engine()
+    search = gui.search
+
+    # The player takes the move back while the engine is still thinking
+    game.undo_move()
+    game.make_move("d2d4")
+    search.join(5)
+    assert search.move is not None and search.is_stale(game.board)
+    gui.apply_search_result()
+    assert gui.search is None
+    assert game.board.move_stack == [chess.Move.from_uci("d2d4")]
@@ -0,0 +1,43 @@
+import chess
+from src.opening_book import OpeningBook, write_polyglot_book
+
+LINES = [
+    (["e2e4", "e7e5", "g1f3", "b8c6", "f1c4", "g8f6", "e1g1"], 10),
+    (["e2e4", "c7c5"], 5),
+    (["d2d4", "d7d5"], 1),
+]
+
+def make_book(tmp_path, **kwargs):
+    path = tmp_path / "test_book.bin"
+    write_polyglot_book(path, LINES)
+    return OpeningBook(str(path), **kwargs)
+
+def test_book_moves(tmp_path):
+    book = make_book(tmp_path)
+    board = chess.Board()
+    moves = dict(book.moves(board))
+    assert moves == {chess.Move.from_uci("e2e4"): 15, chess.Move.from_uci("d2d4"): 1}
+
+    board.push_uci("e2e4")
+    assert book.choose(board) in [chess.Move.from_uci("e7e5"), chess.Move.from_uci("c7c5")]
+
+    board.push_uci("a7a6") # Out of book
+    assert book.choose(board) is None
+    book.close()
+
+def test_castling_move(tmp_path):
+    book = make_book(tmp_path, weighted=False)
+    board = chess.Board()
+    for uci in LINES[0][0][:-1]:
+        board.push_uci(uci)
+    assert book.choose(board) == chess.Move.from_uci("e1g1")
+    book.close()
+
+def test_max_depth(tmp_path):
+    book = make_book(tmp_path, max_depth=2)
+    board = chess.Board()
+    board.push_uci("e2e4")
+    assert book.choose(board) is not None
+    board.push_uci("e7e5")
+    assert book.choose(board) is None
+    book.close()
@@ -0,0 +1,60 @@
+import chess
+from src.pgn_stream import PgnReader, pack_move, unpack_move
+
+PGN = """[Event "Game 1"]
+[White "A"]
+[Black "B"]
+[Result "1-0"]
+
+1. e4 e5 2. Bc4 Nc6 3. Qh5 Nf6 (3... g6 4. Qf3) 4. Qxf7# 1-0
+
+[Site "Elsewhere"]
+[Event "Game 2"]
+[Result "1/2-1/2"]
+
+1. d4 {A comment} d5 2. c4 1/2-1/2
+
+[Event "Game 3"]
+[SetUp "1"]
+[FEN "4k3/P7/8/8/8/8/8/4K3 w - - 0 1"]
+[Result "*"]
+
+1. a8=Q+ *
+
+"""
+
+def write_pgn(tmp_path, copies=1):
+    path = tmp_path / "games.pgn"
+    path.write_text(PGN * copies)
+    return str(path)
+
+def test_pack_move():
+    for uci in ["e2e4", "a7a8q", "h2h1n", "e1g1"]:
+        move = chess.Move.from_uci(uci)
+        assert unpack_move(pack_move(move)) == move
+
+def test_records_and_games(tmp_path):
+    reader = PgnReader(write_pgn(tmp_path))
+    records = list(reader.records())
+    assert [r.headers["Event"] for r in records] == ["Game 1", "Game 2", "Game 3"]
+    assert len(records[0].moves) == 7 # Variation skipped
+    assert records[1].headers["Site"] == "Elsewhere" # Tags before Event stay with their game
+
+    games = list(reader.games())
+    assert games[0].is_checkmate()
+    assert games[2].board.piece_at(chess.A8) == chess.Piece(chess.QUEEN, chess.WHITE)
+    assert reader.report()["games"] == 6
+
+def test_parallel_matches_sequential(tmp_path):
+    path = write_pgn(tmp_path, copies=20)
+    sequential = list(PgnReader(path).records())
+    assert len(sequential) == 60
+    # Chunk boundaries land inside tag sections, movetext and blank lines
+    for chunk_bytes in (37, 300):
+        assert list(PgnReader(path, workers=2, chunk_bytes=chunk_bytes).records()) == sequential
+
+def test_resume_from_offset(tmp_path):
+    path = write_pgn(tmp_path, copies=2)
+    records = list(PgnReader(path).records())
+    resumed = list(PgnReader(path).records(offset=records[4].offset))
+    assert resumed == records[4:]
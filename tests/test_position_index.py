@@ -0,0 +1,50 @@
+import chess
+from src.position_index import PositionIndex
+
+def moves(ucis):
+    return [chess.Move.from_uci(uci) for uci in ucis]
+
+def test_move_stats_and_reopen(tmp_path):
+    index = PositionIndex(str(tmp_path))
+    index.add_game(moves(["e2e4", "e7e5", "g1f3"]), "1-0")
+    index.add_game(moves(["e2e4", "c7c5"]), "0-1")
+    index.add_game(moves(["d2d4", "d7d5"]), "1/2-1/2")
+    index.add_game(moves(["g1f3", "e7e5", "e2e4"]), "*")
+    index.flush()
+
+    stats = dict(index.move_stats(chess.Board()))
+    assert stats[chess.Move.from_uci("e2e4")] == {"games": 2, "white": 1, "draws": 0, "black": 1}
+    assert stats[chess.Move.from_uci("d2d4")] == {"games": 1, "white": 0, "draws": 1, "black": 0}
+    assert stats[chess.Move.from_uci("g1f3")]["games"] == 1
+    index.close()
+
+    # Transposition: 1. e4 e5 2. Nf3 and 1. Nf3 e5 2. e4 reach the same position
+    index = PositionIndex(str(tmp_path))
+    board = chess.Board()
+    for uci in ["g1f3", "e7e5", "e2e4"]:
+        board.push_uci(uci)
+    assert sorted((game, ply) for game, ply, _ in index.lookup(board)) == [(0, 3), (3, 3)]
+    index.close()
+
+def test_repeated_position_counts_once(tmp_path):
+    index = PositionIndex(str(tmp_path))
+    # The knights go out and back twice: the start position comes up three times
+    index.add_game(moves(["g1f3", "g8f6", "f3g1", "f6g8"] * 2 + ["e2e4"]), "1-0")
+    index.flush()
+    assert [(ply, move.uci()) for _, ply, move in index.lookup(chess.Board())] == [(0, "g1f3")]
+    assert dict(index.move_stats(chess.Board()))[chess.Move.from_uci("g1f3")]["games"] == 1
+    index.close()
+
+def test_incremental_appends_and_compaction(tmp_path):
+    index = PositionIndex(str(tmp_path), flush_entries=5, max_segments=2)
+    for _ in range(6):
+        index.add_game(moves(["e2e4", "e7e5"]), "1-0")
+    index.flush()
+    assert len(index.segments) <= 2
+    assert dict(index.move_stats(chess.Board()))[chess.Move.from_uci("e2e4")]["games"] == 6
+
+    index.add_game(moves(["e2e4"]), "0-1")
+    index.flush()
+    entry = dict(index.move_stats(chess.Board()))[chess.Move.from_uci("e2e4")]
+    assert entry == {"games": 7, "white": 6, "draws": 0, "black": 1}
+    index.close()
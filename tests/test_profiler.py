@@ -0,0 +1,68 @@
+import csv
+import json
+import os
+import threading
+from src.profiler import Profiler, RingHistogram
+
+def test_ring_histogram_keeps_latest_samples():
+    histogram = RingHistogram(size=4)
+    assert histogram.percentile(50) is None
+    for value in range(10):
+        histogram.add(float(value))
+
+    assert histogram.count == 10
+    assert histogram.values() == [6.0, 7.0, 8.0, 9.0]
+    assert histogram.percentile(50) == 8.0
+    assert histogram.percentile(99) == 9.0
+    assert histogram.summary()["mean"] == 7.5
+
+def test_profiler_records_and_exports(tmp_path):
+    profiler = Profiler(size=16)
+    for _ in range(3):
+        with profiler.timed("frame"):
+            pass
+    profiler.record_search(0.5, {"nodes": 1000})
+    profiler.record_search(0.5, {"nps": 4000})
+
+    summary = profiler.summary()
+    assert summary["frame"]["count"] == 3
+    assert summary["engine"]["p50"] == 0.5
+    assert sorted(profiler.histograms["nps"].values()) == [2000.0, 4000.0]
+
+    profiler.export(str(tmp_path / "stats.json"))
+    data = json.loads((tmp_path / "stats.json").read_text())
+    assert len(data["frame"]["samples"]) == 3
+
+    profiler.export(str(tmp_path / "stats.csv"))
+    with open(tmp_path / "stats.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["name"] for row in rows] == ["engine", "frame", "nps"]
+
+def test_profile_frames(tmp_path, capsys):
+    profiler = Profiler()
+    path = str(tmp_path / "frames.prof")
+    profiler.profile_frames(2, path)
+    profiler.frame_done()
+    assert profiler.cprofile is not None
+    profiler.frame_done()
+
+    assert profiler.cprofile is None and os.path.exists(path)
+    assert "cumulative" in capsys.readouterr().out
+
+def test_histograms_created_from_many_threads():
+    profiler = Profiler(size=8)
+    barrier = threading.Barrier(8)
+    seen = []
+
+    def record():
+        barrier.wait()
+        seen.extend((n, profiler.histogram(f"name{n}")) for n in range(50))
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # However the threads interleaved, each name got exactly one histogram
+    assert len(profiler.summary()) == 50
+    assert all(histogram is profiler.histograms[f"name{n}"] for n, histogram in seen)
@@ -0,0 +1,63 @@
+import os
+import sys
+import chess.engine
+import chess.pgn
+from src import selfplay
+from src.selfplay import run_selfplay, elo_difference
+
+FAKE_ENGINE = os.path.join(os.path.dirname(__file__), "fake_engine.py")
+
+def fake_player(name, seed):
+    return {"name": name, "command": [sys.executable, FAKE_ENGINE, "--seed", str(seed)], "options": {}}
+
+def test_elo_difference():
+    assert elo_difference([0.5] * 10) == (0.0, 0.0)
+    elo, margin = elo_difference([1.0, 1.0, 1.0, 0.0])
+    assert 190 < elo < 192
+    assert margin > 0
+
+def test_selfplay_with_fake_engine(tmp_path):
+    config = {
+        "players": {"A": fake_player("A", 1), "B": fake_player("B", 2)},
+        "limit": chess.engine.Limit(time=0.01),
+        "base_time": None,
+        "increment": 0.0,
+        "book": None,
+        "random_plies": 2,
+        "max_plies": 60,
+        "seed": "test",
+    }
+    pgn_path = tmp_path / "games.pgn"
+    records, summary = run_selfplay(config, games=4, workers=2, pgn_path=str(pgn_path))
+
+    assert [record["index"] for record in records] == [0, 1, 2, 3]
+    assert records[0]["white"] == "A" and records[1]["white"] == "B"
+    assert summary["games"] == 4
+    assert summary["a_wins"] + summary["b_wins"] + summary["draws"] == 4
+
+    with open(pgn_path) as f:
+        games = []
+        while (game := chess.pgn.read_game(f)) is not None:
+            games.append(game)
+    assert len(games) == 4
+    assert all(game.headers["Result"] in ("1-0", "0-1", "1/2-1/2") for game in games)
+
+def test_games_do_not_share_cached_results():
+    config = {
+        "players": {"A": fake_player("A", 1), "B": fake_player("B", 2)},
+        "limit": chess.engine.Limit(time=0.01),
+        "base_time": 60,
+        "increment": 0.0,
+        "book": None,
+        "random_plies": 0,
+        "max_plies": 6,
+        "seed": "test",
+    }
+    selfplay._init_worker(config)
+    try:
+        for index in range(2):
+            record = selfplay.play_game(index)
+            searched = sum(len(engine.cache) for engine in selfplay._engines.values())
+            assert searched == len(record["moves"]) # Only this game's own searches
+    finally:
+        selfplay._shutdown_worker()
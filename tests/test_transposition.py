@@ -0,0 +1,79 @@
+import threading
+import chess
+import chess.engine
+from src.transposition import TranspositionCache, ENTRY_BYTES
+
+def test_depth_reuse():
+    cache = TranspositionCache(max_entries=10)
+    board = chess.Board()
+    e4 = chess.Move.from_uci("e2e4")
+    cache.store(board, chess.engine.Limit(depth=12), e4, depth=12)
+
+    assert cache.lookup(board, chess.engine.Limit(depth=10)).move == e4
+    assert cache.lookup(board, chess.engine.Limit(depth=12)).move == e4
+    assert cache.lookup(board, chess.engine.Limit(depth=14)) is None
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+def test_time_limits():
+    cache = TranspositionCache(max_entries=10)
+    board = chess.Board()
+    cache.store(board, chess.engine.Limit(time=1.0), chess.Move.from_uci("d2d4"))
+
+    assert cache.lookup(board, chess.engine.Limit(time=0.5)) is not None
+    assert cache.lookup(board, chess.engine.Limit(time=2.0)) is None
+
+def test_transposition_and_eviction():
+    cache = TranspositionCache(max_entries=2)
+    limit = chess.engine.Limit(depth=1)
+    a = chess.Board()
+    for uci in ["g1f3", "g8f6", "b1c3"]:
+        a.push_uci(uci)
+    b = chess.Board()
+    for uci in ["b1c3", "g8f6", "g1f3"]:
+        b.push_uci(uci)
+
+    cache.store(a, limit, chess.Move.from_uci("e7e5"), depth=1)
+    # Same position reached by a different move order
+    assert cache.lookup(b, limit).move == chess.Move.from_uci("e7e5")
+
+    for uci in ["e7e5", "d7d5"]:
+        board = b.copy()
+        board.push_uci(uci)
+        cache.store(board, limit, chess.Move.from_uci("e2e4"), depth=1)
+    assert len(cache) == 2
+    assert cache.evictions == 1
+    assert cache.lookup(a, limit) is None
+
+def test_memory_budget():
+    cache = TranspositionCache(max_bytes=ENTRY_BYTES * 50)
+    assert cache.max_entries == 50
+
+def test_shared_between_threads():
+    # The GUI's searches and the analysis pool store into one cache at once
+    cache = TranspositionCache(max_entries=8)
+    limit = chess.engine.Limit(depth=1)
+    boards = []
+    for move in chess.Board().legal_moves:
+        board = chess.Board()
+        board.push(move)
+        boards.append((board, next(iter(board.legal_moves))))
+    errors = []
+
+    def hammer():
+        try:
+            for _ in range(200):
+                for board, move in boards:
+                    cache.store(board, limit, move, depth=1)
+                    cache.lookup(board, limit)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=hammer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(cache) == 8
+    assert cache.hits + cache.misses == 4 * 200 * len(boards)